@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark the HTTP/1.1 (requests) and HTTP/2 (httpx) transports of TPLClient.
+
+Starts a local stand-in API server with hypercorn (HTTP/1.1 and cleartext HTTP/2,
+with prior knowledge) that answers every GET with a JSON page after a fixed
+latency, then sends concurrent GETs through each transport. Reports requests/sec
+and the number of connections the server saw.
+
+    pip install 'httpx[http2]' hypercorn
+    python benchmarks/bench_http2.py [--requests N] [--workers N] [--latency MS]
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+from tap_3plcentral.transport import HTTPXSession
+
+
+class StandInServer(object):
+    """ASGI app serving JSON pages, recording the client address of each request."""
+
+    def __init__(self, latency, records):
+        self.latency = latency
+        self.body = json.dumps({
+            'TotalResults': records,
+            'ResourceList': [{'OrderId': index} for index in range(records)]
+        }).encode('utf-8')
+        self.connections = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        self.connections.add(tuple(scope['client']))
+        await asyncio.sleep(self.latency)
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/hal+json')]
+        })
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, port):
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+    config = Config()
+    config.bind = ['127.0.0.1:{}'.format(port)]
+    config.loglevel = 'WARNING'
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve(app, config, shutdown_trigger=stop.wait))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    def shutdown():
+        loop.call_soon_threadsafe(stop.set)
+        thread.join(timeout=5)
+    return shutdown
+
+
+def run_requests(session, url, count, workers):
+    def get(index):
+        response = session.request('GET', '{}?pgnum={}'.format(url, index), timeout=(5, 30))
+        response.content
+        return getattr(response, 'http_version', 'HTTP/1.1')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        versions = set(executor.map(get, range(count)))
+    return time.perf_counter() - start, versions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=20, help='server latency per request (ms)')
+    parser.add_argument('--records', type=int, default=50, help='records per page')
+    args = parser.parse_args()
+
+    app = StandInServer(args.latency / 1000.0, args.records)
+    port = free_port()
+    shutdown = start_server(app, port)
+    url = 'http://127.0.0.1:{}/orders'.format(port)
+
+    transports = [
+        ('requests', requests.Session()),
+        ('httpx-h2', HTTPXSession(http1=False)),
+    ]
+    print('{:<10} {:>10} {:>12} {:>12}  {}'.format('transport', 'seconds', 'requests/s', 'connections', 'versions'))
+    try:
+        for name, session in transports:
+            app.connections.clear()
+            seconds, versions = run_requests(session, url, args.requests, args.workers)
+            print('{:<10} {:>10.2f} {:>12.0f} {:>12}  {}'.format(
+                name, seconds, args.requests / seconds, len(app.connections), ', '.join(sorted(versions))))
+            session.close()
+    finally:
+        shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Benchmark JSON backends for API decoding and Singer RECORD output.
+
+Reports records/sec for each installed backend (orjson, ujson, stdlib) on
+synthetic, schema-transformed orders records.
+
+    python benchmarks/bench_json.py [--records N] [--items N]
+"""
+import argparse
+import io
+import time
+
+import singer
+from singer import metadata, utils
+
+from tap_3plcentral import json_codec
+from tap_3plcentral.schema import get_schemas
+from tap_3plcentral.schema_compiler import compile_transformer
+
+from synthetic import synthetic_value
+
+
+def best_of(func, rounds=3):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=3, help='entries per nested array')
+    args = parser.parse_args()
+
+    schemas, field_metadata = get_schemas()
+    transform = compile_transformer(schemas['orders'], metadata.to_map(field_metadata['orders']))
+    records = [transform(synthetic_value(schemas['orders'], i, args.items)) for i in range(args.records)]
+    messages = [singer.RecordMessage(stream='orders', record=record, time_extracted=utils.now())
+                for record in records]
+    body = json_codec.StdlibCodec().dumps_message(
+        singer.StateMessage(value={'ResourceList': records})).encode('utf-8')
+
+    print('{:<8} {:>16} {:>16}'.format('backend', 'decode rec/s', 'encode rec/s'))
+    for name in json_codec.available_backends():
+        codec = json_codec.set_backend(name)
+        decode = best_of(lambda: codec.loads(body))
+
+        def encode():
+            out = io.StringIO()
+            for message in messages:
+                out.write(codec.dumps_message(message) + '\n')
+        encoded = best_of(encode)
+        print('{:<8} {:>16.0f} {:>16.0f}'.format(name, len(records) / decode, len(records) / encoded))
+
+
+if __name__ == '__main__':
+    main()
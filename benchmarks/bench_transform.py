@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Benchmark record transforms on synthetic orders pages.
+
+Compares the original per-record singer.Transformer path with the compiled
+schema transform used by RecordProcessor.
+
+    python benchmarks/bench_transform.py [--pages N] [--page-size N] [--items N]
+"""
+import argparse
+import copy
+import time
+
+from singer import Transformer, metadata
+
+from tap_3plcentral.schema import get_schemas
+from tap_3plcentral.schema_compiler import compile_transformer
+
+from synthetic import synthetic_value
+
+
+def run(name, transform, pages, rounds=3):
+    records = sum(len(page) for page in pages)
+    best = None
+    for _ in range(rounds):
+        data = copy.deepcopy(pages)
+        start = time.perf_counter()
+        for page in data:
+            for record in page:
+                transform(record)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('{:<28} {:>10.0f} records/sec  ({:.3f}s for {} records)'.format(
+        name, records / best, best, records))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=200)
+    parser.add_argument('--items', type=int, default=3, help='entries per nested array')
+    args = parser.parse_args()
+
+    schemas, field_metadata = get_schemas()
+    schema = schemas['orders']
+    mdata = metadata.to_map(field_metadata['orders'])
+    pages = [[synthetic_value(schema, page * args.page_size + i, args.items)
+              for i in range(args.page_size)]
+             for page in range(args.pages)]
+
+    def singer_transform(record):
+        with Transformer() as transformer:
+            return transformer.transform(record, schema, mdata)
+
+    compiled = compile_transformer(schema, mdata)
+    baseline = run('singer.Transformer', singer_transform, pages)
+    fast = run('compiled schema transform', compiled, pages)
+    print('speedup: {:.1f}x'.format(baseline / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Synthetic API data for the benchmarks, generated from the stream schemas."""
+
+
+def synthetic_value(schema, index, items):
+    """Fully populated value for a schema (every property, `items` array entries)."""
+    if 'anyOf' in schema:
+        return synthetic_value(schema['anyOf'][0], index, items)
+    types = schema.get('type', [])
+    if not isinstance(types, list):
+        types = [types]
+    typ = next((typ for typ in types if typ != 'null'), 'null')
+    if typ == 'object':
+        return {key: synthetic_value(sub_schema, index, items)
+                for key, sub_schema in schema.get('properties', {}).items()}
+    if typ == 'array':
+        return [synthetic_value(schema['items'], index + i, items) for i in range(items)]
+    if typ == 'string' and schema.get('format') == 'date-time':
+        return '2019-{:02d}-{:02d}T10:{:02d}:00'.format(index % 12 + 1, index % 28 + 1, index % 60)
+    if typ == 'integer':
+        return index
+    if typ == 'number':
+        return index * 1.5
+    if typ == 'boolean':
+        return index % 2 == 0
+    if typ == 'string':
+        return 'value-{}'.format(index)
+    return None
@@ -9,11 +9,19 @@ setup(name='tap-3plcentral',
       classifiers=['Programming Language :: Python :: 3 :: Only'],
       py_modules=['tap_3plcentral'],
       install_requires=[
-          'backoff==2.2.1',
           'requests==2.34.2',
           'singer-python==6.8.0'
       ],
       extras_require={
+          'fast-json': [
+              'orjson',
+          ],
+          'async': [
+              'httpx',
+          ],
+          'http2': [
+              'httpx[http2]',
+          ],
           'dev': [
               'parameterized',
               'pytest',
@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 
+import asyncio
 import sys
 import json
 import argparse
 import singer
 from singer import metadata, utils
-from tap_3plcentral.client import TPLClient
+from tap_3plcentral import async_sync
+from tap_3plcentral.async_client import AsyncTPLClient
+from tap_3plcentral.client import TPLClient, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 from tap_3plcentral.discover import discover
-from tap_3plcentral.sync import sync
+from tap_3plcentral.http_cache import DEFAULT_HTTP_CACHE_TTL
+from tap_3plcentral.ratelimit import DEFAULT_RATE_LIMIT, DEFAULT_RATE_PERIOD
+from tap_3plcentral.sync import sync, get_page_workers, get_child_workers, get_window_workers
+from tap_3plcentral.transport import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
 
 LOGGER = singer.get_logger()
 
@@ -31,23 +37,68 @@ def do_discover():
     LOGGER.info('Finished discover')
 
 
+# TPLClient/AsyncTPLClient settings from the config
+def get_client_config(config):
+    return {
+        'base_url': config['base_url'],
+        'client_id': config['client_id'],
+        'client_secret': config['client_secret'],
+        'tpl_key': config['tpl_key'],
+        'user_login_id': config['user_login_id'],
+        'user_agent': config['user_agent'],
+        'token_cache_path': config.get('token_cache_path'),
+        'rate_limit': int(config.get('rate_limit', DEFAULT_RATE_LIMIT)),
+        'rate_limit_period': float(config.get('rate_limit_period', DEFAULT_RATE_PERIOD)),
+        'rate_limit_burst': config.get('rate_limit_burst'),
+        'connect_timeout': float(config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT)),
+        'read_timeout': float(config.get('read_timeout', DEFAULT_READ_TIMEOUT)),
+        'endpoint_timeouts': config.get('endpoint_timeouts'),
+        'pool_connections': int(config.get('pool_connections', DEFAULT_POOL_CONNECTIONS)),
+        # By default, a connection per concurrent request: child_workers syncs of
+        #  window_workers date windows with page_workers pages each
+        'pool_maxsize': int(config.get('pool_maxsize', max(
+            DEFAULT_POOL_MAXSIZE,
+            get_page_workers(config) * get_child_workers(config) * get_window_workers(config))))
+    }
+
+
+async def do_async_sync(config, catalog, state):
+    async with AsyncTPLClient(**get_client_config(config)) as client:
+        await async_sync.sync(
+            client=client,
+            config=config,
+            catalog=catalog,
+            state=state,
+            start_date=config['start_date'])
+
+
 @singer.utils.handle_top_exception(LOGGER)
 def main():
 
     parsed_args = singer.utils.parse_args(REQUIRED_CONFIG_KEYS)
 
+    if parsed_args.state:
+        state = parsed_args.state
+    else:
+        state = {}
+
+    # The asyncio engine (AsyncTPLClient, requires httpx)
+    if parsed_args.catalog and not parsed_args.discover and \
+            parsed_args.config.get('sync_engine') == 'async':
+        unsupported_options = async_sync.get_unsupported_options(parsed_args.config)
+        if unsupported_options:
+            LOGGER.warning('Not supported by sync_engine async, ignored: {}'.format(
+                ', '.join(unsupported_options)))
+        asyncio.run(do_async_sync(parsed_args.config, parsed_args.catalog, state))
+        return
+
     with TPLClient(
-        base_url=parsed_args.config['base_url'],
-        client_id=parsed_args.config['client_id'],
-        client_secret=parsed_args.config['client_secret'],
-        tpl_key=parsed_args.config['tpl_key'],
-        user_login_id=parsed_args.config['user_login_id'],
-        user_agent=parsed_args.config['user_agent']) as client:
-
-        if parsed_args.state:
-            state = parsed_args.state
-        else:
-            state = {}
+        hedge_requests=str(parsed_args.config.get('hedge_requests', False)).lower() == 'true',
+        http2=str(parsed_args.config.get('http2', False)).lower() == 'true',
+        http_cache_path=parsed_args.config.get('http_cache_path'),
+        http_cache_streams=parsed_args.config.get('http_cache_streams'),
+        http_cache_ttl=float(parsed_args.config.get('http_cache_ttl', DEFAULT_HTTP_CACHE_TTL)),
+        **get_client_config(parsed_args.config)) as client:
 
         if parsed_args.discover:
             do_discover()
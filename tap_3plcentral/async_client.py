@@ -0,0 +1,265 @@
+import asyncio
+import base64
+import json
+
+import singer
+from singer import metrics
+from tap_3plcentral import json_codec
+from tap_3plcentral.client import (
+    TPLClient,
+    RetryPolicy,
+    Server429Error,
+    parse_retry_after,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT)
+from tap_3plcentral.ratelimit import TokenBucket, DEFAULT_RATE_LIMIT, DEFAULT_RATE_PERIOD
+from tap_3plcentral.token_cache import TokenCache, token_from_response
+
+# httpx is optional: pip install 'tap-3plcentral[async]'
+from tap_3plcentral.transport import httpx, make_timeout, translate_errors, DEFAULT_POOL_MAXSIZE
+
+LOGGER = singer.get_logger()
+
+
+class AsyncTPLClient(object):
+    """asyncio API for 3PLCentral, with the get/post surface, authentication, token
+    refresh, rate limiting, retries and errors of TPLClient, on an httpx.AsyncClient.
+    Many requests can be in flight on one event loop thread.
+    """
+
+    def __init__(
+        self,
+        base_url='https://secure-wms.com',
+        auth_path='AuthServer/api/Token',
+        client_id=None,
+        client_secret=None,
+        tpl_key=None,
+        grant_type='client_credentials',
+        user_login_id=None,
+        user_agent=None,
+        session=None,
+        verify_ssl=True,
+        token_cache_path=None,
+        rate_limit=DEFAULT_RATE_LIMIT,
+        rate_limit_period=DEFAULT_RATE_PERIOD,
+        rate_limit_burst=None,
+        retry_policy=None,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        endpoint_timeouts=None,
+        pool_connections=None,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        """
+        Create an instance; the access token is requested on entering the client.
+        Parameters are those of TPLClient, except:
+        :param session: pass a custom httpx.AsyncClient (no token is requested).
+        :param pool_connections: unused (httpx pools connections per host).
+        :param pool_maxsize: maximum connections open at a time.
+
+        :Example:
+            async with AsyncTPLClient(base_url, client_id=client_id, ...) as api:
+                await api.get("orders", "13654")
+        """
+        if session is None and httpx is None:
+            raise ImportError('AsyncTPLClient requires httpx: pip install httpx')
+        self._base_url = base_url
+        self._auth_path = auth_path
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._tpl_key = tpl_key
+        self._grant_type = grant_type
+        self._user_login_id = user_login_id
+        self._user_agent = user_agent
+        self.rate_limiter = TokenBucket(rate_limit, rate_limit_period, rate_limit_burst)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.endpoint_timeouts = endpoint_timeouts or {}
+        self._token_cache = TokenCache(token_cache_path)
+        self._token_key = TokenCache.key(base_url, client_id, tpl_key, user_login_id)
+        self._token = None
+        self._token_generation = 0
+        self._token_lock = asyncio.Lock()
+        self.token_refreshes = 0
+        self._manage_token = session is None
+        self.last_response_size = None
+
+        if session is None:
+            self.client = httpx.AsyncClient(
+                verify=verify_ssl,
+                limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+                headers={
+                    "Content-Type": "application/hal+json",
+                    "User-Agent": self._user_agent
+                })
+        else:
+            self.client = session
+
+    async def __aenter__(self):
+        if self._manage_token and self._token is None:
+            await self._authenticate()
+        return self
+
+    async def __aexit__(self, exception_type, exception_value, traceback):
+        await self.client.aclose()
+
+    # Status handling, error messages and timeouts are shared with TPLClient
+    _parse_error = TPLClient._parse_error
+    _check_status_code = TPLClient._check_status_code
+    get_timeout = TPLClient.get_timeout
+
+    @property
+    def throttled_seconds(self):
+        """Seconds requests spent waiting for the rate limiter."""
+        return self.rate_limiter.throttled_seconds
+
+    def log_stats(self):
+        LOGGER.info('Rate limiter: {:.1f} seconds throttled, {} rate limited (429) responses'.format(
+            self.rate_limiter.throttled_seconds,
+            self.rate_limiter.slowdowns))
+        for endpoint, retries in sorted(self.retry_policy.retries.items()):
+            LOGGER.info('Retries for {}: {}'.format(endpoint, retries))
+
+    async def _authenticate(self, force=False):
+        """Use a cached access token, or get a new one (see TPLClient._authenticate)."""
+        token = None if force else self._token_cache.get(self._token_key)
+        if token is None:
+            token = token_from_response(await self._get_access_token())
+            self._token_cache.set(self._token_key, token)
+        else:
+            LOGGER.info('Using cached access token')
+        self._token = token
+        self._token_generation += 1
+
+    async def _refresh_token(self, stale_generation, force=False):
+        """Replace the token of generation stale_generation, unless another task
+        already has; concurrent callers await that one refresh.
+        :return: (token, generation) to use.
+        """
+        async with self._token_lock:
+            if self._token_generation == stale_generation:
+                LOGGER.info('Refreshing access token')
+                await self._authenticate(force=force)
+                self.token_refreshes += 1
+            return self._token, self._token_generation
+
+    async def _current_token(self):
+        token, generation = self._token, self._token_generation
+        if not self._token_cache.is_valid(token):
+            token, generation = await self._refresh_token(generation)
+        return token, generation
+
+    async def _get_access_token(self):
+        """Get access token from server and returns it.
+        :return: access token from the server.
+        """
+        key_string = "%s:%s" % (self._client_id, self._client_secret)
+        auth = base64.b64encode(key_string.encode("utf-8"))
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": 'Basic {}'.format(auth.decode('utf-8')),
+            "User-Agent": self._user_agent
+        }
+        data = {
+            "grant_type": self._grant_type,
+            "tpl": "{%s}" % (self._tpl_key,),
+            "user_login_id": self._user_login_id
+        }
+        return await self.post(self._auth_path, data=data, add_headers=headers)
+
+    async def _request(self, url, method, data=None, add_headers=None, endpoint=None):
+        """Perform the HTTP request, retrying transient failures, and return the checked response."""
+        if add_headers is None:
+            add_headers = {}
+        if endpoint is None:
+            endpoint = url
+        return await self.retry_policy.call_async(
+            endpoint,
+            lambda: self._send(url, method, data, add_headers, endpoint))
+
+    async def _send(self, url, method, data, add_headers, endpoint):
+        """Perform a single HTTP request attempt (refreshing a rejected token once)."""
+        LOGGER.info('URL = {}'.format(url))
+        use_token = self._manage_token and 'Authorization' not in add_headers
+        for attempt in range(2):
+            request_headers = {}
+            if use_token:
+                token, generation = await self._current_token()
+                request_headers['Authorization'] = "%s %s" % (token['token_type'], token['access_token'])
+            request_headers.update(add_headers)
+            await self.rate_limiter.acquire_async()
+            with metrics.http_request_timer(endpoint) as timer:
+                response = await self._http_request(method, url, data, request_headers, endpoint)
+                timer.tags[metrics.Tag.http_status_code] = response.status_code
+                # The token expired or was revoked: refresh it once and retry
+                if response.status_code == 401 and use_token and attempt == 0:
+                    LOGGER.warning('Access token rejected (401 Unauthorized)')
+                    await self._refresh_token(generation, force=True)
+                    continue
+                # The next attempt waits in the rate limiter until Retry-After
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    self.rate_limiter.slow_down(retry_after)
+                    raise Server429Error(
+                        'Too Many Requests', 429,
+                        tpl_error_msg=self._parse_error(response.content),
+                        retry_after=retry_after)
+                self.rate_limiter.on_success()
+                self._check_status_code(response.status_code, response.content)
+
+            return response
+
+    async def _http_request(self, method, url, data, headers, endpoint):
+        """Send one request; httpx transport errors are raised as the requests
+        exceptions TPLClient raises (and RetryPolicy retries).
+        """
+        with translate_errors():
+            return await self.client.request(
+                method,
+                url,
+                content=data,
+                headers=headers,
+                timeout=make_timeout(*self.get_timeout(endpoint)))
+
+    async def _execute(self, url, method, data=None, add_headers=None, endpoint=None):
+        """Perform the HTTP request and return the response back.
+        :return: response in json format.
+        """
+        response = await self._request(url, method, data=data, add_headers=add_headers, endpoint=endpoint)
+        self.last_response_size = len(response.content)
+        return json_codec.loads(response.content)
+
+    def _get_url(self, resource_path, resource_id=None, querystring=None):
+        full_url = "%s/%s" % (self._base_url, resource_path)
+        if resource_id is not None:
+            full_url += "/%s" % (resource_id,)
+        if querystring is not None:
+            full_url += "?%s" % (querystring,)
+        return full_url
+
+    async def get(self, resource_path, resource_id=None, querystring=None, add_headers=None, endpoint=None):
+        """Retrieve (GET) a resource.
+        :param resource_path: path of resource to retrieve.
+        :param resource_id: optional resource id to retrieve.
+        :param querystring: optional RQL querystring.
+        :param add_headers: additional headers merged into instance's headers.
+        :return: response in json format.
+        """
+        if endpoint is None:
+            endpoint = resource_path
+        full_url = self._get_url(resource_path, resource_id, querystring)
+        return await self._execute(full_url, 'GET', add_headers=add_headers, endpoint=endpoint)
+
+    async def post(self, resource_path, data=None, add_headers=None, endpoint=None):
+        """Add (POST) a resource.
+        :param resource_path: path of resource to create.
+        :param data: full payload as dict of new resource.
+        :param add_headers: additional headers merged into instance's headers.
+        :return: response in json format.
+        """
+        if endpoint is None:
+            endpoint = resource_path
+        if data is None:
+            raise ValueError('Data Undefined.')
+        full_url = self._get_url(resource_path)
+        return await self._execute(full_url, 'POST', data=json.dumps(data), add_headers=add_headers, endpoint=endpoint)
@@ -0,0 +1,381 @@
+import copy
+
+import singer
+from singer import utils
+from tap_3plcentral import writer
+from tap_3plcentral.concurrency import ordered_map_async
+from tap_3plcentral.sync import (
+    OutputBuffer,
+    clear_parent_bookmark_default,
+    configure_output,
+    get_adaptive_page_size,
+    get_child_workers,
+    get_date_window_days,
+    get_endpoint_params,
+    get_endpoints,
+    get_keyset_pagination,
+    get_last_bookmark,
+    get_page_checkpoint_interval,
+    get_page_records,
+    get_page_workers,
+    get_parent_id_field,
+    get_pipeline_queue_size,
+    get_record_processor,
+    get_selected_streams,
+    get_stream_pages,
+    get_total_pages,
+    get_window_workers,
+    has_parent_bookmark,
+    process_records,
+    should_sync_stream,
+    update_currently_syncing,
+    write_parent_bookmark,
+    write_schema,
+    write_stream_bookmark)
+
+LOGGER = singer.get_logger()
+
+# asyncio sync engine (config sync_engine: async), for an AsyncTPLClient.
+# Mirrors sync.py: the same endpoints, params, transforms, record processing and
+#  bookmarks, with page prefetching (page_workers) and concurrent child syncs
+#  (child_workers) run as tasks on one event loop instead of threads. Singer output
+#  is unchanged: pages are processed in page order, and each concurrent child sync
+#  buffers its output, which is replayed in parent record order.
+# Not supported by this engine (see get_unsupported_options): stream_pages,
+#  adaptive_page_size, date windows (date_window_days, window_workers),
+#  keyset_pagination, pipeline_stages, page checkpoints (page_checkpoint_interval),
+#  hedge_requests, http2 and the HTTP cache (http_cache_path).
+
+
+# Options set in the config that this engine does not use
+def get_unsupported_options(config):
+    config = config or {}
+    options = [
+        ('stream_pages', get_stream_pages(config)),
+        ('adaptive_page_size', get_adaptive_page_size(config)),
+        ('date_window_days', get_date_window_days(config) > 0),
+        ('window_workers', get_window_workers(config) > 1),
+        ('keyset_pagination', get_keyset_pagination(config)),
+        ('pipeline_stages', get_pipeline_queue_size(config)),
+        ('page_checkpoint_interval', get_page_checkpoint_interval(config)),
+        ('hedge_requests', str(config.get('hedge_requests', False)).lower() == 'true'),
+        ('http2', str(config.get('http2', False)).lower() == 'true'),
+        ('http_cache_path', config.get('http_cache_path')),
+    ]
+    return [name for name, enabled in options if enabled]
+
+
+# Get one page of data from the API; returns the page data and time_extracted.
+async def fetch_page(client, path, params, stream_name):
+    # Squash params to query-string params
+    querystring = '&'.join(['%s=%s' % (key, value) for (key, value) in params.items()])
+    data = await client.get(
+        path,
+        querystring=querystring,
+        endpoint=stream_name)
+    return data, utils.now()
+
+
+# Yield (page, data, time_extracted) for each page of an endpoint, in page order
+#  (see sync.iter_pages): with page_workers > 1, pages 2..N are fetched concurrently.
+async def iter_pages(get_page, page_size, page_workers=1):
+    page = 1
+    total_pages = 1  # initial value, set with first API call
+    while page <= total_pages:
+        data, time_extracted = await get_page(page)
+        yield page, data, time_extracted
+        total_pages = get_total_pages(data, page_size)
+        page = page + 1
+        if page_workers > 1 and page <= total_pages:
+            break
+    else:
+        return
+
+    remaining_pages = range(page, total_pages + 1)
+    prefetched = ordered_map_async(get_page, remaining_pages, page_workers)
+    try:
+        page_iter = iter(remaining_pages)
+        async for data, time_extracted in prefetched:
+            yield next(page_iter), data, time_extracted
+    finally:
+        await prefetched.aclose()
+
+
+# Sync a specific parent or child endpoint (see sync.sync_endpoint).
+async def sync_endpoint(client,
+                        catalog,
+                        state,
+                        start_date,
+                        stream_name,
+                        path,
+                        endpoint_config,
+                        data_key,
+                        static_params,
+                        bookmark_query_field=None,
+                        bookmark_field=None,
+                        bookmark_type=None,
+                        id_fields=None,
+                        parent=None,
+                        parent_id=None,
+                        config=None,
+                        processors=None):
+    bookmark_parent_id = parent_id if parent else None
+    last_datetime, last_integer, max_bookmark_value = get_last_bookmark(
+        state, stream_name, bookmark_field, bookmark_type, start_date, bookmark_parent_id)
+
+    write_schema(catalog, stream_name)
+    processor = get_record_processor(processors, catalog, stream_name)
+
+    params, page_size = get_endpoint_params(
+        static_params, bookmark_query_field, bookmark_type, last_datetime, last_integer)
+
+    LOGGER.info('{} - Sync start'.format(stream_name))
+
+    async def get_page(page):
+        return await fetch_page(client, path, {'pgnum': page, **params}, stream_name)
+
+    # Children synced per parent record vs. once per run (fixed_parent_id)
+    children = endpoint_config.get('children') or {}
+    parent_children = {name: child for name, child in children.items()
+                       if 'fixed_parent_id' not in child}
+    fixed_parent_children = {name: child for name, child in children.items()
+                             if 'fixed_parent_id' in child}
+
+    total_records = 0 # total number of result records (across all batches)
+    pages = iter_pages(get_page, page_size, get_page_workers(config))
+    try:
+        async for page, data, time_extracted in pages:
+            if not data:
+                break # No data results
+            transformed_data = get_page_records(data, stream_name, data_key)
+            if not transformed_data:
+                break # No data results
+
+            # Process records and get the max_bookmark_value and record_count for the set of records
+            max_bookmark_value, record_count = process_records(
+                catalog=catalog,
+                stream_name=stream_name,
+                records=transformed_data,
+                time_extracted=time_extracted,
+                bookmark_field=bookmark_field,
+                bookmark_type=bookmark_type,
+                max_bookmark_value=max_bookmark_value,
+                last_datetime=last_datetime,
+                last_integer=last_integer,
+                parent=parent,
+                parent_id=parent_id,
+                processor=processor)
+
+            # set total_records for the endpoint
+            total_pages = get_total_pages(data, page_size)
+            if 'TotalResults' in data:
+                total_records = data['TotalResults']
+            else:
+                total_records = record_count
+
+            # Loop thru parent batch records for each children objects (if should stream)
+            if parent_children:
+                await sync_children(
+                    client=client,
+                    catalog=catalog,
+                    state=state,
+                    start_date=start_date,
+                    stream_name=stream_name,
+                    children=parent_children,
+                    records=transformed_data,
+                    id_fields=id_fields,
+                    config=config,
+                    processors=processors)
+
+            # Update the state with the max_bookmark_value for the stream
+            if bookmark_field:
+                write_stream_bookmark(state,
+                                      stream_name,
+                                      bookmark_field,
+                                      max_bookmark_value,
+                                      bookmark_parent_id)
+
+            LOGGER.info('{} - Synced - page: {}, total pages: {}'.format(
+                stream_name,
+                page,
+                total_pages))
+    finally:
+        await pages.aclose()
+
+    # A parent without records keeps the threshold it was synced from
+    if bookmark_field and bookmark_parent_id is not None and \
+        not has_parent_bookmark(state, stream_name, bookmark_parent_id):
+        write_parent_bookmark(state, stream_name, bookmark_field, bookmark_parent_id, max_bookmark_value)
+
+    # Children that do not depend on the parent id are synced once, after all pages
+    if fixed_parent_children:
+        await sync_children(
+            client=client,
+            catalog=catalog,
+            state=state,
+            start_date=start_date,
+            stream_name=stream_name,
+            children=fixed_parent_children,
+            records=[],
+            id_fields=id_fields,
+            config=config,
+            processors=processors)
+
+    # Every parent of the child streams has been synced
+    for child_stream_name, child_endpoint_config in parent_children.items():
+        if child_endpoint_config.get('bookmark_field'):
+            clear_parent_bookmark_default(state, child_stream_name)
+
+    # Return total_records across all batches
+    return total_records
+
+
+# Sync the child streams of a batch of parent records (see sync.sync_children).
+# With child_workers > 1, the children of up to child_workers parents are synced
+#  concurrently, each against its own copy of the state and with its output buffered
+#  and replayed in parent record order.
+async def sync_children(client,
+                        catalog,
+                        state,
+                        start_date,
+                        stream_name,
+                        children,
+                        records,
+                        id_fields,
+                        config=None,
+                        processors=None):
+    child_workers = get_child_workers(config)
+    parent_id_field = get_parent_id_field(id_fields)
+    record_parent_ids = [record.get(parent_id_field) for record in records]
+
+    for child_stream_name, child_endpoint_config in children.items():
+        should_stream, _ = should_sync_stream(get_selected_streams(catalog),
+                                              None,
+                                              child_stream_name)
+        if not should_stream:
+            continue
+
+        if 'fixed_parent_id' in child_endpoint_config:
+            parent_ids = [child_endpoint_config['fixed_parent_id']]
+        else:
+            parent_ids = record_parent_ids
+
+        async def sync_child(parent_id, child_state):
+            LOGGER.info('Syncing: {}, parent_stream: {}, parent_id: {}'.format(
+                child_stream_name,
+                stream_name,
+                parent_id))
+            child_path = child_endpoint_config.get('path').format(str(parent_id))
+            return await sync_endpoint(
+                client=client,
+                catalog=catalog,
+                state=child_state,
+                start_date=start_date,
+                stream_name=child_stream_name,
+                path=child_path,
+                endpoint_config=child_endpoint_config,
+                data_key=child_endpoint_config.get('data_key', 'ResourceList'),
+                static_params=child_endpoint_config.get('params', {}),
+                bookmark_query_field=child_endpoint_config.get('bookmark_query_field'),
+                bookmark_field=child_endpoint_config.get('bookmark_field'),
+                bookmark_type=child_endpoint_config.get('bookmark_type'),
+                id_fields=child_endpoint_config.get('id_fields'),
+                parent=child_endpoint_config.get('parent'),
+                parent_id=parent_id,
+                config=config,
+                processors=processors)
+
+        async def sync_child_buffered(job):
+            parent_id, child_state = job
+            # Each task runs in its own context, so the buffer is local to the task
+            with OutputBuffer() as output:
+                child_total_records = await sync_child(parent_id, child_state)
+            return parent_id, output, child_total_records
+
+        if child_workers > 1:
+            jobs = ((parent_id, copy.deepcopy(state)) for parent_id in parent_ids)
+            results = ordered_map_async(sync_child_buffered, jobs, child_workers)
+            try:
+                async for parent_id, output, child_total_records in results:
+                    output.replay(state)
+                    LOGGER.info('Synced: {}, parent_id: {}, total_records: {}'.format(
+                        child_stream_name,
+                        parent_id,
+                        child_total_records))
+            finally:
+                await results.aclose()
+        else:
+            for parent_id in parent_ids:
+                child_total_records = await sync_child(parent_id, state)
+                LOGGER.info('Synced: {}, parent_id: {}, total_records: {}'.format(
+                    child_stream_name,
+                    parent_id,
+                    child_total_records))
+
+
+async def sync(client, config, catalog, state, start_date):
+    if 'start_date' in config:
+        start_date = config['start_date']
+    customer_id = config.get('customer_id')
+    facility_id = config.get('facility_id')
+    configure_output(config)
+
+    selected_streams = get_selected_streams(catalog)
+    LOGGER.info('selected_streams: {}'.format(selected_streams))
+
+    if not selected_streams:
+        return
+
+    # last_stream = Previous currently synced stream, if the load was interrupted
+    last_stream = singer.get_currently_syncing(state)
+    LOGGER.info('last/currently syncing stream: {}'.format(last_stream))
+
+    endpoints = get_endpoints(customer_id, facility_id)
+
+    # processors: RecordProcessor per stream, shared by all pages and children of the run
+    processors = {}
+
+    try:
+        for stream_name, endpoint_config in endpoints.items():
+            should_stream, last_stream = should_sync_stream(selected_streams,
+                                                            last_stream,
+                                                            stream_name)
+            if should_stream:
+                LOGGER.info('START Syncing: {}'.format(stream_name))
+                update_currently_syncing(state, stream_name)
+                if stream_name == 'locations':
+                    path = endpoint_config.get('path').format(facility_id)
+                else:
+                    path = endpoint_config.get('path')
+                total_records = await sync_endpoint(
+                    client=client,
+                    catalog=catalog,
+                    state=state,
+                    start_date=start_date,
+                    stream_name=stream_name,
+                    path=path,
+                    endpoint_config=endpoint_config,
+                    data_key=endpoint_config.get('data_key', 'ResourceList'),
+                    static_params=endpoint_config.get('params', {}),
+                    bookmark_query_field=endpoint_config.get('bookmark_query_field'),
+                    bookmark_field=endpoint_config.get('bookmark_field'),
+                    bookmark_type=endpoint_config.get('bookmark_type'),
+                    id_fields=endpoint_config.get('id_fields'),
+                    config=config,
+                    processors=processors)
+
+                update_currently_syncing(state, None)
+                LOGGER.info('Synced: {}, total_records: {}'.format(
+                                stream_name,
+                                total_records))
+                LOGGER.info('FINISHED Syncing: {}'.format(stream_name))
+    finally:
+        # Write any buffered records, and then the latest state, on completion or shutdown
+        writer.get_writer().flush()
+        writer.get_state_emitter().flush()
+        writer.get_writer().log_stats()
+        writer.get_state_emitter().log_stats()
+        client.log_stats()
+        # Removed/filtered paths of the run, also when a stream raised
+        for processor in processors.values():
+            processor.close()
@@ -1,22 +1,81 @@
 # Client Reference: https://github.com/dvdhinesh/python-tpl
 
+import asyncio
+import collections
 import json
-from datetime import datetime, timedelta
+import email.utils
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta, timezone
 
 import urllib.parse
 import base64
-import backoff
 import requests
 import singer
-from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectionError, Timeout, ChunkedEncodingError
 from singer import metrics
 from singer import utils
+from tap_3plcentral import json_codec
+from tap_3plcentral.http_cache import HTTPCache, DEFAULT_HTTP_CACHE_TTL
+from tap_3plcentral.ratelimit import TokenBucket, DEFAULT_RATE_LIMIT, DEFAULT_RATE_PERIOD
+from tap_3plcentral.streaming import StreamedPage
+from tap_3plcentral.transport import (
+    ConnectionStats,
+    make_session,
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE)
+from tap_3plcentral.token_cache import TokenCache, token_from_response
 
 LOGGER = singer.get_logger()
 
+# Bytes read from the response body at a time when parsing a page incrementally
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# Attempts for a request failing with a 5xx status or a connection/read error
+MAX_TRIES = 5
+# Attempts for a request rate limited by the server (429); the wait between
+#  attempts is the server's Retry-After, enforced by the rate limiter
+MAX_RATE_LIMITED_TRIES = 8
+# Consecutive failed attempts after which an endpoint's circuit breaker opens, and
+#  seconds before a request is let through again
+CIRCUIT_BREAKER_THRESHOLD = 10
+CIRCUIT_BREAKER_RESET = 60
+# Seconds between checks for the outcome of the half-open probe request
+CIRCUIT_BREAKER_POLL = 1
+
+# Seconds to wait for a connection, and between bytes of the response
+DEFAULT_CONNECT_TIMEOUT = 30
+DEFAULT_READ_TIMEOUT = 300
+
+# Hedged GETs: latencies kept per endpoint, and the samples needed before a
+#  duplicate request is sent for a GET slower than the percentile latency
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 0.95
+HEDGE_WORKERS = 32
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
 
-class Server5xxError(Exception):
-    pass
 
 class TPLBaseError(Exception):
     """Generic base exception class for 3PLCentral"""
@@ -41,6 +100,216 @@ class TPLAPIError(TPLBaseError):
         return repr(self.msg + self.tpl_error_msg)
 
 
+class Server5xxError(TPLAPIError):
+    """Raised when 3PLCentral returns a transient server error (500, 502, 503, 504)"""
+    pass
+
+
+class Server429Error(TPLAPIError):
+    """Raised when 3PLCentral rate limits a request (429 Too Many Requests)"""
+
+    def __init__(self, msg, error_code=429, tpl_error_msg='', retry_after=None):
+        super().__init__(msg, error_code, tpl_error_msg=tpl_error_msg)
+        self.retry_after = retry_after
+
+
+def _close_response(future):
+    if future.exception() is None:
+        future.result().close()
+
+
+class RetryPolicy(object):
+    """Retries transient request failures: 5xx responses, 429 responses and
+    connection/read errors. Waits between attempts use full-jitter exponential
+    backoff (a random delay up to base_delay * 2^attempt, capped at max_delay);
+    429s are retried without extra delay, since the rate limiter already waits for
+    Retry-After. After breaker_threshold consecutive failed attempts on an endpoint
+    (a 429 or any other answer from the server resets the count) its circuit
+    opens: requests to it wait, without sending or using up attempts, until
+    breaker_reset seconds have passed. Then one request
+    is sent as a probe (half-open) while the others keep waiting: a success closes
+    the circuit, a failure opens it for another breaker_reset seconds.
+    """
+
+    def __init__(
+        self,
+        max_tries=MAX_TRIES,
+        rate_limited_tries=MAX_RATE_LIMITED_TRIES,
+        base_delay=2,
+        max_delay=60,
+        breaker_threshold=CIRCUIT_BREAKER_THRESHOLD,
+        breaker_reset=CIRCUIT_BREAKER_RESET,
+        clock=time.monotonic,
+        sleep=None):
+        self.max_tries = max_tries
+        self.rate_limited_tries = rate_limited_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.retries = collections.Counter()
+        self._clock = clock
+        self._sleep = sleep
+        self._failures = collections.Counter()
+        self._opened_at = {}
+        self._probing = set()
+        self._lock = threading.Lock()
+
+    def is_retryable(self, error):
+        return isinstance(error, (Server5xxError, Server429Error, ConnectionError, Timeout, ChunkedEncodingError))
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def sleep(self, seconds):
+        (self._sleep or time.sleep)(seconds)
+
+    def is_open(self, endpoint):
+        return endpoint in self._opened_at
+
+    def _before_attempt(self, endpoint):
+        """Seconds to wait before sending the next attempt (0 to send it now), and
+        whether the attempt is the half-open probe of the endpoint's circuit.
+        """
+        with self._lock:
+            opened_at = self._opened_at.get(endpoint)
+            if opened_at is None:
+                return 0, False
+            wait = opened_at + self.breaker_reset - self._clock()
+            if wait <= 0:
+                if endpoint not in self._probing:
+                    self._probing.add(endpoint)
+                    LOGGER.info('Circuit breaker half-open for {}: sending a probe request'.format(endpoint))
+                    return 0, True
+                wait = min(CIRCUIT_BREAKER_POLL, self.breaker_reset)
+            return wait, False
+
+    def _record_success(self, endpoint):
+        if self._failures[endpoint] or endpoint in self._opened_at:
+            with self._lock:
+                if endpoint in self._opened_at:
+                    LOGGER.info('Circuit breaker closed for {}'.format(endpoint))
+                self._failures[endpoint] = 0
+                self._opened_at.pop(endpoint, None)
+                self._probing.discard(endpoint)
+
+    def _record_failure(self, endpoint, probe=False):
+        with self._lock:
+            self._failures[endpoint] += 1
+            if probe:
+                self._probing.discard(endpoint)
+                self._opened_at[endpoint] = self._clock()
+                LOGGER.error('Circuit breaker probe for {} failed: waiting {} seconds'.format(
+                    endpoint, self.breaker_reset))
+            elif endpoint not in self._opened_at and self._failures[endpoint] >= self.breaker_threshold:
+                self._opened_at[endpoint] = self._clock()
+                LOGGER.error('Circuit breaker opened for {} after {} consecutive failures: waiting {} seconds'.format(
+                    endpoint, self._failures[endpoint], self.breaker_reset))
+
+    def _end_probe(self, endpoint):
+        with self._lock:
+            self._probing.discard(endpoint)
+
+    def _retry_delay(self, endpoint, error, attempt, probe=False):
+        """Seconds to wait before retrying after the failed attempt number `attempt`
+        (1-based), or None if error must be raised.
+        """
+        rate_limited = isinstance(error, Server429Error)
+        if rate_limited or not self.is_retryable(error):
+            # The server answered: it is up
+            self._record_success(endpoint)
+        else:
+            self._record_failure(endpoint, probe)
+        if not self.is_retryable(error):
+            return None
+        max_tries = self.rate_limited_tries if rate_limited else self.max_tries
+        if attempt >= max_tries:
+            return None
+        with self._lock:
+            self.retries[endpoint] += 1
+        delay = 0 if rate_limited else self.delay(attempt - 1)
+        LOGGER.warning('Retrying {} in {:.1f} seconds (attempt {} of {}): {}'.format(
+            endpoint, delay, attempt + 1, max_tries, error))
+        return delay
+
+    def call(self, endpoint, func):
+        """Call func(), retrying it according to the policy.
+        :param endpoint: name the retries and circuit breaker are tracked by.
+        :return: func's result.
+        """
+        attempt = 0
+        while True:
+            wait, probe = self._before_attempt(endpoint)
+            if wait > 0:
+                self.sleep(wait)
+                continue
+            try:
+                result = func()
+            except Exception as err:
+                attempt += 1
+                delay = self._retry_delay(endpoint, err, attempt, probe)
+                if delay is None:
+                    raise
+                self.sleep(delay)
+                continue
+            except BaseException:
+                if probe:
+                    self._end_probe(endpoint)
+                raise
+            self._record_success(endpoint)
+            return result
+
+    async def call_async(self, endpoint, func):
+        """Await func(), retrying it according to the policy.
+        :param endpoint: name the retries and circuit breaker are tracked by.
+        :return: func's result.
+        """
+        attempt = 0
+        while True:
+            wait, probe = self._before_attempt(endpoint)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                result = await func()
+            except Exception as err:
+                attempt += 1
+                delay = self._retry_delay(endpoint, err, attempt, probe)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                if probe:
+                    self._end_probe(endpoint)
+                raise
+            self._record_success(endpoint)
+            return result
+
+
+class LatencyTracker(object):
+    """Recent request latencies per endpoint, for the hedged request delay."""
+
+    def __init__(self, window=LATENCY_WINDOW, min_samples=HEDGE_MIN_SAMPLES, percentile=HEDGE_PERCENTILE):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, seconds):
+        with self._lock:
+            self._latencies[endpoint].append(seconds)
+
+    def hedge_delay(self, endpoint):
+        """The percentile latency of the endpoint, or None until min_samples are observed."""
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile))]
+
+
 class TPLClient(object):
     """Generic API for 3PLCentral"""
 
@@ -55,7 +324,22 @@ class TPLClient(object):
         user_login_id=None,
         user_agent=None,
         session=None,
-        verify_ssl=True):
+        verify_ssl=True,
+        token_cache_path=None,
+        rate_limit=DEFAULT_RATE_LIMIT,
+        rate_limit_period=DEFAULT_RATE_PERIOD,
+        rate_limit_burst=None,
+        retry_policy=None,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        endpoint_timeouts=None,
+        hedge_requests=False,
+        http2=False,
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        http_cache_path=None,
+        http_cache_streams=None,
+        http_cache_ttl=DEFAULT_HTTP_CACHE_TTL):
         
         """
         Create an instance, get access token and update the headers
@@ -69,6 +353,21 @@ class TPLClient(object):
         :param user_agent: agent-name <email@address.com>.
         :param session: pass a custom requests Session.
         :param verify_ssl: skip SSL validation.
+        :param token_cache_path: file to reuse access tokens across runs until near expiry.
+        :param rate_limit: calls allowed per rate_limit_period seconds.
+        :param rate_limit_period: seconds over which rate_limit applies.
+        :param rate_limit_burst: calls allowed back to back (default: 1).
+        :param retry_policy: RetryPolicy for transient failures (default: RetryPolicy()).
+        :param connect_timeout: seconds to wait for a connection.
+        :param read_timeout: seconds to wait between bytes of the response.
+        :param endpoint_timeouts: per endpoint {'connect_timeout': x, 'read_timeout': y} overrides.
+        :param hedge_requests: duplicate GETs slower than the endpoint's p95 latency.
+        :param http2: multiplex requests over HTTP/2 (requires httpx and h2; falls back to requests).
+        :param pool_connections: connection pools (hosts) kept by the session.
+        :param pool_maxsize: connections kept open per host.
+        :param http_cache_path: directory of the on-disk HTTP cache for GET responses.
+        :param http_cache_streams: endpoints (stream names) whose GETs are cached.
+        :param http_cache_ttl: seconds a response without ETag/Last-Modified is reused.
         
         :Example:
             from tpl import TPLClient
@@ -88,30 +387,96 @@ class TPLClient(object):
         self.__user_login_id = user_login_id
         self.__user_agent = user_agent
         self.__verify_ssl = verify_ssl
+        self._local = threading.local()
+        # Shared by all threads using this client
+        self.rate_limiter = TokenBucket(rate_limit, rate_limit_period, rate_limit_burst)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.endpoint_timeouts = endpoint_timeouts or {}
+        self.hedge_requests = hedge_requests
+        self.latency = LatencyTracker()
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        self._token_cache = TokenCache(token_cache_path)
+        self._token_key = TokenCache.key(base_url, client_id, tpl_key, user_login_id)
+        self.http_cache = None
+        if http_cache_path and http_cache_streams:
+            self.http_cache = HTTPCache(
+                http_cache_path,
+                http_cache_streams,
+                ttl=http_cache_ttl,
+                namespace=self._token_key)
+        self._token = None
+        # Incremented on every new token, so threads that saw the same stale token
+        #  share a single refresh
+        self._token_generation = 0
+        self._token_lock = threading.Lock()
+        self.token_refreshes = 0
 
         if session is None:
-            self.client = requests.Session()
-            response = self._get_access_token()
+            self.client = make_session(
+                http2=http2,
+                verify=verify_ssl,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize)
             headers = {
-                "Authorization": "%s %s" % (response['token_type'], response['access_token']),
                 "Content-Type": "application/hal+json",
                 "User-Agent": self.__user_agent
             }
             self.client.headers.update(headers)
+            self._authenticate()
         else:
             self.client = session
 
     def __enter__(self):
-        self._get_access_token()
         return self
 
+    def _authenticate(self, force=False):
+        """Set the Authorization header from a cached access token, or get a new one.
+        Exactly one token request is made when there is no valid cached token.
+        :param force: ignore the cache (the current token was rejected).
+        """
+        token = None if force else self._token_cache.get(self._token_key)
+        if token is None:
+            token = token_from_response(self._get_access_token())
+            self._token_cache.set(self._token_key, token)
+        else:
+            LOGGER.info('Using cached access token')
+        self._token = token
+        self._token_generation += 1
+        self.client.headers.update({
+            "Authorization": "%s %s" % (token['token_type'], token['access_token'])
+        })
+
+    def _refresh_token(self, stale_generation, force=False):
+        """Replace the token of generation stale_generation, unless another thread
+        already has; concurrent callers wait for that one refresh.
+        :return: (token, generation) to use.
+        """
+        with self._token_lock:
+            if self._token_generation == stale_generation:
+                LOGGER.info('Refreshing access token')
+                self._authenticate(force=force)
+                self.token_refreshes += 1
+            return self._token, self._token_generation
+
+    def _current_token(self):
+        """Return the (token, generation) to send, refreshing it first when it is
+        within the cache's expiry margin.
+        """
+        token, generation = self._token, self._token_generation
+        if not self._token_cache.is_valid(token):
+            token, generation = self._refresh_token(generation)
+        return token, generation
+
     def __exit__(self, exception_type, exception_value, traceback):
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
         self.client.close()
 
-    @backoff.on_exception(backoff.expo,
-                          Server5xxError,
-                          max_tries=5,
-                          factor=2)
     def _get_access_token(self):
         """Get access token from server and returns it.
         :return: access token from the server.
@@ -133,10 +498,12 @@ class TPLClient(object):
         return self.post(self.__auth_path, data=data, add_headers=headers)
 
     def _parse_error(self, content):
-        """Take the content and return as it is.
-        :param content: content returned by the 3PLCentral server as string.
+        """Take the content and return it as text.
+        :param content: content returned by the 3PLCentral server (bytes or string).
         :return: content.
         """
+        if isinstance(content, bytes):
+            return content.decode('utf-8', errors='replace')
         return content
 
     def _check_status_code(self, status_code, content):
@@ -153,11 +520,21 @@ class TPLClient(object):
             404: 'Not Found',
             412: 'Precondition failed',
             428: 'Precondition required',
+        }
+        # Transient server errors, retried by the RetryPolicy
+        server_message_by_code = {
             500: 'Internal Server Error',
+            502: 'Bad Gateway',
+            503: 'Service Unavailable',
+            504: 'Gateway Timeout',
         }
 
         if status_code in (200, 201, 202):
             return True
+        elif status_code in server_message_by_code:
+            tpl_error_msg = self._parse_error(content)
+            raise Server5xxError(
+                server_message_by_code[status_code], status_code, tpl_error_msg=tpl_error_msg)
         elif status_code in message_by_code:
             tpl_error_msg = self._parse_error(content)
             raise TPLAPIError(
@@ -167,18 +544,99 @@ class TPLClient(object):
             raise TPLAPIError('Unknown error', status_code,
                            tpl_error_msg=tpl_error_msg)
 
-    @backoff.on_exception(backoff.expo,
-                          (Server5xxError, ConnectionError),
-                          max_tries=5,
-                          factor=2)
-    @utils.ratelimit(400, 60)
-    def _execute(self, url, method, data=None, add_headers=None, endpoint=None):
-        """Perform the HTTP request and return the response back.
+    @property
+    def throttled_seconds(self):
+        """Seconds requests spent waiting for the rate limiter."""
+        return self.rate_limiter.throttled_seconds
+
+    def log_stats(self):
+        LOGGER.info('Rate limiter: {:.1f} seconds throttled, {} rate limited (429) responses'.format(
+            self.rate_limiter.throttled_seconds,
+            self.rate_limiter.slowdowns))
+        for endpoint, retries in sorted(self.retry_policy.retries.items()):
+            LOGGER.info('Retries for {}: {}'.format(endpoint, retries))
+        if self.hedge_requests:
+            LOGGER.info('Hedged requests: {} sent, {} returned first'.format(
+                self.hedged_requests, self.hedge_wins))
+        if self.http_cache is not None:
+            self.http_cache.log_stats()
+        stats = getattr(self.client, 'stats', None)
+        if isinstance(stats, ConnectionStats):
+            LOGGER.info('Connections: {} requests, {} connections opened, {} reused, {} TLS handshakes'.format(
+                stats.requests,
+                stats.connections_opened,
+                stats.connections_reused,
+                stats.tls_handshakes))
+            stats.log()
+
+    def get_timeout(self, endpoint):
+        """(connect, read) timeout in seconds for requests to endpoint."""
+        timeouts = self.endpoint_timeouts.get(endpoint, {})
+        return (
+            float(timeouts.get('connect_timeout', self.connect_timeout)),
+            float(timeouts.get('read_timeout', self.read_timeout)))
+
+    def _get_hedge_executor(self):
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=HEDGE_WORKERS, thread_name_prefix='tpl-hedge')
+            return self._hedge_executor
+
+    def _http_request(self, method, url, endpoint, **kwargs):
+        """Send one request with the endpoint's timeouts, hedging slow GETs when enabled."""
+        kwargs['timeout'] = self.get_timeout(endpoint)
+        hedge_delay = None
+        if self.hedge_requests and method == 'GET':
+            hedge_delay = self.latency.hedge_delay(endpoint)
+        start = time.monotonic()
+        if hedge_delay is None:
+            response = self.client.request(method, url, **kwargs)
+        else:
+            response = self._hedged_request(method, url, endpoint, hedge_delay, **kwargs)
+        self.latency.observe(endpoint, time.monotonic() - start)
+        return response
+
+    def _hedged_request(self, method, url, endpoint, hedge_delay, **kwargs):
+        """Send the request; if it has not returned after hedge_delay seconds, send a
+        duplicate and return whichever response arrives first. The other response is
+        closed when it arrives; an error is only raised if both requests fail.
+        """
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self.client.request, method, url, **kwargs)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        LOGGER.info('Hedging request to {} after {:.2f} seconds'.format(endpoint, hedge_delay))
+        self.rate_limiter.acquire()
+        hedge = executor.submit(self.client.request, method, url, **kwargs)
+        with self._hedge_lock:
+            self.hedged_requests += 1
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                for loser in pending:
+                    loser.add_done_callback(_close_response)
+                if future is hedge:
+                    with self._hedge_lock:
+                        self.hedge_wins += 1
+                return future.result()
+        raise error
+
+    def _request(self, url, method, data=None, add_headers=None, endpoint=None, stream=False):
+        """Perform the HTTP request, retrying transient failures, and return the checked response.
         :param url: full url to call.
         :param method: GET, POST.
         :param data: POST (add) only.
         :param add_headers: additional headers merged into instance's headers.
-        :return: response in json format.
+        :param stream: defer downloading the response body.
+        :return: requests response.
         """
         if add_headers is None:
             add_headers = {}
@@ -186,20 +644,84 @@ class TPLClient(object):
         if endpoint is None:
             endpoint = url
 
+        return self.retry_policy.call(
+            endpoint,
+            lambda: self._send(url, method, data, add_headers, endpoint, stream))
+
+    def _send(self, url, method, data, add_headers, endpoint, stream):
+        """Perform a single HTTP request attempt (refreshing a rejected token once)."""
         LOGGER.info('URL = {}'.format(url))
-        request_headers = self.client.headers.copy()
-        request_headers.update(add_headers)
-        with metrics.http_request_timer(endpoint) as timer:
-            response = self.client.request(
-                method,
-                url,
-                data=data,
-                verify=self.__verify_ssl,
-                headers=request_headers) 
-            timer.tags[metrics.Tag.http_status_code] = response.status_code
-            self._check_status_code(response.status_code, response.content)
-        
-        return response.json()
+        # Requests with their own Authorization (the token request) and clients on
+        #  a custom session do not use the managed access token
+        use_token = self._token is not None and 'Authorization' not in add_headers
+        for attempt in range(2):
+            request_headers = self.client.headers.copy()
+            if use_token:
+                token, generation = self._current_token()
+                request_headers['Authorization'] = "%s %s" % (token['token_type'], token['access_token'])
+            request_headers.update(add_headers)
+            self.rate_limiter.acquire()
+            with metrics.http_request_timer(endpoint) as timer:
+                response = self._http_request(
+                    method,
+                    url,
+                    endpoint,
+                    data=data,
+                    verify=self.__verify_ssl,
+                    headers=request_headers,
+                    stream=stream)
+                timer.tags[metrics.Tag.http_status_code] = response.status_code
+                # The token expired or was revoked: refresh it once and retry
+                if response.status_code == 401 and use_token and attempt == 0:
+                    LOGGER.warning('Access token rejected (401 Unauthorized)')
+                    response.close()
+                    self._refresh_token(generation, force=True)
+                    continue
+                # The next attempt waits in the rate limiter until Retry-After
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    self.rate_limiter.slow_down(retry_after)
+                    raise Server429Error(
+                        'Too Many Requests', 429,
+                        tpl_error_msg=self._parse_error(response.content),
+                        retry_after=retry_after)
+                self.rate_limiter.on_success()
+                # A conditional GET (HTTP cache revalidation) found the cached body current
+                if response.status_code == 304 and \
+                        ('If-None-Match' in add_headers or 'If-Modified-Since' in add_headers):
+                    return response
+                # Leave the body of a successful streamed response unread
+                if stream and response.status_code in (200, 201, 202):
+                    self._check_status_code(response.status_code, None)
+                else:
+                    self._check_status_code(response.status_code, response.content)
+
+            return response
+
+    def _execute(self, url, method, data=None, add_headers=None, endpoint=None):
+        """Perform the HTTP request and return the response back.
+        :param url: full url to call.
+        :param method: GET, POST.
+        :param data: POST (add) only.
+        :param add_headers: additional headers merged into instance's headers.
+        :return: response in json format.
+        """
+        response = self._request(url, method, data=data, add_headers=add_headers, endpoint=endpoint)
+        self._local.response_size = len(response.content)
+        return json_codec.loads(response.content)
+
+    @property
+    def last_response_size(self):
+        """Size in bytes of the last response body read by _execute on this thread."""
+        return getattr(self._local, 'response_size', None)
+
+    def _get_url(self, resource_path, resource_id=None, querystring=None):
+        full_url = "%s/%s" % (self.__base_url, resource_path)
+        if resource_id is not None:
+            full_url += "/%s" % (resource_id,)
+        if querystring is not None:
+            full_url += "?%s" % (querystring,)
+        return full_url
 
     def get(self, resource_path, resource_id=None, querystring=None, add_headers=None, endpoint=None):
         """Retrieve (GET) a resource.
@@ -211,14 +733,53 @@ class TPLClient(object):
         """
         if endpoint is None:
             endpoint = resource_path
-        full_url = "%s/%s" % (self.__base_url, resource_path)
-        if resource_id is not None:
-            full_url += "/%s" % (resource_id,)
-        if querystring is not None:
-            full_url += "?%s" % (querystring,)
+        full_url = self._get_url(resource_path, resource_id, querystring)
+        if self.http_cache is not None and self.http_cache.enabled_for(endpoint):
+            return self._execute_cached(full_url, add_headers=add_headers, endpoint=endpoint)
         response = self._execute(full_url, 'GET', add_headers=add_headers, endpoint=endpoint)
         return response
-    
+
+    def _execute_cached(self, url, add_headers=None, endpoint=None):
+        """GET through the HTTP cache: reuse a fresh cached body, or revalidate it with
+        a conditional request, or fetch and store a new one.
+        :return: response in json format.
+        """
+        entry = self.http_cache.get(url)
+        if entry is not None and self.http_cache.is_fresh(entry):
+            content = entry.content
+            self.http_cache.record(endpoint, hit=True)
+        else:
+            request_headers = dict(add_headers or {})
+            if entry is not None:
+                request_headers.update(entry.conditional_headers())
+            response = self._request(url, 'GET', add_headers=request_headers, endpoint=endpoint)
+            if response.status_code == 304:
+                content = entry.content
+                self.http_cache.touch(url, entry)
+                self.http_cache.record(endpoint, hit=True)
+            else:
+                content = response.content
+                self.http_cache.set(url, content, response.headers)
+                self.http_cache.record(endpoint, hit=False)
+        self._local.response_size = len(content)
+        return json_codec.loads(content)
+
+    def get_streamed(self, resource_path, data_key, querystring=None, add_headers=None, endpoint=None):
+        """Retrieve (GET) a page of resources, parsing its records incrementally.
+        :param resource_path: path of resource to retrieve.
+        :param data_key: JSON element containing the records (e.g. ResourceList).
+        :param querystring: optional RQL querystring.
+        :param add_headers: additional headers merged into instance's headers.
+        :return: StreamedPage yielding the records as they are parsed.
+        """
+        if endpoint is None:
+            endpoint = resource_path
+        full_url = self._get_url(resource_path, querystring=querystring)
+        response = self._request(full_url, 'GET', add_headers=add_headers, endpoint=endpoint, stream=True)
+        return StreamedPage(
+            response.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+            data_key,
+            on_close=response.close)
 
     def post(self, resource_path, data=None, add_headers=None, endpoint=None):
         """Add (POST) a resource.
@@ -0,0 +1,129 @@
+import asyncio
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Run func over items on a bounded thread pool and yield the results in input order.
+# At most max_workers calls are in flight (or finished but not yet consumed) at a time,
+#  so a slow consumer applies backpressure instead of letting the pool race ahead.
+# With max_workers <= 1, items are processed serially on the calling thread.
+def ordered_map(func, items, max_workers=1):
+    if max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        try:
+            for item in items:
+                if len(pending) >= max_workers:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(func, item))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Consumer stopped early (break or error): drop work not yet started
+            for future in pending:
+                future.cancel()
+
+
+# Run a two-stage pipeline over an iterable: items are produced (iterated) on one
+#  thread and func applied to them on another, with the results yielded in order on
+#  the calling thread. The stages are connected by queues of queue_size items, so a
+#  slow consumer blocks the stages behind it (backpressure) instead of letting them
+#  race ahead. An exception in either stage is raised to the consumer. With
+#  queue_size <= 0, items are processed serially on the calling thread.
+def pipeline(items, func, queue_size=2):
+    if queue_size <= 0:
+        for item in items:
+            yield func(item)
+        return
+
+    stop = threading.Event()
+    produced = queue.Queue(queue_size)
+    results = queue.Queue(queue_size)
+
+    # put/get that give up once the consumer has stopped
+    def put(stage_queue, message):
+        while not stop.is_set():
+            try:
+                stage_queue.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(stage_queue):
+        while not stop.is_set():
+            try:
+                return stage_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def produce():
+        try:
+            for item in items:
+                if not put(produced, ('item', item)):
+                    return
+        except BaseException as err: #pylint: disable=broad-except
+            put(produced, ('error', err))
+            return
+        finally:
+            close = getattr(items, 'close', None)
+            if close is not None:
+                close()
+        put(produced, ('done', None))
+
+    def apply():
+        while True:
+            message = get(produced)
+            if message is None:
+                return
+            kind, value = message
+            if kind == 'item':
+                try:
+                    value = func(value)
+                except BaseException as err: #pylint: disable=broad-except
+                    kind, value = 'error', err
+            if not put(results, (kind, value)) or kind != 'item':
+                return
+
+    threads = [threading.Thread(target=produce, daemon=True),
+               threading.Thread(target=apply, daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            kind, value = results.get()
+            if kind == 'error':
+                raise value
+            if kind == 'done':
+                return
+            yield value
+    finally:
+        # Consumer finished or stopped early (break or error): stop both stages
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+# asyncio counterpart of ordered_map: await func(item) for each item with at most
+#  max_concurrency calls in flight as tasks on the running loop, and yield the results
+#  in input order (an async generator).
+async def ordered_map_async(func, items, max_concurrency=1):
+    pending = deque()
+    try:
+        for item in items:
+            if len(pending) >= max(max_concurrency, 1):
+                yield await pending.popleft()
+            pending.append(asyncio.ensure_future(func(item)))
+        while pending:
+            yield await pending.popleft()
+    finally:
+        # Consumer stopped early (break or error): cancel the remaining tasks
+        for task in pending:
+            task.cancel()
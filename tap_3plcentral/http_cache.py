@@ -0,0 +1,128 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+import singer
+
+LOGGER = singer.get_logger()
+
+# Seconds a cached response without validators (ETag/Last-Modified) is reused
+#  without asking the server
+DEFAULT_HTTP_CACHE_TTL = 3600
+
+
+class CacheEntry(object):
+    def __init__(self, content, etag=None, last_modified=None, stored_at=None):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at if stored_at is not None else time.time()
+
+    @property
+    def has_validators(self):
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HTTPCache(object):
+    """On-disk cache of GET response bodies, one file per URL: a JSON metadata line
+    followed by the body, replaced atomically so the body and its validators always
+    match, and readable only by the owner (mode 0o600).
+    Responses with an ETag or Last-Modified header are revalidated with a conditional
+    request (If-None-Match/If-Modified-Since), and reused on 304 Not Modified.
+    Responses without validators are reused without a request for ttl seconds.
+    Only the endpoints (streams) in `endpoints` are cached; hits and misses are
+    counted per endpoint. Keys include a namespace (the API credentials), so tenants
+    sharing a cache directory never see each other's responses.
+    """
+
+    def __init__(self, path, endpoints, ttl=DEFAULT_HTTP_CACHE_TTL, namespace=''):
+        self.path = path
+        self.endpoints = set(endpoints or [])
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def enabled_for(self, endpoint):
+        return endpoint in self.endpoints
+
+    def _file_path(self, url):
+        key = hashlib.sha256('{}\n{}'.format(self.namespace, url).encode('utf-8')).hexdigest()
+        return os.path.join(self.path, key + '.entry')
+
+    def get(self, url):
+        try:
+            with open(self._file_path(url), 'rb') as file:
+                entry_metadata = json.loads(file.readline())
+                content = file.read()
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry_metadata, dict) or entry_metadata.get('url') != url:
+            return None
+        return CacheEntry(
+            content,
+            etag=entry_metadata.get('etag'),
+            last_modified=entry_metadata.get('last_modified'),
+            stored_at=entry_metadata.get('stored_at'))
+
+    def is_fresh(self, entry, now=None):
+        """True if entry can be used without a request: no validators, within ttl."""
+        if now is None:
+            now = time.time()
+        return not entry.has_validators and now - entry.stored_at < self.ttl
+
+    def set(self, url, content, headers):
+        entry = CacheEntry(
+            content,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'))
+        self._write(url, entry)
+        return entry
+
+    def touch(self, url, entry):
+        """Record that a cached entry was revalidated (304) now."""
+        entry.stored_at = time.time()
+        self._write(url, entry)
+
+    def _write(self, url, entry):
+        entry_metadata = {
+            'url': url,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'stored_at': entry.stored_at
+        }
+        file_path = self._file_path(url)
+        tmp_path = '{}.{}.{}.tmp'.format(file_path, os.getpid(), threading.get_ident())
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(json.dumps(entry_metadata).encode('utf-8') + b'\n')
+                file.write(entry.content)
+            os.replace(tmp_path, file_path)
+        except OSError as err:
+            LOGGER.warning('Unable to write HTTP cache entry for {}: {}'.format(url, err))
+
+    def record(self, endpoint, hit):
+        with self._lock:
+            if hit:
+                self.hits[endpoint] += 1
+            else:
+                self.misses[endpoint] += 1
+
+    def log_stats(self):
+        for endpoint in sorted(self.endpoints):
+            LOGGER.info('HTTP cache for {}: {} hits, {} misses'.format(
+                endpoint, self.hits[endpoint], self.misses[endpoint]))
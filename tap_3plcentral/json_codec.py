@@ -0,0 +1,113 @@
+import json
+
+import singer
+from singer.messages import format_message
+
+# Pluggable JSON codec for API response decoding and Singer message output.
+# The fastest installed backend is selected at import: orjson, then ujson, then
+#  the stdlib path (json for decoding; singer's simplejson format_message, with
+#  Decimal support, for output). The backend can be overridden with set_backend.
+# Output semantics match singer's format_message: records hold JSON-native values
+#  (date-times are already strings after the schema transform); a value a fast
+#  backend cannot encode (e.g. Decimal) or decode (e.g. integers beyond 64 bits)
+#  falls back to the stdlib path for that message/response. Differences are
+#  byte-level only: compact separators and unescaped non-ASCII (UTF-8) text.
+#  Non-finite floats (not valid JSON, never returned by the API) are written as
+#  null by orjson where the stdlib path raises ValueError.
+
+LOGGER = singer.get_logger()
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class StdlibCodec(object):
+    name = 'stdlib'
+
+    def loads(self, content):
+        return json.loads(content)
+
+    def dumps_message(self, message):
+        return format_message(message)
+
+
+class OrjsonCodec(StdlibCodec):
+    name = 'orjson'
+
+    def loads(self, content):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return json.loads(content)
+
+    def dumps_message(self, message):
+        try:
+            return orjson.dumps(message.asdict()).decode('utf-8')
+        except TypeError:
+            return format_message(message)
+
+
+class UjsonCodec(StdlibCodec):
+    name = 'ujson'
+
+    def loads(self, content):
+        try:
+            return ujson.loads(content)
+        except ValueError:
+            return json.loads(content)
+
+    def dumps_message(self, message):
+        try:
+            return ujson.dumps(message.asdict(), ensure_ascii=False, escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            return format_message(message)
+
+
+BACKENDS = {
+    'orjson': OrjsonCodec if orjson is not None else None,
+    'ujson': UjsonCodec if ujson is not None else None,
+    'stdlib': StdlibCodec,
+}
+
+
+def available_backends():
+    return [name for name, codec in BACKENDS.items() if codec is not None]
+
+
+def detect_backend():
+    return available_backends()[0]
+
+
+CODEC = BACKENDS[detect_backend()]()
+
+
+def set_backend(name=None):
+    """Select the JSON backend by name; None (or 'auto') selects the fastest installed."""
+    global CODEC
+    if name is None or name == 'auto':
+        name = detect_backend()
+    if BACKENDS.get(name) is None:
+        raise ValueError('JSON backend {} is not available (installed: {})'.format(
+            name, ', '.join(available_backends())))
+    CODEC = BACKENDS[name]()
+    LOGGER.info('JSON backend: {}'.format(CODEC.name))
+    return CODEC
+
+
+def get_codec():
+    return CODEC
+
+
+def loads(content):
+    return CODEC.loads(content)
+
+
+def dumps_message(message):
+    return CODEC.dumps_message(message)
@@ -0,0 +1,80 @@
+import singer
+
+LOGGER = singer.get_logger()
+
+
+class AdaptivePageSize(object):
+    """Tunes pgsiz within [min_size, max_size] to maximize records per second.
+    Each page size is measured over sample_pages full pages. The size moves by factor
+    (growing first) while throughput improves on the best size so far; when it stops
+    improving, or a bound is reached, the search turns around once from the best size,
+    and settles on the best size when that direction stops improving too.
+    """
+
+    def __init__(self, page_size, min_size, max_size, factor=2, sample_pages=2, tolerance=0.05):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.page_size = self._clamp(page_size)
+        self.factor = factor
+        self.sample_pages = sample_pages
+        self.tolerance = tolerance
+        self.direction = 1
+        self.reversed = False
+        self.settled = False
+        self.best_size = None
+        self.best_throughput = None
+        self._records = 0
+        self._seconds = 0.0
+        self._bytes = 0
+        self._pages = 0
+
+    def _clamp(self, size):
+        return int(min(max(size, self.min_size), self.max_size))
+
+    def _step(self, size):
+        if self.direction > 0:
+            return self._clamp(size * self.factor)
+        return self._clamp(size / self.factor)
+
+    def _settle(self):
+        self.settled = True
+        self.page_size = self.best_size
+        LOGGER.info('Adaptive page size settled at {} records/page'.format(self.page_size))
+        return self.page_size
+
+    def observe(self, records, seconds, size_bytes=None):
+        """Record a fetched page; return the page size to use for the next page."""
+        # Partial (last) pages say nothing about throughput at this page size
+        if self.settled or records < self.page_size:
+            return self.page_size
+        self._records += records
+        self._seconds += seconds
+        self._bytes += size_bytes or 0
+        self._pages += 1
+        if self._pages < self.sample_pages:
+            return self.page_size
+
+        throughput = self._records / max(self._seconds, 1e-6)
+        LOGGER.info('Adaptive page size: {} records/page, {:.1f} records/sec, {} bytes/page'.format(
+            self.page_size,
+            throughput,
+            self._bytes // self._pages))
+        self._records, self._seconds, self._bytes, self._pages = 0, 0.0, 0, 0
+
+        if self.best_throughput is None or throughput > self.best_throughput * (1 + self.tolerance):
+            self.best_size, self.best_throughput = self.page_size, throughput
+            next_size = self._step(self.page_size)
+            if next_size != self.page_size:
+                self.page_size = next_size
+                return self.page_size
+
+        # No improvement (or at a bound): turn around once, from the best size
+        if self.reversed:
+            return self._settle()
+        self.reversed = True
+        self.direction = -self.direction
+        next_size = self._step(self.best_size)
+        if next_size == self.best_size:
+            return self._settle()
+        self.page_size = next_size
+        return self.page_size
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import singer
+
+LOGGER = singer.get_logger()
+
+# 3PL Central allows 400 calls per 60 seconds
+DEFAULT_RATE_LIMIT = 400
+DEFAULT_RATE_PERIOD = 60
+
+# Calls allowed back to back by default: one, so calls are spaced evenly and no
+#  `period` window ever sees more than `rate` calls
+DEFAULT_RATE_BURST = 1
+
+# On a 429 response the rate is halved (not below MIN_RATE_FRACTION of the
+#  configured rate); each successful call then adds back RATE_INCREASE_FRACTION
+#  of the configured rate (AIMD)
+MIN_RATE_FRACTION = 0.05
+RATE_INCREASE_FRACTION = 0.01
+
+
+class TokenBucket(object):
+    """Thread-safe token-bucket rate limiter shared by all client requests.
+    Allows `rate` calls per `period` seconds on average, with bursts of up to
+    `burst` calls (a burst above 1 lets a `period` window see up to burst - 1
+    calls beyond `rate`). Waiting callers reserve their token while holding the lock and
+    sleep outside it, so they are served in arrival order. slow_down() reacts to a
+    429 response: it halves the current rate, empties the bucket and blocks all
+    calls until the server's Retry-After has passed; the rate then recovers
+    additively on each successful call.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, period=DEFAULT_RATE_PERIOD, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = float(rate) / period
+        self.rate = self.max_rate
+        self.burst = max(float(burst if burst is not None else DEFAULT_RATE_BURST), 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self.throttled_seconds = 0.0
+        self.slowdowns = 0
+
+    def _refill(self, now):
+        # _updated is in the future while a Retry-After block is in effect
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until it is available; return the seconds waited."""
+        wait = self._reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        """Take one token, awaiting until it is available; return the seconds waited."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def _reserve(self):
+        """Take one token; return the seconds until it is available."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            # Tokens only accrue once a Retry-After block has passed
+            start = max(now, self._blocked_until)
+            self._tokens -= 1
+            wait = start - now
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            self.throttled_seconds += wait
+        return wait
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self._refill(self._clock())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_INCREASE_FRACTION)
+
+    def slow_down(self, retry_after=None):
+        """Back off after a 429 response.
+        :param retry_after: seconds to block all calls for (default: one call interval).
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after is None:
+                retry_after = 1 / self.rate
+            # The bucket is empty until the block ends
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._updated = max(self._updated, self._blocked_until)
+            self.slowdowns += 1
+            LOGGER.warning('Rate limited by server: waiting {:.1f} seconds, reducing rate to {:.2f} calls/sec'.format(
+                retry_after, self.rate))
@@ -0,0 +1,254 @@
+import functools
+from singer import metadata
+from singer.transform import breadcrumb_path, string_to_datetime
+
+# Compiles a stream's JSON schema (and selected-field metadata) into a specialized
+#  record transform function, following the same rules as singer.Transformer:
+#  - types are tried in schema order, with "null" always tried last
+#  - anyOf sub-schemas are tried in order
+#  - object properties missing from the schema are removed
+#  - properties not selected (or unsupported) in metadata are removed, unless automatic
+#  - integer/number strings have commas removed, "false" strings are boolean False
+#  - date-time strings are normalized to UTC (singer.utils.strftime format)
+# The schema is walked once, at compile time; the compiled function only visits the
+#  properties present in each record. Like Transformer's removed/filtered sets, the
+#  paths of removed properties (missing from the schema) and filtered properties (not
+#  selected or unsupported) are added to the removed/filtered sets passed to
+#  compile_transformer. A record that does not match the schema raises
+#  TransformMismatch, and callers fall back to singer.Transformer to get its
+#  SchemaMismatch error.
+# Compiled node functions are called as transform(data, parent, key): parent is the
+#  path of the enclosing object or array, as nested (parent, key) pairs (None at the
+#  record), and key the property or index of data in it. The path is only joined into
+#  a string when a property is removed.
+
+
+class TransformMismatch(Exception):
+    """Raised when a value does not match any type in its compiled schema"""
+    pass
+
+
+class UnsupportedSchema(Exception):
+    """Raised at compile time for schema features the compiler does not handle"""
+    pass
+
+
+# Cached date-time normalization; API pages repeat the same timestamps many times
+@functools.lru_cache(maxsize=65536)
+def _string_to_datetime(value):
+    return string_to_datetime(value)
+
+
+# Dotted data path of a removed property, as in Transformer.removed
+def _join_path(path, key):
+    keys = [key]
+    while path is not None:
+        path, parent_key = path
+        keys.append(parent_key)
+    return '.'.join(map(str, reversed(keys)))
+
+
+def _pass_through(data, parent=None, key=None):
+    return data
+
+
+def _to_null(data, parent=None, key=None):
+    if data is None or data == '':
+        return None
+    raise TransformMismatch()
+
+
+def _to_datetime(data, parent=None, key=None):
+    if data is None or data == '':
+        raise TransformMismatch()
+    if isinstance(data, str):
+        result = _string_to_datetime(data)
+    else:
+        result = string_to_datetime(data)
+    if result is None:
+        raise TransformMismatch()
+    return result
+
+
+def _to_string(data, parent=None, key=None):
+    if data is None:
+        raise TransformMismatch()
+    try:
+        return str(data)
+    except Exception:
+        raise TransformMismatch()
+
+
+def _to_integer(data, parent=None, key=None):
+    if isinstance(data, str):
+        data = data.replace(',', '')
+    try:
+        return int(data)
+    except Exception:
+        raise TransformMismatch()
+
+
+def _to_number(data, parent=None, key=None):
+    if isinstance(data, str):
+        data = data.replace(',', '')
+    try:
+        return float(data)
+    except Exception:
+        raise TransformMismatch()
+
+
+def _to_boolean(data, parent=None, key=None):
+    if isinstance(data, str) and data.lower() == 'false':
+        return False
+    try:
+        return bool(data)
+    except Exception:
+        raise TransformMismatch()
+
+
+def _is_dropped(mdata, breadcrumb):
+    if metadata.get(mdata, breadcrumb, 'inclusion') == 'automatic':
+        return False
+    return (metadata.get(mdata, breadcrumb, 'selected') is False) or \
+        (metadata.get(mdata, breadcrumb, 'inclusion') == 'unsupported')
+
+
+def _compile_object(schema, mdata, breadcrumb, paths):
+    if schema.get('patternProperties'):
+        raise UnsupportedSchema('patternProperties')
+    properties = schema.get('properties', {})
+
+    # Don't touch an object without properties
+    if properties == {}:
+        def transform_any_object(data, parent=None, key=None):
+            if not isinstance(data, dict):
+                raise TransformMismatch()
+            return data
+        return transform_any_object
+
+    removed, filtered = paths
+    fields = {}
+    filtered_paths = {}
+    for field, sub_schema in properties.items():
+        field_breadcrumb = breadcrumb + ('properties', field)
+        if mdata and _is_dropped(mdata, field_breadcrumb):
+            filtered_paths[field] = breadcrumb_path(field_breadcrumb)
+            continue
+        fields[field] = compile_node(sub_schema, mdata, field_breadcrumb, paths)
+
+    def transform_object(data, parent=None, key=None):
+        if not isinstance(data, dict):
+            raise TransformMismatch()
+        path = (parent, key) if key is not None else None
+        result = {}
+        for field, value in data.items():
+            transform_field = fields.get(field)
+            if transform_field is not None:
+                result[field] = transform_field(value, path, field)
+            elif field in filtered_paths:
+                filtered.add(filtered_paths[field])
+            else:
+                removed.add(_join_path(path, field))
+        return result
+    return transform_object
+
+
+def _compile_array(schema, mdata, breadcrumb, paths):
+    if 'items' not in schema:
+        raise UnsupportedSchema('array without items')
+    transform_item = compile_node(schema['items'], mdata, breadcrumb + ('items',), paths)
+
+    def transform_array(data, parent=None, key=None):
+        if not isinstance(data, list):
+            raise TransformMismatch()
+        path = (parent, key) if key is not None else None
+        return [transform_item(item, path, index) for index, item in enumerate(data)]
+    return transform_array
+
+
+def _compile_type(typ, schema, mdata, breadcrumb, paths):
+    if typ == 'null':
+        return _to_null
+    if typ == 'string' and schema.get('format') == 'date-time':
+        return _to_datetime
+    if typ == 'string' and schema.get('format') == 'singer.decimal':
+        raise UnsupportedSchema('singer.decimal')
+    if typ == 'string':
+        return _to_string
+    if typ == 'integer':
+        return _to_integer
+    if typ == 'number':
+        return _to_number
+    if typ == 'boolean':
+        return _to_boolean
+    if typ == 'object':
+        return _compile_object(schema, mdata, breadcrumb, paths)
+    if typ == 'array':
+        return _compile_array(schema, mdata, breadcrumb, paths)
+    raise UnsupportedSchema('type {}'.format(typ))
+
+
+def _compile_first_match(transforms):
+    def transform_first_match(data, parent=None, key=None):
+        for transform in transforms:
+            try:
+                return transform(data, parent, key)
+            except TransformMismatch:
+                pass
+        raise TransformMismatch()
+    return transform_first_match
+
+
+def compile_node(schema, mdata=None, breadcrumb=(), paths=None):
+    if paths is None:
+        paths = (set(), set())
+    if 'anyOf' in schema:
+        return _compile_first_match(
+            [compile_node(sub_schema, mdata, breadcrumb, paths) for sub_schema in schema['anyOf']])
+
+    # No typing information, so the value is passed through
+    if 'type' not in schema:
+        return _pass_through
+
+    types = schema['type']
+    if not isinstance(types, list):
+        types = [types]
+    nullable = 'null' in types
+    types = [typ for typ in types if typ != 'null']
+    transforms = [_compile_type(typ, schema, mdata, breadcrumb, paths) for typ in types]
+
+    if nullable:
+        if len(transforms) == 1 and 'boolean' not in types:
+            # Only boolean accepts None (as False); for any other single type, None is null
+            transform_value = transforms[0]
+
+            def transform_nullable(data, parent=None, key=None):
+                if data is None:
+                    return None
+                try:
+                    return transform_value(data, parent, key)
+                except TransformMismatch:
+                    return _to_null(data)
+            return transform_nullable
+        transforms.append(_to_null)
+
+    if len(transforms) == 1:
+        return transforms[0]
+    return _compile_first_match(transforms)
+
+
+def compile_transformer(schema, mdata=None, removed=None, filtered=None):
+    """Compile a stream schema and metadata map into a record transform function.
+    :param schema: stream JSON schema dict.
+    :param mdata: stream metadata map (singer.metadata.to_map).
+    :param removed: set the paths of properties missing from the schema are added to.
+    :param filtered: set the paths of unselected or unsupported properties are added to.
+    :return: function(record) -> transformed record, or None if the schema uses
+        features the compiler does not support (use singer.Transformer instead).
+    """
+    paths = (removed if removed is not None else set(),
+             filtered if filtered is not None else set())
+    try:
+        return compile_node(schema, mdata or {}, (), paths)
+    except UnsupportedSchema:
+        return None
@@ -0,0 +1,145 @@
+import codecs
+import json
+
+# Incremental parsing of API pages: the records in the page's data_key list
+#  (e.g. ResourceList, Summaries) are decoded one at a time from the response body,
+#  so records can be processed and written before the whole page is downloaded and
+#  without materializing the full page dict. Only the stdlib json decoder is used:
+#  each value is decoded with raw_decode from a buffer refilled with body chunks.
+
+WHITESPACE = ' \t\n\r'
+
+
+class _ChunkReader(object):
+    """JSON value reader over an iterable of (bytes or str) body chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self):
+        if self.eof:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            chunk = self.text_decoder.decode(b'', final=True)
+        else:
+            if isinstance(chunk, bytes):
+                chunk = self.text_decoder.decode(chunk)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read_more():
+                raise ValueError('Unexpected end of JSON page')
+
+    def next_char(self):
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def expect(self, expected):
+        char = self.next_char()
+        if char != expected:
+            raise ValueError('Expected {!r} in JSON page, found {!r}'.format(expected, char))
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._read_more():
+                    continue
+                raise
+            # A value ending at the end of the buffer may be truncated (e.g. a number)
+            if end == len(self.buffer) and self._read_more():
+                continue
+            self.pos = end
+            return value
+
+
+class StreamedPage(object):
+    """A page of API results parsed incrementally from the response body.
+    Iterating yields the records of the data_key list (or the single data_key
+    record, if it is an object). All other top-level keys (e.g. TotalResults) are
+    collected in envelope, which is complete once iteration has finished;
+    `key in page` and `page[key]` read the envelope.
+    """
+
+    def __init__(self, chunks, data_key, on_close=None):
+        self.data_key = data_key
+        self.envelope = {}
+        self._reader = _ChunkReader(chunks)
+        self._on_close = on_close
+        self._consumed = False
+
+    def __bool__(self):
+        return True
+
+    def __contains__(self, key):
+        return key in self.envelope
+
+    def __getitem__(self, key):
+        return self.envelope[key]
+
+    def get(self, key, default=None):
+        return self.envelope.get(key, default)
+
+    def close(self):
+        if self._on_close is not None:
+            self._on_close()
+            self._on_close = None
+
+    def __iter__(self):
+        if self._consumed:
+            raise ValueError('StreamedPage can only be iterated once')
+        self._consumed = True
+        try:
+            yield from self._parse()
+        finally:
+            self.close()
+
+    def _parse(self):
+        reader = self._reader
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == self.data_key and reader.peek() == '[':
+                reader.next_char()
+                if reader.peek() == ']':
+                    reader.next_char()
+                else:
+                    while True:
+                        yield reader.value()
+                        char = reader.next_char()
+                        if char == ']':
+                            break
+                        if char != ',':
+                            raise ValueError('Expected , or ] in JSON page, found {!r}'.format(char))
+            elif key == self.data_key:
+                record = reader.value()
+                if record:
+                    yield record
+            else:
+                self.envelope[key] = reader.value()
+            char = reader.next_char()
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError('Expected , or }} in JSON page, found {!r}'.format(char))
@@ -1,16 +1,81 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+import contextvars
+import copy
+import hashlib
+import json
 import math
+import threading
+import time
 import singer
 from singer import metrics, metadata, Transformer, utils
-from tap_3plcentral.transform import transform_json, convert
+from tap_3plcentral import json_codec
+from tap_3plcentral.concurrency import ordered_map, pipeline
+from tap_3plcentral.paging import AdaptivePageSize
+from tap_3plcentral.schema_compiler import compile_transformer, TransformMismatch
+from tap_3plcentral.streaming import StreamedPage
+from tap_3plcentral.transform import transform_json, transform_record, convert
+from tap_3plcentral import writer
 
 LOGGER = singer.get_logger()
 
+# A context variable, so the buffer is local to the current thread or asyncio task
+_OUTPUT = contextvars.ContextVar('tap_3plcentral_output', default=None)
+
+
+# Collects the Singer output (schemas, records, bookmarks) written on the current thread
+#  (or asyncio task) instead of writing it to stdout; replay() writes it out later, in
+#  order, on the thread that owns the real state.
+class OutputBuffer(object):
+    def __init__(self):
+        self.messages = []
+        self._token = None
+
+    def __enter__(self):
+        self._token = _OUTPUT.set(self)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        _OUTPUT.reset(self._token)
+
+    def append(self, message):
+        self.messages.append(message)
+
+    # keep_max: skip bookmarks that would move the state's bookmark backwards
+    def replay(self, state, keep_max=False):
+        for message in self.messages:
+            if message[0] == 'schema':
+                write_schema(message[1], message[2])
+            elif message[0] == 'record':
+                write_record(message[1], message[2], time_extracted=message[3])
+            elif message[0] == 'bookmark':
+                current = get_bookmark(state, message[1], message[2], None) if keep_max else None
+                if current is None or message[3] > current:
+                    write_bookmark(state, message[1], message[2], message[3])
+            elif message[0] == 'parent_bookmark':
+                current = None
+                if keep_max and has_parent_bookmark(state, message[1], message[3]):
+                    current = get_parent_bookmark(state, message[1], message[2], message[3], None)
+                if current is None or message[4] > current:
+                    write_parent_bookmark(state, message[1], message[2], message[3], message[4])
+            elif message[0] == 'clear_bookmark':
+                clear_bookmark(state, message[1])
+        self.messages = []
+
+
+def get_output_buffer():
+    return _OUTPUT.get()
+
 
 def write_schema(catalog, stream_name):
+    output = get_output_buffer()
+    if output is not None:
+        output.append(('schema', catalog, stream_name))
+        return
     stream = catalog.get_stream(stream_name)
     schema = stream.schema.to_dict()
     try:
+        # Buffered records are written before the new schema
+        writer.get_writer().flush()
         singer.write_schema(stream_name, schema, stream.key_properties)
     except OSError as err:
         LOGGER.info('OS Error writing schema for: {}'.format(stream_name))
@@ -18,12 +83,15 @@ def write_schema(catalog, stream_name):
 
 
 def write_record(stream_name, record, time_extracted):
-    try:
-        singer.write_record(stream_name, record, time_extracted=time_extracted)
-    except OSError as err:
-        LOGGER.info('OS Error writing record for: {}'.format(stream_name))
-        LOGGER.info('record: {}'.format(record))
-        raise err
+    output = get_output_buffer()
+    if output is not None:
+        output.append(('record', stream_name, record, time_extracted))
+        return
+    # Records are buffered: write errors are logged by the writer when it flushes
+    writer.get_writer().write_message(singer.RecordMessage(
+        stream=stream_name,
+        record=record,
+        time_extracted=time_extracted))
 
 
 def get_bookmark(state, stream, bookmark_field, default):
@@ -42,10 +110,172 @@ def write_bookmark(state, stream, bookmark_field, value):
     if 'bookmarks' not in state:
         state['bookmarks'] = {}
     state['bookmarks'][stream] = {bookmark_field: value}
+    output = get_output_buffer()
+    if output is not None:
+        output.append(('bookmark', stream, bookmark_field, value))
+        return
     LOGGER.info('Write state for stream: {}, value: {}'.format(stream, value))
-    singer.write_state(state)
+    writer.get_state_emitter().update(state)
+
+
+# Child stream bookmarks are kept per parent record, as
+#  {bookmark_field: <max over all parents>, 'parents': {<parent_id>: <value>}},
+#  so each parent's query uses its own threshold.
+# State from before per-parent bookmarks (no 'parents') gives every parent the stream
+#  bookmark; a parent missing from 'parents' (e.g. a new customer) starts from default.
+# While the first sync with per-parent bookmarks is in progress, the old stream
+#  bookmark is kept as the 'default' of parents not synced yet (see
+#  clear_parent_bookmark_default).
+def get_parent_bookmark(state, stream, bookmark_field, parent_id, default):
+    stream_bookmark = (state or {}).get('bookmarks', {}).get(stream)
+    if isinstance(stream_bookmark, dict) and isinstance(stream_bookmark.get('parents'), dict):
+        return stream_bookmark['parents'].get(str(parent_id), stream_bookmark.get('default', default))
+    return get_bookmark(state, stream, bookmark_field, default)
+
+
+def has_parent_bookmark(state, stream, parent_id):
+    stream_bookmark = (state or {}).get('bookmarks', {}).get(stream)
+    return isinstance(stream_bookmark, dict) and \
+        str(parent_id) in (stream_bookmark.get('parents') or {})
+
+
+def write_parent_bookmark(state, stream, bookmark_field, parent_id, value):
+    if 'bookmarks' not in state:
+        state['bookmarks'] = {}
+    stream_bookmark = state['bookmarks'].get(stream)
+    if not isinstance(stream_bookmark, dict) or not isinstance(stream_bookmark.get('parents'), dict):
+        stream_bookmark = {'parents': {}}
+        legacy_value = get_bookmark(state, stream, bookmark_field, None)
+        if legacy_value is not None:
+            stream_bookmark[bookmark_field] = legacy_value
+            stream_bookmark['default'] = legacy_value
+    stream_max = stream_bookmark.get(bookmark_field)
+    if value is not None and (stream_max is None or value > stream_max):
+        stream_max = value
+    state['bookmarks'][stream] = {
+        **stream_bookmark,
+        bookmark_field: stream_max,
+        'parents': {**stream_bookmark['parents'], str(parent_id): value}
+    }
+    output = get_output_buffer()
+    if output is not None:
+        output.append(('parent_bookmark', stream, bookmark_field, parent_id, value))
+        return
+    LOGGER.info('Write state for stream: {}, parent: {}, value: {}'.format(stream, parent_id, value))
+    writer.get_state_emitter().update(state)
+
+
+# Once the parent stream is complete, every parent has its own bookmark: parents not
+#  listed from then on are new, and start from the start_date. The change is written
+#  with the next STATE message.
+def clear_parent_bookmark_default(state, stream):
+    stream_bookmark = (state or {}).get('bookmarks', {}).get(stream)
+    if isinstance(stream_bookmark, dict):
+        stream_bookmark.pop('default', None)
+
+
+# Write the bookmark of a stream, or of one parent of a child stream (parent_id)
+def write_stream_bookmark(state, stream, bookmark_field, value, parent_id=None):
+    if parent_id is None:
+        write_bookmark(state, stream, bookmark_field, value)
+    else:
+        write_parent_bookmark(state, stream, bookmark_field, parent_id, value)
+
+
+# Remove the bookmarks of a stream from the state; the change is written with the
+#  next STATE message.
+def clear_bookmark(state, stream):
+    state.get('bookmarks', {}).pop(stream, None)
+    output = get_output_buffer()
+    if output is not None:
+        output.append(('clear_bookmark', stream))
+
 
+# Compiled per-stream record processing, built once per stream per run and reused
+#  across all pages and child invocations: the schema dict and metadata map are read
+#  from the catalog once and compiled into a record transform function (schema_compiler),
+#  and parsed datetime bookmark thresholds are cached. Records the compiled transform
+#  rejects go through singer's Transformer, one per thread (with its own schema copy,
+#  since Transformer reorders schema types in place), which raises SchemaMismatch.
+class RecordProcessor(object):
+    def __init__(self, catalog, stream_name):
+        stream = catalog.get_stream(stream_name)
+        self.stream_name = stream_name
+        self.schema = stream.schema.to_dict()
+        self.stream_metadata = metadata.to_map(stream.metadata)
+        # Paths removed/filtered by the compiled transform, logged by close()
+        self.removed = set()
+        self.filtered = set()
+        self.compiled_transform = compile_transformer(
+            self.schema, self.stream_metadata, self.removed, self.filtered)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._transformers = []
+        self._thresholds = {}
 
+    def _get_thread_transformer(self):
+        transformer = getattr(self._local, 'transformer', None)
+        if transformer is None:
+            transformer = Transformer()
+            self._local.transformer = transformer
+            self._local.schema = copy.deepcopy(self.schema)
+            with self._lock:
+                self._transformers.append(transformer)
+        return transformer
+
+    def transform(self, record):
+        if self.compiled_transform is not None:
+            try:
+                return self.compiled_transform(record)
+            except TransformMismatch:
+                pass
+        transformer = self._get_thread_transformer()
+        return transformer.transform(record, self._local.schema, self.stream_metadata)
+
+    def parse_datetime(self, value):
+        return self._get_thread_transformer()._transform_datetime(value)
+
+    # Parsed last_datetime, parsed once per distinct bookmark value
+    def datetime_threshold(self, last_datetime):
+        if last_datetime not in self._thresholds:
+            self._thresholds[last_datetime] = self.parse_datetime(last_datetime)
+        return self._thresholds[last_datetime]
+
+    # Log the paths filtered/removed by the transforms (compiled and Transformer) of
+    #  the whole run, once, as Transformer does on exit
+    def close(self):
+        with self._lock:
+            report = Transformer()
+            report.removed = set(self.removed)
+            report.filtered = set(self.filtered)
+            for transformer in self._transformers:
+                report.removed.update(transformer.removed)
+                report.filtered.update(transformer.filtered)
+            report.log_warning()
+            self._transformers = []
+            self.removed.clear()
+            self.filtered.clear()
+
+
+# Get the RecordProcessor for a stream from the run's processors cache (or a new one)
+def get_record_processor(processors, catalog, stream_name):
+    if processors is None:
+        return RecordProcessor(catalog, stream_name)
+    processor = processors.get(stream_name)
+    if processor is None:
+        processor = processors.setdefault(stream_name, RecordProcessor(catalog, stream_name))
+    return processor
+
+
+# Transform a record for Singer.io; for a child object, add the parent_id to the record
+def prepare_record(record, processor, parent=None, parent_id=None):
+    if parent_id and parent:
+        record[parent + '_id'] = parent_id
+    return processor.transform(record)
+
+
+# With transformed=True, records have already been through prepare_record (on the
+#  transform stage of the pipeline), and are only filtered and written.
 def process_records(catalog, #pylint: disable=too-many-branches
                     stream_name,
                     records,
@@ -56,50 +286,390 @@ def process_records(catalog, #pylint: disable=too-many-branches
                     last_datetime=None,
                     last_integer=None,
                     parent=None,
-                    parent_id=None):
-    stream = catalog.get_stream(stream_name)
-    schema = stream.schema.to_dict()
-    stream_metadata = metadata.to_map(stream.metadata)
+                    parent_id=None,
+                    processor=None,
+                    transformed=False):
+    if processor is None:
+        processor = RecordProcessor(catalog, stream_name)
+    if bookmark_field and bookmark_type == 'datetime':
+        last_dttm = processor.datetime_threshold(last_datetime)
 
     with metrics.record_counter(stream_name) as counter:
         for record in records:
-            # If child object, add parent_id to record
-            if parent_id and parent:
-                record[parent + '_id'] = parent_id
-
-            # Transform record for Singer.io
-            with Transformer() as transformer:
-                transformed_record = transformer.transform(record,
-                                               schema,
-                                               stream_metadata)
-
-                # Reset max_bookmark_value to new value if higher
-                if bookmark_field and (bookmark_field in transformed_record):
-                    if (max_bookmark_value is None) or \
-                        (transformed_record[bookmark_field] > max_bookmark_value):
-                        max_bookmark_value = transformed_record[bookmark_field]
-
-                if bookmark_field:
-                    if bookmark_field in transformed_record:
-                        if bookmark_type == 'integer':
-                            # Keep only records whose bookmark is after the last_integer
-                            if transformed_record[bookmark_field] >= last_integer:
-                                write_record(stream_name, transformed_record, time_extracted=time_extracted)
-                                counter.increment()
-                        elif bookmark_type == 'datetime':
-                            last_dttm = transformer._transform_datetime(last_datetime)
-                            bookmark_dttm = transformer._transform_datetime(transformed_record[bookmark_field])
-                            # Keep only records whose bookmark is after the last_datetime
-                            if bookmark_dttm >= last_dttm:
-                                write_record(stream_name, transformed_record, time_extracted=time_extracted)
-                                counter.increment()
-                else:
-                    write_record(stream_name, transformed_record, time_extracted=time_extracted)
-                    counter.increment()
+            if transformed:
+                transformed_record = record
+            else:
+                transformed_record = prepare_record(record, processor, parent, parent_id)
+
+            # Reset max_bookmark_value to new value if higher
+            if bookmark_field and (bookmark_field in transformed_record):
+                if (max_bookmark_value is None) or \
+                    (transformed_record[bookmark_field] > max_bookmark_value):
+                    max_bookmark_value = transformed_record[bookmark_field]
+
+            if bookmark_field:
+                if bookmark_field in transformed_record:
+                    if bookmark_type == 'integer':
+                        # Keep only records whose bookmark is after the last_integer
+                        if transformed_record[bookmark_field] >= last_integer:
+                            write_record(stream_name, transformed_record, time_extracted=time_extracted)
+                            counter.increment()
+                    elif bookmark_type == 'datetime':
+                        bookmark_dttm = processor.parse_datetime(transformed_record[bookmark_field])
+                        # Keep only records whose bookmark is after the last_datetime
+                        if bookmark_dttm >= last_dttm:
+                            write_record(stream_name, transformed_record, time_extracted=time_extracted)
+                            counter.increment()
+            else:
+                write_record(stream_name, transformed_record, time_extracted=time_extracted)
+                counter.increment()
 
         return max_bookmark_value, counter.value
 
 
+# Number of pages fetched concurrently after page 1 (1 = serial, one page at a time)
+def get_page_workers(config):
+    return max(int((config or {}).get('page_workers', 1)), 1)
+
+
+# Parse pages incrementally (client.get_streamed) instead of loading each page at once
+def get_stream_pages(config):
+    return str((config or {}).get('stream_pages', False)).lower() == 'true'
+
+
+# Pages queued between the fetch, transform and write stages of sync_endpoint
+#  (0 = no pipeline: pages are fetched, transformed and written on one thread)
+def get_pipeline_queue_size(config):
+    config = config or {}
+    if str(config.get('pipeline_stages', False)).lower() != 'true':
+        return 0
+    return max(int(config.get('pipeline_queue_size', 2)), 1)
+
+
+# Pages synced between page checkpoints of FULL_TABLE streams (0 = no checkpoints)
+def get_page_checkpoint_interval(config):
+    return max(int((config or {}).get('page_checkpoint_interval', 0)), 0)
+
+
+# Signature of the query (path, sort, filters and page size) a page checkpoint belongs
+#  to; a checkpoint is only resumed by a sync with the same query.
+def get_page_signature(path, params):
+    query = json.dumps({'path': path, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+
+
+# Last checkpointed page of a stream for the signature (0 = none)
+def get_page_checkpoint(state, stream_name, signature):
+    checkpoint = get_bookmark(state, stream_name, 'page_checkpoint', None)
+    if not isinstance(checkpoint, dict) or checkpoint.get('signature') != signature:
+        return 0
+    return int(checkpoint.get('page', 0))
+
+
+# Key of the last record of the last checkpointed keyset page, for the signature
+#  (None = none)
+def get_page_checkpoint_key(state, stream_name, signature):
+    checkpoint = get_bookmark(state, stream_name, 'page_checkpoint', None)
+    if not isinstance(checkpoint, dict) or checkpoint.get('signature') != signature or \
+        not isinstance(checkpoint.get('key'), list):
+        return None
+    return tuple(checkpoint['key'])
+
+
+# key: with keyset pagination, the key of the page's last record
+def write_page_checkpoint(state, stream_name, page, signature, key=None):
+    checkpoint = {'page': page, 'signature': signature}
+    if key is not None:
+        checkpoint['key'] = list(key)
+    write_bookmark(state, stream_name, 'page_checkpoint', checkpoint)
+
+
+# Get one page of data from the API.
+# Returns the page data and time_extracted (datetime when the data was extracted from the API).
+# With a streamed_data_key, the page is a StreamedPage whose records are parsed as read.
+def fetch_page(client, path, params, stream_name, streamed_data_key=None):
+    # Squash params to query-string params
+    querystring = '&'.join(['%s=%s' % (key, value) for (key, value) in params.items()])
+    if streamed_data_key:
+        data = client.get_streamed(
+            path,
+            streamed_data_key,
+            querystring=querystring,
+            endpoint=stream_name)
+    else:
+        data = client.get(
+            path,
+            querystring=querystring,
+            endpoint=stream_name)
+    return data, utils.now()
+
+
+# Total number of pages for an endpoint, based on the TotalResults of a page of data.
+def get_total_pages(data, page_size):
+    if data and 'TotalResults' in data:
+        total_records = data['TotalResults']
+        if total_records < page_size:
+            return 1
+        return math.ceil(total_records / page_size)
+    return 1
+
+
+# Yield (page, data, time_extracted) for each page of an endpoint, in page order,
+#  from first_page (pages before it were synced by an interrupted run).
+# Serially, total_pages is re-read from every page. With page_workers > 1, page 1 is
+#  fetched alone to learn TotalResults, then pages 2..N are prefetched concurrently
+#  (bounded by page_workers) and still yielded in page order.
+def iter_pages(get_page, page_size, page_workers=1, first_page=1):
+    page = first_page
+    total_pages = first_page  # initial value, set with first API call
+    while page <= total_pages:
+        data, time_extracted = get_page(page)
+        yield page, data, time_extracted
+        total_pages = get_total_pages(data, page_size)
+        page = page + 1
+        if page_workers > 1 and page <= total_pages:
+            break
+    else:
+        return
+
+    remaining_pages = range(page, total_pages + 1)
+    prefetched = ordered_map(get_page, remaining_pages, page_workers)
+    for page, (data, time_extracted) in zip(remaining_pages, prefetched):
+        yield page, data, time_extracted
+
+
+# Keyset (seek) pagination for endpoints with keyset_fields
+def get_keyset_pagination(config):
+    return str((config or {}).get('keyset_pagination', False)).lower() == 'true'
+
+
+# RQL predicate for the records sorted after last_key, on the keyset_fields
+#  [(query_field, record_field), ...]: k1 > v1, or k1 == v1 and k2 > v2, and so on.
+def get_keyset_rql(keyset_fields, last_key):
+    clauses = []
+    for i, (query_field, _) in enumerate(keyset_fields):
+        equal = ['{}=={}'.format(field, value)
+                 for (field, _), value in zip(keyset_fields[:i], last_key[:i])]
+        clauses.append(';'.join(equal + ['{}=gt={}'.format(query_field, last_key[i])]))
+    if len(clauses) == 1:
+        return clauses[0]
+    return '({})'.format(','.join(
+        '({})'.format(clause) if ';' in clause else clause for clause in clauses))
+
+
+# Key (record_field values of keyset_fields) of a raw API record, as transformed
+def get_keyset_key(record, stream_name, keyset_fields):
+    transformed_record = transform_record(record, stream_name)
+    key = tuple(transformed_record.get(record_field) for _, record_field in keyset_fields)
+    if None in key:
+        raise ValueError('{} - keyset field missing from record: {}'.format(
+            stream_name, [record_field for _, record_field in keyset_fields]))
+    return key
+
+
+# Yield (page, data, time_extracted) for each page of an endpoint with keyset (seek)
+#  pagination: every page is requested as the first page of the records sorted after
+#  the key of the previous page's last record (get_page_after(last_key), None for the
+#  first page), so page cost does not grow with depth and records changing mid-scan
+#  do not shift between pages. Raises ValueError, before yielding the page, when a
+#  page does not start after last_key (the server ignored the predicate or sort), as
+#  the scan would otherwise repeat records or never end. A resumed scan starts at
+#  first_page, with the records after first_key.
+def iter_keyset_pages(get_page_after, data_key, page_size, get_key, first_page=1, first_key=None):
+    page = first_page
+    last_key = first_key
+    while True:
+        data, time_extracted = get_page_after(last_key)
+        records = data.get(data_key) if isinstance(data, dict) else None
+        if last_key is not None and isinstance(records, list) and records:
+            first_key = get_key(records[0])
+            if not first_key > last_key:
+                raise ValueError(
+                    'Keyset page {} does not start after the key of the previous page ({} <= {}): '
+                    'the endpoint does not support keyset pagination, disable keyset_pagination'.format(
+                        page, first_key, last_key))
+        yield page, data, time_extracted
+        if not isinstance(records, list) or len(records) < page_size:
+            return
+        last_key = get_key(records[-1])
+        page = page + 1
+
+
+# Adaptive page size settings: (min_page_size, max_page_size), or None when disabled
+def get_adaptive_page_size(config):
+    config = config or {}
+    if str(config.get('adaptive_page_size', False)).lower() != 'true':
+        return None
+    return int(config.get('min_page_size', 50)), int(config.get('max_page_size', 1000))
+
+
+# Yield (page, data, time_extracted) for each page of an endpoint, in order, letting
+#  the tuner (paging.AdaptivePageSize) change pgsiz between pages from the measured
+#  latency of each page. Pages are tracked by record offset: after a page size change,
+#  the next request is the page of the new size that contains the offset, and records
+#  before the offset (already synced) are dropped from its data_key list.
+def iter_adaptive_pages(get_sized_page, data_key, tuner, get_response_size=None):
+    page = 0
+    offset = 0 # records synced so far
+    while True:
+        page_size = tuner.page_size
+        pgnum = offset // page_size + 1
+        skip = offset % page_size
+        start = time.monotonic()
+        data, time_extracted = get_sized_page(pgnum, page_size)
+        seconds = time.monotonic() - start
+
+        records = data.get(data_key) if isinstance(data, dict) else None
+        if not isinstance(records, list):
+            yield page + 1, data, time_extracted
+            return
+        if skip:
+            data = {**data, data_key: records[skip:]}
+        page = page + 1
+        offset = offset + len(records) - skip
+        yield page, data, time_extracted
+
+        total_records = data.get('TotalResults')
+        if len(records) < page_size or (total_records is not None and offset >= total_records):
+            return
+        tuner.observe(len(records), seconds, get_response_size() if get_response_size else None)
+
+
+# Get the latest bookmark for the stream (for a child stream, of the parent_id)
+#  and set the last_integer/datetime
+# Returns last_datetime, last_integer and the initial max_bookmark_value
+def get_last_bookmark(state, stream_name, bookmark_field, bookmark_type, start_date, parent_id=None):
+    def get_value(default):
+        if parent_id is None:
+            return get_bookmark(state, stream_name, bookmark_field, default)
+        return get_parent_bookmark(state, stream_name, bookmark_field, parent_id, default)
+
+    last_datetime = None
+    last_integer = None
+    max_bookmark_value = None
+    if bookmark_type == 'integer':
+        last_integer = get_value(0)
+        max_bookmark_value = last_integer
+    else:
+        last_datetime = get_value(start_date)
+        max_bookmark_value = last_datetime
+    return last_datetime, last_integer, max_bookmark_value
+
+
+# Query params (without pgnum) and page size for an endpoint.
+def get_endpoint_params(static_params,
+                        bookmark_query_field=None,
+                        bookmark_type=None,
+                        last_datetime=None,
+                        last_integer=None,
+                        window_end=None):
+    # pagination: loop thru all pages of data
+    # Each page has an pgnum (page number) and a 
+    #   pgsiz (page size from the endpoint = batch size, number of records)
+    # Loop through pages, increase the "pgnum" by 1 for each "pgsiz" batch of records.
+    # Continue until the "offset" exceeds the total_records.
+    params = {
+        **static_params # adds in endpoint specific, sort, filter params
+    }
+
+    if 'pgsiz' in params:
+        page_size = params['pgsiz']
+    else:
+        page_size = 100
+
+    # Resource Query Language (RQL) is used to filter data. Reference: http://api.3plcentral.com/rels/rql
+    if bookmark_query_field:
+        if 'rql' in params:
+            if bookmark_type == 'datetime':
+                params['rql'] = '{};{}=ge={}'.format(params['rql'], bookmark_query_field, last_datetime)
+            elif bookmark_type == 'integer':
+                params['rql'] = '{};{}=ge={}'.format(params['rql'], bookmark_query_field, last_integer)
+        else:
+            if bookmark_type == 'datetime':
+                params['rql'] = '{}=ge={}'.format(bookmark_query_field, last_datetime)
+            elif bookmark_type == 'integer':
+                params['rql'] = '{}=ge={}'.format(bookmark_query_field, last_integer)
+        # Upper bound of a date window (see sync_date_windows)
+        if window_end is not None:
+            params['rql'] = '{};{}=lt={}'.format(params['rql'], bookmark_query_field, window_end)
+
+    return params, page_size
+
+
+# Days per date window for INCREMENTAL datetime streams (0 = no windows)
+def get_date_window_days(config):
+    return float((config or {}).get('date_window_days', 0))
+
+
+# Number of date windows synced concurrently (1 = serial)
+def get_window_workers(config):
+    return max(int((config or {}).get('window_workers', 1)), 1)
+
+
+# Split [start_datetime, end) into windows of window_days, as (start, end) bookmark
+#  strings; the last window has no end, so records modified during the sync are
+#  included (as they are without windows).
+def get_date_windows(start_datetime, end, window_days):
+    windows = []
+    window_start = start_datetime
+    window_start_dttm = utils.strptime_to_utc(start_datetime)
+    step = timedelta(days=window_days)
+    while window_start_dttm + step < end:
+        window_start_dttm = window_start_dttm + step
+        window_end = utils.strftime(window_start_dttm)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    windows.append((window_start, None))
+    return windows
+
+
+# Sync an endpoint one date window at a time: sync_window(window, state) syncs the
+#  records with start <= bookmark_query_field < end. With window_workers > 1, windows
+#  are synced concurrently, each against its own copy of the state and with its output
+#  buffered, and replayed in window order, keeping the max of each bookmark, so the
+#  state matches a serial sync. So the stream bookmark only moves past a window once
+#  all earlier windows have been written.
+def sync_date_windows(sync_window, state, stream_name, windows, window_workers=1):
+    def sync_window_buffered(job):
+        window, window_state = job
+        with OutputBuffer() as output:
+            window_total_records = sync_window(window, window_state)
+        return window, output, window_total_records
+
+    if window_workers > 1:
+        jobs = ((window, copy.deepcopy(state)) for window in windows)
+        results = ordered_map(sync_window_buffered, jobs, window_workers)
+    else:
+        results = ((window, None, sync_window(window, state)) for window in windows)
+
+    total_records = 0
+    for window, output, window_total_records in results:
+        if output is not None:
+            output.replay(state, keep_max=True)
+        total_records = total_records + window_total_records
+        LOGGER.info('{} - Synced window: {} to {}, total_records: {}'.format(
+            stream_name,
+            window[0],
+            window[1] or 'now',
+            window_total_records))
+    return total_records
+
+
+# Transformed records of a (fully loaded) page of data, as a list.
+def get_page_records(data, stream_name, data_key):
+    # Transform raw data with transform_json from transform.py
+    transformed_data = []
+    if data_key is None:
+        transformed_data = transform_json(data, stream_name, 'ResourceList')[convert(
+            'ResourceList')]
+    elif data_key in data:
+        transformed_data = transform_json(data, stream_name, data_key)[convert(data_key)]
+    # If transformed_data is a single-record dict, add it to a list
+    if isinstance(transformed_data, dict):
+        transformed_data = [transformed_data]
+    return transformed_data
+
+
 # Sync a specific parent or child endpoint.
 def sync_endpoint(client, #pylint: disable=too-many-branches
                   catalog,
@@ -115,176 +685,396 @@ def sync_endpoint(client, #pylint: disable=too-many-branches
                   bookmark_type=None,
                   id_fields=None,
                   parent=None,
-                  parent_id=None):
+                  parent_id=None,
+                  config=None,
+                  processors=None,
+                  date_window=None):
 
-    # Get the latest bookmark for the stream and set the last_integer/datetime
-    last_datetime = None
-    last_integer = None
-    max_bookmark_value = None
-    if bookmark_type == 'integer':
-        last_integer = get_bookmark(state, stream_name, bookmark_field, 0)
-        max_bookmark_value = last_integer
-    else:
-        last_datetime = get_bookmark(state, stream_name, bookmark_field, start_date)
+    # Child streams are bookmarked per parent
+    bookmark_parent_id = parent_id if parent else None
+    last_datetime, last_integer, max_bookmark_value = get_last_bookmark(
+        state, stream_name, bookmark_field, bookmark_type, start_date, bookmark_parent_id)
+
+    # INCREMENTAL datetime streams (orders, sku_items) in date windows: each window
+    #  is synced by this function with date_window=(start, end)
+    date_window_days = get_date_window_days(config)
+    if date_window is None and date_window_days > 0 and \
+        bookmark_query_field and bookmark_type == 'datetime':
+        def sync_window(window, window_state):
+            return sync_endpoint(
+                client=client,
+                catalog=catalog,
+                state=window_state,
+                start_date=start_date,
+                stream_name=stream_name,
+                path=path,
+                endpoint_config=endpoint_config,
+                data_key=data_key,
+                static_params=static_params,
+                bookmark_query_field=bookmark_query_field,
+                bookmark_field=bookmark_field,
+                bookmark_type=bookmark_type,
+                id_fields=id_fields,
+                parent=parent,
+                parent_id=parent_id,
+                config=config,
+                processors=processors,
+                date_window=window)
+
+        write_schema(catalog, stream_name)
+        total_records = sync_date_windows(
+            sync_window,
+            state,
+            stream_name,
+            get_date_windows(last_datetime, utils.now(), date_window_days),
+            get_window_workers(config))
+
+        # A parent without records in any window keeps the threshold it was synced from
+        if bookmark_field and bookmark_parent_id is not None and \
+            not has_parent_bookmark(state, stream_name, bookmark_parent_id):
+            write_parent_bookmark(state, stream_name, bookmark_field, bookmark_parent_id, max_bookmark_value)
+        return total_records
+
+    window_end = None
+    if date_window is not None:
+        last_datetime, window_end = date_window
         max_bookmark_value = last_datetime
 
-    write_schema(catalog, stream_name)
+    # Date windows share the SCHEMA message written before them
+    if date_window is None:
+        write_schema(catalog, stream_name)
+    processor = get_record_processor(processors, catalog, stream_name)
 
-    # pagination: loop thru all pages of data
-    # Each page has an pgnum (page number) and a 
-    #   pgsiz (page size from the endpoint = batch size, number of records)
-    # Loop through pages, increase the "pgnum" by 1 for each "pgsiz" batch of records.
-    # Continue until the "offset" exceeds the total_records.
+    params, page_size = get_endpoint_params(
+        static_params, bookmark_query_field, bookmark_type, last_datetime, last_integer,
+        window_end=window_end)
+
+    LOGGER.info('{} - Sync start'.format(
+        stream_name,
+        'since: {}, '.format(last_datetime) if bookmark_query_field else ''))
+
+    streamed_data_key = (data_key or 'ResourceList') if get_stream_pages(config) else None
+
+    def get_page(page):
+        return fetch_page(client, path, {'pgnum': page, **params}, stream_name,
+                          streamed_data_key=streamed_data_key)
+
+    # Children synced per parent record vs. once per run (fixed_parent_id)
+    children = endpoint_config.get('children') or {}
+    parent_children = {name: child for name, child in children.items()
+                       if 'fixed_parent_id' not in child}
+    fixed_parent_children = {name: child for name, child in children.items()
+                             if 'fixed_parent_id' in child}
+
+    keyset_fields = endpoint_config.get('keyset_fields')
+    if not get_keyset_pagination(config) or streamed_data_key:
+        keyset_fields = None
+
+    # FULL_TABLE streams: resume an interrupted sync after its last checkpointed page
+    checkpoint_signature = None
+    checkpoint_interval = get_page_checkpoint_interval(config) if not bookmark_field else 0
+    first_page = 1
+    tuner = None
+    adaptive_page_size = get_adaptive_page_size(config)
+    if keyset_fields:
+        # Sorted on the keyset fields; each page filtered to the records after the last
+        keyset_params = {**params, 'sort': ','.join(field for field, _ in keyset_fields)}
+        first_key = None
+        if checkpoint_interval:
+            checkpoint_signature = get_page_signature(path, keyset_params)
+            first_key = get_page_checkpoint_key(state, stream_name, checkpoint_signature)
+            if first_key is not None:
+                first_page = get_page_checkpoint(state, stream_name, checkpoint_signature) + 1
+                LOGGER.info('{} - Resuming after checkpointed page: {}, key: {}'.format(
+                    stream_name, first_page - 1, first_key))
+
+        def get_page_after(last_key):
+            page_params = dict(keyset_params)
+            if last_key is not None:
+                keyset_rql = get_keyset_rql(keyset_fields, last_key)
+                if 'rql' in page_params:
+                    page_params['rql'] = '{};{}'.format(page_params['rql'], keyset_rql)
+                else:
+                    page_params['rql'] = keyset_rql
+            return fetch_page(client, path, {'pgnum': 1, **page_params}, stream_name)
+
+        pages = iter_keyset_pages(
+            get_page_after,
+            data_key or 'ResourceList',
+            page_size,
+            lambda record: get_keyset_key(record, stream_name, keyset_fields),
+            first_page,
+            first_key)
+    elif adaptive_page_size and not streamed_data_key:
+        if checkpoint_interval:
+            LOGGER.warning('{} - page_checkpoint_interval is not supported with adaptive_page_size: '
+                           'pages are not checkpointed'.format(stream_name))
+        def get_sized_page(page, size):
+            return fetch_page(client, path, {**params, 'pgnum': page, 'pgsiz': size}, stream_name)
+
+        tuner = AdaptivePageSize(page_size, *adaptive_page_size)
+        pages = iter_adaptive_pages(
+            get_sized_page,
+            data_key or 'ResourceList',
+            tuner,
+            lambda: getattr(client, 'last_response_size', None))
+    else:
+        if checkpoint_interval:
+            checkpoint_signature = get_page_signature(path, params)
+            first_page = get_page_checkpoint(state, stream_name, checkpoint_signature) + 1
+            if first_page > 1:
+                LOGGER.info('{} - Resuming after checkpointed page: {}'.format(
+                    stream_name, first_page - 1))
+        pages = iter_pages(get_page, page_size, get_page_workers(config), first_page)
+
+    # Pipeline: pages are fetched on one thread and transformed (transform_json and
+    #  the record transforms) on another, while this thread writes the previous page,
+    #  its children and its bookmark, in page order.
+    pipeline_queue_size = get_pipeline_queue_size(config)
+    if pipeline_queue_size and not streamed_data_key:
+        def transform_page(fetched_page):
+            page, data, time_extracted = fetched_page
+            if not data:
+                return page, data, time_extracted, None
+            page_records = get_page_records(data, stream_name, data_key)
+            prepared_records = [prepare_record(record, processor, parent, parent_id)
+                                for record in page_records]
+            return page, data, time_extracted, (page_records, prepared_records)
+
+        pages = pipeline(pages, transform_page, pipeline_queue_size)
+    else:
+        pages = ((page, data, time_extracted, None) for page, data, time_extracted in pages)
 
-    page = 1
-    total_pages = 1  # initial value, set with first API call
     total_records = 0 # total number of result records (across all batches)
-    while page <= total_pages:
-        params = {
-            'pgnum': page,
-            **static_params # adds in endpoint specific, sort, filter params
-        }
+    synced_records = 0 # result records of the pages synced so far
+    try:
+        for page, data, time_extracted, transformed_page in pages:
+            if not data or data is None or data == []:
+                break # No data results
 
-        if 'pgsiz' in params:
-            page_size = params['pgsiz']
-        else:
-            page_size = 100
-
-        # Resource Query Language (RQL) is used to filter data. Reference: http://api.3plcentral.com/rels/rql
-        if bookmark_query_field:
-            if 'rql' in params:
-                if bookmark_type == 'datetime':
-                    params['rql'] = '{};{}=ge={}'.format(params['rql'], bookmark_query_field, last_datetime)
-                elif bookmark_type == 'integer':
-                    params['rql'] = '{};{}=ge={}'.format(params['rql'], bookmark_query_field, last_integer)
+            if isinstance(data, StreamedPage):
+                # Records are transformed and written as they are parsed from the response
+                transformed_data = (transform_record(record, stream_name) for record in data)
+                if parent_children:
+                    transformed_data = list(transformed_data) # children need the parent records
+                records = transformed_data
+            elif transformed_page is not None:
+                transformed_data, records = transformed_page
+                if not transformed_data:
+                    break # No data results
             else:
-                if bookmark_type == 'datetime':
-                    params['rql'] = '{}=ge={}'.format(bookmark_query_field, last_datetime)
-                elif bookmark_type == 'integer':
-                    params['rql'] = '{}=ge={}'.format(bookmark_query_field, last_integer)
+                transformed_data = get_page_records(data, stream_name, data_key)
+                if not transformed_data:
+                    break # No data results
+                records = transformed_data
 
-        LOGGER.info('{} - Sync start'.format(
-            stream_name,
-            'since: {}, '.format(last_datetime) if bookmark_query_field else ''))
+            # Process records and get the max_bookmark_value and record_count for the set of records
+            max_bookmark_value, record_count = process_records(
+                catalog=catalog,
+                stream_name=stream_name,
+                records=records,
+                time_extracted=time_extracted,
+                bookmark_field=bookmark_field,
+                bookmark_type=bookmark_type,
+                max_bookmark_value=max_bookmark_value,
+                last_datetime=last_datetime,
+                last_integer=last_integer,
+                parent=parent,
+                parent_id=parent_id,
+                processor=processor,
+                transformed=transformed_page is not None)
+            if isinstance(data, StreamedPage) and not record_count and not data.get('TotalResults'):
+                break # No data results
 
-        # Squash params to query-string params
-        querystring = '&'.join(['%s=%s' % (key, value) for (key, value) in params.items()])
+            # set total_records for the endpoint
+            # With keyset pagination, later pages (and the first page of a resumed scan)
+            #  only count the records after their key
+            if not keyset_fields or page == first_page:
+                total_pages = get_total_pages(data, page_size)
+                if keyset_fields:
+                    total_pages = total_pages + first_page - 1
+                if 'TotalResults' in data:
+                    total_records = data['TotalResults']
+                else:
+                    total_records = record_count
 
-        # Get data, API request
-        data = client.get(
-            path,
-            querystring=querystring,
-            endpoint=stream_name)
-        # time_extracted: datetime when the data was extracted from the API
-        time_extracted = utils.now()
-        if not data or data is None or data == []:
-            break # No data results
-
-        # Transform raw data with transform_json from transform.py
-        if data_key is None:
-            transformed_data = transform_json(data, stream_name, 'ResourceList')[convert(
-                'ResourceList')]
-        elif data_key in data:
-            transformed_data = transform_json(data, stream_name, data_key)[convert(data_key)]
-        # LOGGER.info('transformed_data = {}'.format(transformed_data))
-        # If transformed_data is a single-record dict, add it to a list
-        if isinstance(transformed_data, dict):
-            # rec_ids = {}
-            tdata = []
-            tdata.append(transformed_data)
-            transformed_data = tdata
-        if not transformed_data or transformed_data is None:
-            break # No data results
-
-        # Process records and get the max_bookmark_value and record_count for the set of records
-        max_bookmark_value, record_count = process_records(
+            # Loop thru parent batch records for each children objects (if should stream)
+            if parent_children:
+                sync_children(
+                    client=client,
+                    catalog=catalog,
+                    state=state,
+                    start_date=start_date,
+                    stream_name=stream_name,
+                    children=parent_children,
+                    records=transformed_data,
+                    id_fields=id_fields,
+                    config=config,
+                    processors=processors)
+
+            # Update the state with the max_bookmark_value for the stream
+            if bookmark_field:
+                write_stream_bookmark(state,
+                                      stream_name,
+                                      bookmark_field,
+                                      max_bookmark_value,
+                                      bookmark_parent_id)
+
+            # Checkpoint the page (and its children) as synced
+            if checkpoint_signature and page % checkpoint_interval == 0:
+                checkpoint_key = None
+                if keyset_fields:
+                    checkpoint_key = get_keyset_key(
+                        data[data_key or 'ResourceList'][-1], stream_name, keyset_fields)
+                write_page_checkpoint(state, stream_name, page, checkpoint_signature, checkpoint_key)
+
+            # With adaptive page sizes, pages are fetches of varying size: progress is
+            #  reported in records, as a page total from page_size would be meaningless
+            if tuner is not None:
+                synced_records = synced_records + len(transformed_data)
+                LOGGER.info('{} - Synced - page: {}, records: {} of {}'.format(
+                    stream_name,
+                    page,
+                    synced_records,
+                    total_records))
+            else:
+                LOGGER.info('{} - Synced - page: {}, total pages: {}'.format(
+                    stream_name,
+                    page,
+                    total_pages))
+    finally:
+        # Stop fetching (and the pipeline stages) if the loop ended before the last page,
+        #  or raised
+        pages.close()
+
+    # The stream is complete: the next sync starts from page 1
+    if checkpoint_signature:
+        clear_bookmark(state, stream_name)
+
+    # A parent without records keeps the threshold it was synced from, so it is not
+    #  synced from start_date again (after all its date windows, when windowed)
+    if bookmark_field and bookmark_parent_id is not None and date_window is None and \
+        not has_parent_bookmark(state, stream_name, bookmark_parent_id):
+        write_parent_bookmark(state, stream_name, bookmark_field, bookmark_parent_id, max_bookmark_value)
+
+    # Children that do not depend on the parent id are synced once, after all pages
+    if fixed_parent_children:
+        sync_children(
+            client=client,
             catalog=catalog,
+            state=state,
+            start_date=start_date,
             stream_name=stream_name,
-            records=transformed_data,
-            time_extracted=time_extracted,
-            bookmark_field=bookmark_field,
-            bookmark_type=bookmark_type,
-            max_bookmark_value=max_bookmark_value,
-            last_datetime=last_datetime,
-            last_integer=last_integer,
-            parent=parent,
-            parent_id=parent_id)
-
-        # set page and total_pages for pagination
-        if 'TotalResults' in data:
-            total_records = data['TotalResults']
-            if total_records < page_size:
-                total_pages = 1
-            else:
-                total_pages = math.ceil(total_records / page_size)
-        else:
-            total_pages = 1
-            total_records = record_count
-
-        # Loop thru parent batch records for each children objects (if should stream)
-        children = endpoint_config.get('children')
-        if children:
-            for child_stream_name, child_endpoint_config in children.items():
-                should_stream, last_stream_child = should_sync_stream(get_selected_streams(catalog),
-                                                            None,
-                                                            child_stream_name)
-                if should_stream:
-                    # For each parent record
-                    for record in transformed_data:
-                        i = 0
-                        # Set parent_id
-                        for id_field in id_fields:
-                            if i == 0:
-                                parent_id_field = id_field
-                            if id_field == 'id':
-                                parent_id_field = id_field
-                            i = i + 1
-                        parent_id = record.get(parent_id_field)
-
-                        # sync_endpoint for child
-                        LOGGER.info('Syncing: {}, parent_stream: {}, parent_id: {}'.format(
-                            child_stream_name,
-                            stream_name,
-                            parent_id))
-                        child_path = child_endpoint_config.get('path').format(str(parent_id))
-                        child_total_records = sync_endpoint(
-                            client=client,
-                            catalog=catalog,
-                            state=state,
-                            start_date=start_date,
-                            stream_name=child_stream_name,
-                            path=child_path,
-                            endpoint_config=child_endpoint_config,
-                            data_key=child_endpoint_config.get('data_key', 'ResourceList'),
-                            static_params=child_endpoint_config.get('params', {}),
-                            bookmark_query_field=child_endpoint_config.get('bookmark_query_field'),
-                            bookmark_field=child_endpoint_config.get('bookmark_field'),
-                            bookmark_type=child_endpoint_config.get('bookmark_type'),
-                            id_fields=child_endpoint_config.get('id_fields'),
-                            parent=child_endpoint_config.get('parent'),
-                            parent_id=parent_id)
-                        LOGGER.info('Synced: {}, parent_id: {}, total_records: {}'.format(
-                            child_stream_name, 
-                            parent_id,
-                            child_total_records))
-
-        # Update the state with the max_bookmark_value for the stream
-        if bookmark_field:
-            write_bookmark(state,
-                           stream_name,
-                           bookmark_field,
-                           max_bookmark_value)
-
-        LOGGER.info('{} - Synced - page: {}, total pages: {}'.format(
-            stream_name,
-            page,
-            total_pages))
-        page = page + 1
+            children=fixed_parent_children,
+            records=[],
+            id_fields=id_fields,
+            config=config,
+            processors=processors)
+
+    # Every parent of the child streams has been synced
+    for child_stream_name, child_endpoint_config in parent_children.items():
+        if child_endpoint_config.get('bookmark_field'):
+            clear_parent_bookmark_default(state, child_stream_name)
 
     # Return total_records across all batches
     return total_records
 
 
+# Number of parent records whose child streams are synced concurrently (1 = serial)
+def get_child_workers(config):
+    return max(int((config or {}).get('child_workers', 1)), 1)
+
+
+# Parent id field: the first id_field, or 'id' if it is one of the id_fields
+def get_parent_id_field(id_fields):
+    parent_id_field = None
+    for i, id_field in enumerate(id_fields):
+        if i == 0 or id_field == 'id':
+            parent_id_field = id_field
+    return parent_id_field
+
+
+# Sync the child streams of a batch of parent records.
+# A child with a fixed_parent_id is synced once for that id, regardless of the records.
+# With child_workers > 1, the children of up to child_workers parents are synced
+#  concurrently. Each child sync runs against its own copy of the state and buffers
+#  its output, which is replayed (records, schemas and bookmarks) in parent record
+#  order, so the Singer output is the same regardless of which child finishes first.
+def sync_children(client,
+                  catalog,
+                  state,
+                  start_date,
+                  stream_name,
+                  children,
+                  records,
+                  id_fields,
+                  config=None,
+                  processors=None):
+    child_workers = get_child_workers(config)
+    parent_id_field = get_parent_id_field(id_fields)
+    record_parent_ids = [record.get(parent_id_field) for record in records]
+
+    for child_stream_name, child_endpoint_config in children.items():
+        should_stream, last_stream_child = should_sync_stream(get_selected_streams(catalog),
+                                                    None,
+                                                    child_stream_name)
+        if not should_stream:
+            continue
+
+        if 'fixed_parent_id' in child_endpoint_config:
+            parent_ids = [child_endpoint_config['fixed_parent_id']]
+        else:
+            parent_ids = record_parent_ids
+
+        def sync_child(parent_id, child_state):
+            # sync_endpoint for child
+            LOGGER.info('Syncing: {}, parent_stream: {}, parent_id: {}'.format(
+                child_stream_name,
+                stream_name,
+                parent_id))
+            child_path = child_endpoint_config.get('path').format(str(parent_id))
+            return sync_endpoint(
+                client=client,
+                catalog=catalog,
+                state=child_state,
+                start_date=start_date,
+                stream_name=child_stream_name,
+                path=child_path,
+                endpoint_config=child_endpoint_config,
+                data_key=child_endpoint_config.get('data_key', 'ResourceList'),
+                static_params=child_endpoint_config.get('params', {}),
+                bookmark_query_field=child_endpoint_config.get('bookmark_query_field'),
+                bookmark_field=child_endpoint_config.get('bookmark_field'),
+                bookmark_type=child_endpoint_config.get('bookmark_type'),
+                id_fields=child_endpoint_config.get('id_fields'),
+                parent=child_endpoint_config.get('parent'),
+                parent_id=parent_id,
+                config=config,
+                processors=processors)
+
+        def sync_child_buffered(job):
+            parent_id, child_state = job
+            with OutputBuffer() as output:
+                child_total_records = sync_child(parent_id, child_state)
+            return parent_id, output, child_total_records
+
+        if child_workers > 1:
+            # Copy the state as each job is submitted (on this thread), so every child
+            #  sees the bookmarks replayed so far, independent of worker timing.
+            jobs = ((parent_id, copy.deepcopy(state)) for parent_id in parent_ids)
+            results = ordered_map(sync_child_buffered, jobs, child_workers)
+        else:
+            results = ((parent_id, None, sync_child(parent_id, state)) for parent_id in parent_ids)
+
+        for parent_id, output, child_total_records in results:
+            if output is not None:
+                output.replay(state)
+            LOGGER.info('Synced: {}, parent_id: {}, total_records: {}'.format(
+                child_stream_name,
+                parent_id,
+                child_total_records))
+
+
 # Review catalog and make a list of selected streams
 def get_selected_streams(catalog):
     selected_streams = set()
@@ -300,9 +1090,11 @@ def get_selected_streams(catalog):
 # If the integration is interrupted, this state property is used to identify
 #  the starting point to continue from.
 # Reference: https://github.com/singer-io/singer-python/blob/master/singer/bookmarks.py#L41-L46
+# The state is always written at the end of a stream (stream_name None); at the start
+#  of a stream, it may be coalesced with the stream's first bookmarks.
 def update_currently_syncing(state, stream_name):
     singer.set_currently_syncing(state, stream_name)
-    singer.write_state(state)
+    writer.get_state_emitter().update(state, force=stream_name is None)
 
 
 # Review last_stream (last currently syncing stream), if any,
@@ -319,24 +1111,20 @@ def should_sync_stream(selected_streams, last_stream, stream_name):
     return False, last_stream
 
 
-def sync(client, config, catalog, state, start_date):
-    if 'start_date' in config:
-        start_date = config['start_date']
-    if 'customer_id' in config:
-        customer_id = config['customer_id']
-    if 'facility_id' in config:
-        facility_id = config['facility_id']
+# Set up the JSON backend, the RECORD message writer and the STATE emitter from the config
+def configure_output(config):
+    if 'json_backend' in config:
+        json_codec.set_backend(config['json_backend'])
+    writer.configure_writer(
+        buffer_size=int(config.get('write_buffer_size', writer.DEFAULT_BUFFER_SIZE)),
+        flush_interval=float(config.get('write_flush_interval', writer.DEFAULT_FLUSH_INTERVAL)))
+    writer.configure_state_emitter(
+        interval=float(config.get('state_interval', 0)),
+        records=int(config.get('state_records', 0)))
 
-    selected_streams = get_selected_streams(catalog)
-    LOGGER.info('selected_streams: {}'.format(selected_streams))
-
-    if not selected_streams:
-        return
-
-    # last_stream = Previous currently synced stream, if the load was interrupted
-    last_stream = singer.get_currently_syncing(state)
-    LOGGER.info('last/currently syncing stream: {}'.format(last_stream))
 
+# Endpoint configuration of every stream, for the configured customer and facility.
+def get_endpoints(customer_id, facility_id):
     # endpoints: API URL endpoints to be called
     # properties:
     #   <root node>: Plural stream name for the endpoint
@@ -351,8 +1139,12 @@ def sync(client, config, catalog, state, start_date):
     #   id_fields: Primary key (and other IDs) from the Parent stored when store_ids is true.
     #   children: A collection of child endpoints (where the endpoint path includes the parent id)
     #   parent: On each of the children, the singular stream name for parent element
+    #   fixed_parent_id: On children whose path and params do not use the parent id, the
+    #        parent id set on every record; the child is synced once per run, not per parent
+    #   keyset_fields: Sort fields for keyset pagination (config keyset_pagination), as
+    #        (RQL query field, record field) pairs; the last pair must be unique
 
-    endpoints = {
+    return {
         'inventory': {
             'path': 'inventory',
             'params': {
@@ -360,7 +1152,8 @@ def sync(client, config, catalog, state, start_date):
                 'sort': 'receivedDate'
             },
             'data_key': 'ResourceList',
-            'id_fields': ['receive_item_id']
+            'id_fields': ['receive_item_id'],
+            'keyset_fields': [('ReceiveItemId', 'receive_item_id')]
         },
 
         'locations': {
@@ -413,7 +1206,8 @@ def sync(client, config, catalog, state, start_date):
                     },
                     'data_key': 'ResourceList',
                     'id_fields': ['receive_item_id'],
-                    'parent': 'customer'
+                    'parent': 'customer',
+                    'fixed_parent_id': customer_id
                 }
             }
         },
@@ -430,40 +1224,82 @@ def sync(client, config, catalog, state, start_date):
             'bookmark_field': 'last_modified_date',
             'bookmark_type': 'datetime',
             'bookmark_query_field': 'ReadOnly.lastModifiedDate',
-            'id_fields': ['order_id']
+            'id_fields': ['order_id'],
+            'keyset_fields': [
+                ('ReadOnly.lastModifiedDate', 'last_modified_date'),
+                ('ReadOnly.OrderId', 'order_id')
+            ]
         }
     }
 
+
+def sync(client, config, catalog, state, start_date):
+    if 'start_date' in config:
+        start_date = config['start_date']
+    if 'customer_id' in config:
+        customer_id = config['customer_id']
+    if 'facility_id' in config:
+        facility_id = config['facility_id']
+    configure_output(config)
+
+    selected_streams = get_selected_streams(catalog)
+    LOGGER.info('selected_streams: {}'.format(selected_streams))
+
+    if not selected_streams:
+        return
+
+    # last_stream = Previous currently synced stream, if the load was interrupted
+    last_stream = singer.get_currently_syncing(state)
+    LOGGER.info('last/currently syncing stream: {}'.format(last_stream))
+
+    endpoints = get_endpoints(customer_id, facility_id)
+
+    # processors: RecordProcessor per stream, shared by all pages and children of the run
+    processors = {}
+
 # For each endpoint (above), determine if the stream should be streamed
     #   (based on the catalog and last_stream), then sync those streams.
-    for stream_name, endpoint_config in endpoints.items():
-        should_stream, last_stream = should_sync_stream(selected_streams,
-                                                        last_stream,
-                                                        stream_name)
-        if should_stream:
-            LOGGER.info('START Syncing: {}'.format(stream_name))
-            update_currently_syncing(state, stream_name)
-            if stream_name == 'locations':
-                path = endpoint_config.get('path').format(facility_id)
-            else:
-                path = endpoint_config.get('path')
-            total_records = sync_endpoint(
-                client=client,
-                catalog=catalog,
-                state=state,
-                start_date=start_date,
-                stream_name=stream_name,
-                path=path,
-                endpoint_config=endpoint_config,
-                data_key=endpoint_config.get('data_key', 'ResourceList'),
-                static_params=endpoint_config.get('params', {}),
-                bookmark_query_field=endpoint_config.get('bookmark_query_field'),
-                bookmark_field=endpoint_config.get('bookmark_field'),
-                bookmark_type=endpoint_config.get('bookmark_type'),
-                id_fields=endpoint_config.get('id_fields'))
-
-            update_currently_syncing(state, None)
-            LOGGER.info('Synced: {}, total_records: {}'.format(
-                            stream_name, 
-                            total_records))
-            LOGGER.info('FINISHED Syncing: {}'.format(stream_name))
+    try:
+        for stream_name, endpoint_config in endpoints.items():
+            should_stream, last_stream = should_sync_stream(selected_streams,
+                                                            last_stream,
+                                                            stream_name)
+            if should_stream:
+                LOGGER.info('START Syncing: {}'.format(stream_name))
+                update_currently_syncing(state, stream_name)
+                if stream_name == 'locations':
+                    path = endpoint_config.get('path').format(facility_id)
+                else:
+                    path = endpoint_config.get('path')
+                total_records = sync_endpoint(
+                    client=client,
+                    catalog=catalog,
+                    state=state,
+                    start_date=start_date,
+                    stream_name=stream_name,
+                    path=path,
+                    endpoint_config=endpoint_config,
+                    data_key=endpoint_config.get('data_key', 'ResourceList'),
+                    static_params=endpoint_config.get('params', {}),
+                    bookmark_query_field=endpoint_config.get('bookmark_query_field'),
+                    bookmark_field=endpoint_config.get('bookmark_field'),
+                    bookmark_type=endpoint_config.get('bookmark_type'),
+                    id_fields=endpoint_config.get('id_fields'),
+                    config=config,
+                    processors=processors)
+
+                update_currently_syncing(state, None)
+                LOGGER.info('Synced: {}, total_records: {}'.format(
+                                stream_name, 
+                                total_records))
+                LOGGER.info('FINISHED Syncing: {}'.format(stream_name))
+    finally:
+        # Write any buffered records, and then the latest state, on completion or shutdown
+        writer.get_writer().flush()
+        writer.get_state_emitter().flush()
+        writer.get_writer().log_stats()
+        writer.get_state_emitter().log_stats()
+        client.log_stats()
+        # Removed/filtered paths of the run, also when a stream raised
+        for processor in processors.values():
+            processor.close()
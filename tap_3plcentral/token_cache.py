@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import singer
+
+LOGGER = singer.get_logger()
+
+# Tokens are not reused within this many seconds of their expiry
+DEFAULT_EXPIRY_MARGIN = 300
+
+
+def token_from_response(response, now=None):
+    """Build a cache entry from an AuthServer/api/Token response.
+    expires_at is None when the server does not return expires_in.
+    """
+    if now is None:
+        now = time.time()
+    expires_in = response.get('expires_in')
+    return {
+        'token_type': response['token_type'],
+        'access_token': response['access_token'],
+        'expires_at': now + float(expires_in) if expires_in is not None else None
+    }
+
+
+class TokenCache(object):
+    """Access token cache, optionally persisted to a JSON file shared across runs.
+    Entries are keyed by a hash of the base_url, client_id, tpl_key and user_login_id,
+    and are returned until expiry_margin seconds before they expire. Tokens without
+    a known expiry are only kept in memory. The file is written atomically and is
+    only readable by its owner.
+    """
+
+    def __init__(self, path=None, expiry_margin=DEFAULT_EXPIRY_MARGIN):
+        self.path = path
+        self.expiry_margin = expiry_margin
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(base_url, client_id, tpl_key, user_login_id):
+        key_string = '\n'.join(str(part) for part in (base_url, client_id, tpl_key, user_login_id))
+        return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+
+    def is_valid(self, token, now=None):
+        if token is None:
+            return False
+        if token.get('expires_at') is None:
+            return True
+        if now is None:
+            now = time.time()
+        return token['expires_at'] - self.expiry_margin > now
+
+    def get(self, key):
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None and key not in self._tokens:
+                token = self._read_file().get(key)
+            if not self.is_valid(token):
+                return None
+            self._tokens[key] = token
+            return token
+
+    def set(self, key, token):
+        with self._lock:
+            self._tokens[key] = token
+            if self.path and token.get('expires_at') is not None:
+                tokens = self._read_file()
+                tokens[key] = token
+                # Drop expired entries
+                now = time.time()
+                tokens = {k: v for k, v in tokens.items()
+                          if isinstance(v, dict) and (v.get('expires_at') or 0) > now}
+                self._write_file(tokens)
+
+    def _read_file(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as file:
+                tokens = json.load(file)
+            return tokens if isinstance(tokens, dict) else {}
+        except (OSError, ValueError) as err:
+            LOGGER.warning('Ignoring unreadable token cache {}: {}'.format(self.path, err))
+            return {}
+
+    def _write_file(self, tokens):
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as file:
+                json.dump(tokens, file)
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            LOGGER.warning('Unable to write token cache {}: {}'.format(self.path, err))
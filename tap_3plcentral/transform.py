@@ -1,8 +1,11 @@
 import re
 import os
 import json
+import functools
 
 # Convert camelCase to snake_case
+# Memoized (bounded): the API returns the same few hundred field names on every record
+@functools.lru_cache(maxsize=4096)
 def convert(name):
     regsub = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
     return re.sub('([a-z0-9])([A-Z])', r'\1_\2', regsub).lower()
@@ -90,15 +93,68 @@ def transform_locations(this_json, path):
     return new_json
 
 
+# Nodes removed from the json at every level
+REMOVED_NODES = frozenset(['_embedded', '_links'])
+
+# _embedded sub-nodes copied up to the record
+EMBEDDED_NODES = ['item']
+
+
+# Convert keys in a nested json value and remove all _embedded and _links nodes (one pass)
+def convert_node(value):
+    if isinstance(value, dict):
+        return {convert(key): convert_node(val) for key, val in value.items()
+                if key not in REMOVED_NODES}
+    if isinstance(value, list):
+        return [convert_node(val) for val in value]
+    return value
+
+
+# Run all transforms on a single record in one walk: denests ReadOnly and _embedded
+#  sub-nodes, removes _embedded/_links, converts camelCase to snake_case keys, and
+#  applies the stream specific de-nesting (stock_summaries, locations).
+def transform_record(record, stream):
+    if not isinstance(record, dict):
+        return convert_node(record)
+
+    new_record = {}
+    for key, value in record.items():
+        if key == 'ReadOnly' or key in REMOVED_NODES:
+            continue
+        new_record[convert(key)] = convert_node(value)
+
+    read_only = record.get('ReadOnly')
+    if isinstance(read_only, dict):
+        for key, value in read_only.items():
+            if key not in REMOVED_NODES:
+                new_record[convert(key)] = convert_node(value)
+
+    embedded = record.get('_embedded')
+    if isinstance(embedded, dict):
+        for node in EMBEDDED_NODES:
+            if node in embedded:
+                new_record[convert(node)] = convert_node(embedded[node])
+
+    if stream == 'stock_summaries':
+        new_record['item_id'] = (new_record.get('item_identifier') or {}).get('id')
+    elif stream == 'locations':
+        location_identifier = new_record.get('location_identifier') or {}
+        new_record['location_id'] = location_identifier.get('id')
+        new_record['facility_id'] = ((location_identifier.get('name_key') or {}).get(
+            'facility_identifier') or {}).get('id')
+    return new_record
+
+
 # Run all transforms: denests _embedded and ReadOnly, removes _embedded/_links, and
 #  converts camelCase to snake_case for fieldname keys.
+# The json is walked once; records in the path list are transformed with transform_record.
 def transform_json(this_json, stream, path):
-    denested_json = denest_embedded_readonly_nodes(this_json, path)
-    removed_json = remove_embedded_links(denested_json)
-    converted_json = convert_json(removed_json)
-    transformed_json = converted_json
-    if stream == 'stock_summaries':
-        transformed_json = transform_stock_summaries(converted_json, convert(path))
-    elif stream == 'locations':
-        transformed_json = transform_locations(converted_json, convert(path))
+    transformed_json = {}
+    for key, value in this_json.items():
+        if key in REMOVED_NODES:
+            continue
+        if key == path and isinstance(value, list):
+            transformed_json[convert(key)] = [transform_record(record, stream) for record in value]
+        else:
+            transformed_json[convert(key)] = convert_node(value)
     return transformed_json
@@ -0,0 +1,215 @@
+import collections
+import contextlib
+import threading
+
+import requests
+import singer
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+from requests.structures import CaseInsensitiveDict
+from singer import metrics
+
+# httpx (and h2, for HTTP/2) are optional: pip install 'tap-3plcentral[http2]'
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+LOGGER = singer.get_logger()
+
+# Connections kept open by the HTTP/2 session; each multiplexes many requests
+HTTP2_MAX_CONNECTIONS = 4
+
+# requests/urllib3 defaults: connection pools (one per host) kept, and connections
+#  kept per pool. Requests beyond pool_maxsize in flight to one host open extra
+#  connections, which are closed instead of returned to the pool.
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+def http2_available():
+    return httpx is not None and h2 is not None
+
+
+def make_timeout(connect_timeout, read_timeout):
+    if httpx is None:
+        return (connect_timeout, read_timeout)
+    return httpx.Timeout(read_timeout, connect=connect_timeout)
+
+
+# Raise httpx transport errors as the requests exceptions TPLClient raises (and
+#  RetryPolicy retries)
+@contextlib.contextmanager
+def translate_errors():
+    if httpx is None:
+        yield
+        return
+    try:
+        yield
+    except httpx.TimeoutException as err:
+        raise Timeout(str(err)) from err
+    except httpx.TransportError as err:
+        raise ConnectionError(str(err)) from err
+
+
+class ConnectionStats(object):
+    """Counts of requests sent, connections opened and TLS handshakes on a session.
+    Requests that did not open a connection reused a pooled (keep-alive) one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @property
+    def connections_reused(self):
+        return max(self.requests - self.connections_opened, 0)
+
+    def log(self):
+        """Report the counts as Singer counter metrics."""
+        for metric, value in (
+                ('http_connections_opened', self.connections_opened),
+                ('http_connections_reused', self.connections_reused),
+                ('tls_handshakes', self.tls_handshakes)):
+            with metrics.Counter(metric) as counter:
+                counter.increment(value)
+
+
+def counting_pool_classes(stats):
+    """urllib3 connection pool classes whose connections count into stats."""
+
+    class CountingHTTPConnection(urllib3.connection.HTTPConnection):
+        def connect(self):
+            super().connect()
+            stats.increment('connections_opened')
+
+    class CountingHTTPSConnection(urllib3.connection.HTTPSConnection):
+        def connect(self):
+            super().connect()
+            stats.increment('connections_opened')
+            stats.increment('tls_handshakes')
+
+    class CountingHTTPConnectionPool(urllib3.HTTPConnectionPool):
+        ConnectionCls = CountingHTTPConnection
+
+    class CountingHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+        ConnectionCls = CountingHTTPSConnection
+
+    return {'http': CountingHTTPConnectionPool, 'https': CountingHTTPSConnectionPool}
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that records requests, new connections and TLS handshakes in stats."""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = counting_pool_classes(self.stats)
+
+    def send(self, request, **kwargs):
+        self.stats.increment('requests')
+        return super().send(request, **kwargs)
+
+
+class HTTPXResponse(object):
+    """The parts of requests.Response that TPLClient uses, over an httpx.Response."""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.http_version = response.http_version
+
+    @property
+    def content(self):
+        with translate_errors():
+            return self._response.read()
+
+    def iter_content(self, chunk_size=None):
+        with translate_errors():
+            yield from self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+
+class HTTPXSession(object):
+    """requests.Session stand-in for TPLClient on an httpx.Client with HTTP/2 enabled,
+    so concurrent requests (page_workers, child_workers) are multiplexed over a few
+    connections instead of opening one connection (and TLS handshake) per worker.
+    HTTP/2 is negotiated per connection (ALPN); servers without it get HTTP/1.1.
+    :param http1: False to use HTTP/2 with prior knowledge on http:// URLs (h2c).
+    """
+
+    def __init__(self, verify=True, http1=True, max_connections=HTTP2_MAX_CONNECTIONS):
+        if not http2_available():
+            raise ImportError('HTTP/2 requires httpx and h2: pip install httpx[http2]')
+        self.headers = CaseInsensitiveDict()
+        self.http_versions = collections.Counter()
+        self._lock = threading.Lock()
+        self.client = httpx.Client(
+            http1=http1,
+            http2=True,
+            verify=verify,
+            limits=httpx.Limits(max_connections=max_connections))
+
+    def request(self, method, url, data=None, headers=None, stream=False, timeout=None, verify=None):
+        """Send a request; verify is set for the session, not per request."""
+        request_headers = CaseInsensitiveDict(self.headers)
+        request_headers.update(headers or {})
+        if isinstance(timeout, tuple):
+            timeout = make_timeout(*timeout)
+        with translate_errors():
+            request = self.client.build_request(
+                method,
+                url,
+                content=data,
+                headers=dict(request_headers),
+                timeout=timeout)
+            response = self.client.send(request, stream=True)
+            if not stream:
+                response.read()
+        with self._lock:
+            self.http_versions[response.http_version] += 1
+        return HTTPXResponse(response)
+
+    def close(self):
+        self.client.close()
+        if self.http_versions:
+            LOGGER.info('HTTP versions: {}'.format(', '.join(
+                '{} {}'.format(version, count) for version, count in sorted(self.http_versions.items()))))
+
+
+def make_session(http2=False, verify=True, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """Session for TPLClient: an HTTPXSession when http2 is requested and available,
+    otherwise a requests.Session with a CountingHTTPAdapter sized by pool_connections
+    and pool_maxsize (its ConnectionStats are in session.stats).
+    """
+    if http2:
+        if http2_available():
+            return HTTPXSession(verify=verify)
+        LOGGER.warning('HTTP/2 requires httpx and h2 (pip install httpx[http2]); using HTTP/1.1')
+    session = requests.Session()
+    session.stats = ConnectionStats()
+    adapter = CountingHTTPAdapter(
+        session.stats,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -0,0 +1,160 @@
+import sys
+import threading
+import time
+
+import singer
+from tap_3plcentral import json_codec
+
+LOGGER = singer.get_logger()
+
+# Default write buffer: flush once 1 MB of RECORD messages are buffered, or when a
+#  record is written more than 5 seconds after the last flush
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 5
+
+
+class MessageWriter(object):
+    """Buffered writer for Singer RECORD messages.
+    Serialized records are accumulated and written to stdout in one write (and one
+    flush) when the buffer reaches buffer_size characters or flush_interval seconds
+    have passed since the last flush. Callers flush() before writing any SCHEMA or
+    STATE message, so message ordering is unchanged: a STATE message is never written
+    before the records it covers. A buffer_size of 0 writes every record immediately.
+    """
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL, output=None):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.output = output
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffered_size = 0
+        self._last_flush = time.monotonic()
+        self.messages_written = 0
+        self.bytes_written = 0
+        self.flushes = 0
+
+    def write_message(self, message):
+        line = json_codec.dumps_message(message) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered_size += len(line)
+            self.messages_written += 1
+            if self._buffered_size >= self.buffer_size or \
+                    time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer)
+        record_count = len(self._buffer)
+        self._buffer = []
+        self._buffered_size = 0
+        output = self.output or sys.stdout
+        try:
+            output.write(data)
+            output.flush()
+        except OSError as err:
+            LOGGER.info('OS Error writing {} buffered records ({} characters)'.format(
+                record_count, len(data)))
+            raise err
+        self.bytes_written += len(data.encode('utf-8'))
+        self.flushes += 1
+
+    def log_stats(self):
+        LOGGER.info('Message writer: {} records, {} bytes written in {} flushes'.format(
+            self.messages_written,
+            self.bytes_written,
+            self.flushes))
+
+
+class StateEmitter(object):
+    """Coalesces Singer STATE messages.
+    update(state) writes a STATE message once interval seconds have passed, or records
+    RECORD messages have been written, since the last one; otherwise the state is kept
+    and only the latest is written, with the next update that is due, with
+    update(state, force=True) (at the end of a stream) or with flush() (on shutdown).
+    Buffered records are always written before the STATE that covers them. With
+    neither threshold set, every update is written immediately.
+    """
+
+    def __init__(self, interval=0, records=0, clock=time.monotonic):
+        self.interval = interval
+        self.records = records
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending = None
+        self._last_emit = clock()
+        self._records_at_emit = 0
+        self.emitted = 0
+        self.coalesced = 0
+
+    def update(self, state, force=False):
+        with self._lock:
+            if force or self._is_due():
+                self._emit(state)
+            else:
+                if self._pending is not None:
+                    self.coalesced += 1
+                self._pending = state
+
+    def flush(self):
+        with self._lock:
+            if self._pending is not None:
+                self._emit(self._pending)
+
+    def _is_due(self):
+        if self.interval <= 0 and self.records <= 0:
+            return True
+        if self.interval > 0 and self._clock() - self._last_emit >= self.interval:
+            return True
+        records_written = get_writer().messages_written - self._records_at_emit
+        return self.records > 0 and records_written >= self.records
+
+    def _emit(self, state):
+        # Buffered records are written before the state that covers them
+        get_writer().flush()
+        singer.write_state(state)
+        self._pending = None
+        self._last_emit = self._clock()
+        self._records_at_emit = get_writer().messages_written
+        self.emitted += 1
+
+    def log_stats(self):
+        LOGGER.info('State emitter: {} STATE messages written, {} coalesced'.format(
+            self.emitted,
+            self.coalesced))
+
+
+WRITER = MessageWriter()
+STATE_EMITTER = StateEmitter()
+
+
+def configure_writer(buffer_size=DEFAULT_BUFFER_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+    """Replace the module writer (flushing the current one) with new thresholds."""
+    global WRITER
+    WRITER.flush()
+    WRITER = MessageWriter(buffer_size=buffer_size, flush_interval=flush_interval)
+    return WRITER
+
+
+def get_writer():
+    return WRITER
+
+
+def configure_state_emitter(interval=0, records=0):
+    """Replace the module state emitter (flushing the current one) with new thresholds."""
+    global STATE_EMITTER
+    STATE_EMITTER.flush()
+    STATE_EMITTER = StateEmitter(interval=interval, records=records)
+    return STATE_EMITTER
+
+
+def get_state_emitter():
+    return STATE_EMITTER
@@ -0,0 +1,112 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from tap_3plcentral.async_client import AsyncTPLClient, httpx
+from tap_3plcentral.client import TPLAPIError, RetryPolicy, Server5xxError
+
+
+default_config = {
+    "base_url": "https://secure-wms.com",
+    "client_id": "test_client_id",
+    "client_secret": "test_client_secret",
+    "tpl_key": "test_tpl_key",
+    "user_login_id": "1",
+    "user_agent": "tap-3plcentral <test@test.com>",
+}
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Stand-in for httpx.AsyncClient returning queued responses."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.closed = False
+
+    async def request(self, method, url, content=None, headers=None, timeout=None):
+        self.requests.append((method, url, headers))
+        await asyncio.sleep(0)
+        return self.responses.pop(0)
+
+    async def aclose(self):
+        self.closed = True
+
+
+def make_client(responses, **kwargs):
+    kwargs.setdefault("rate_limit_burst", 100)
+    return AsyncTPLClient(session=FakeSession(responses), **default_config, **kwargs)
+
+
+class TestAsyncTPLClient(unittest.TestCase):
+    """Tests for AsyncTPLClient on a fake session."""
+
+    def test_get(self):
+        client = make_client([FakeResponse(200, b'{"data": [1, 2]}')])
+
+        async def run():
+            async with client:
+                return await client.get("orders", querystring="pgnum=1")
+
+        self.assertEqual(asyncio.run(run()), {"data": [1, 2]})
+        self.assertEqual(client.client.requests[0][:2], ("GET", "https://secure-wms.com/orders?pgnum=1"))
+        self.assertTrue(client.client.closed)
+
+    def test_error_semantics(self):
+        """Error statuses raise the same exceptions as TPLClient."""
+        client = make_client([FakeResponse(404, b"missing")])
+        with self.assertRaises(TPLAPIError) as err:
+            asyncio.run(client.get("orders"))
+        self.assertEqual(err.exception.error_code, 404)
+
+    def test_5xx_retried(self):
+        client = make_client(
+            [FakeResponse(503), FakeResponse(200, b'{"data": 1}')],
+            retry_policy=RetryPolicy(base_delay=0))
+        self.assertEqual(asyncio.run(client.get("orders")), {"data": 1})
+        self.assertEqual(client.retry_policy.retries["orders"], 1)
+
+    def test_5xx_gives_up(self):
+        client = make_client([FakeResponse(500)] * 5, retry_policy=RetryPolicy(base_delay=0))
+        with self.assertRaises(Server5xxError):
+            asyncio.run(client.get("orders"))
+
+    def test_token_refreshed_once_for_concurrent_401s(self):
+        """Concurrent requests rejected with the same token share one refresh."""
+        client = make_client([FakeResponse(401)] * 4 + [FakeResponse(200, b'{"data": 1}')] * 4)
+        client._manage_token = True
+        client._get_access_token = AsyncMock(side_effect=[
+            {"token_type": "Bearer", "access_token": "old_token", "expires_in": 3600},
+            {"token_type": "Bearer", "access_token": "new_token", "expires_in": 3600},
+        ])
+
+        async def run():
+            await client.__aenter__()
+            return await asyncio.gather(*[client.get("orders") for _ in range(4)])
+
+        self.assertEqual(asyncio.run(run()), [{"data": 1}] * 4)
+        self.assertEqual(client._get_access_token.await_count, 2)
+        sent = [headers["Authorization"] for _, _, headers in client.client.requests]
+        self.assertEqual(sent, ["Bearer old_token"] * 4 + ["Bearer new_token"] * 4)
+
+    @unittest.skipIf(httpx is not None, "httpx is installed")
+    def test_requires_httpx(self):
+        with self.assertRaises(ImportError):
+            AsyncTPLClient(**default_config)
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_httpx_session(self):
+        client = AsyncTPLClient(**default_config)
+        self.assertIsInstance(client.client, httpx.AsyncClient)
+        asyncio.run(client.client.aclose())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from tap_3plcentral import async_sync
+from tap_3plcentral.discover import discover
+from tap_3plcentral.sync import sync_endpoint, write_bookmark, write_record
+
+
+def get_page(querystring, total_results=9, page_size=2):
+    params = dict(param.split("=", 1) for param in querystring.split("&"))
+    page = int(params["pgnum"])
+    first = (page - 1) * page_size
+    return {
+        "TotalResults": total_results,
+        "ResourceList": [
+            {"ReceiveItemId": index, "ReceivedDate": "2020-01-0{}T00:00:00".format(page)}
+            for index in range(first, min(first + page_size, total_results))
+        ],
+    }
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.calls = []
+
+    async def get(self, path, querystring=None, endpoint=None):
+        self.calls.append(querystring)
+        page = get_page(querystring)
+        # Later pages return first
+        await asyncio.sleep(0.01 / int(querystring.split("pgnum=")[1].split("&")[0]))
+        return page
+
+
+class TestAsyncSyncEndpoint(unittest.TestCase):
+    """Tests for the asyncio sync engine."""
+
+    def _endpoint_kwargs(self, catalog):
+        return {
+            "catalog": catalog,
+            "state": {},
+            "start_date": "2019-01-01T00:00:00Z",
+            "stream_name": "inventory",
+            "path": "inventory",
+            "endpoint_config": {},
+            "data_key": "ResourceList",
+            "static_params": {"pgsiz": 2},
+            "id_fields": ["receive_item_id"],
+        }
+
+    @patch("tap_3plcentral.sync.singer.write_schema")
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    def test_same_records_as_sync_engine(self, mock_write_message, mock_write_schema):
+        """The async engine with concurrent pages writes the sync engine's records, in order."""
+        catalog = discover()
+
+        mock_client = MagicMock()
+        mock_client.get.side_effect = lambda path, querystring=None, endpoint=None: get_page(querystring)
+        sync_total = sync_endpoint(client=mock_client, **self._endpoint_kwargs(catalog))
+        sync_records = [call_args[0][0].record for call_args in mock_write_message.call_args_list]
+        mock_write_message.reset_mock()
+
+        async_client = FakeAsyncClient()
+        async_total = asyncio.run(async_sync.sync_endpoint(
+            client=async_client, config={"page_workers": 4}, **self._endpoint_kwargs(catalog)))
+        async_records = [call_args[0][0].record for call_args in mock_write_message.call_args_list]
+
+        self.assertEqual(async_total, sync_total)
+        self.assertEqual(len(async_records), 9)
+        self.assertEqual(async_records, sync_records)
+        self.assertEqual(len(async_client.calls), 5)
+
+
+class TestAsyncSyncChildren(unittest.TestCase):
+    """Tests for concurrent child syncs on the event loop."""
+
+    async def _fake_child_sync(self, **kwargs):
+        """Writes one record and a bookmark per parent, slower for earlier parents."""
+        parent_id = kwargs["parent_id"]
+        await asyncio.sleep(0.005 * (5 - parent_id))
+        write_record(kwargs["stream_name"], {"item_id": parent_id}, time_extracted=None)
+        write_bookmark(kwargs["state"], kwargs["stream_name"], "last_modified_date", str(parent_id))
+        return 1
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    @patch("tap_3plcentral.async_sync.get_selected_streams", return_value=["customers", "sku_items"])
+    def test_concurrent_children_emit_in_parent_order(self, mock_selected, mock_write_message, mock_write_state):
+        state = {}
+        with patch("tap_3plcentral.async_sync.sync_endpoint", side_effect=self._fake_child_sync):
+            asyncio.run(async_sync.sync_children(
+                client=MagicMock(),
+                catalog=MagicMock(),
+                state=state,
+                start_date="2019-01-01T00:00:00Z",
+                stream_name="customers",
+                children={"sku_items": {"path": "customers/{}/items", "parent": "customer"}},
+                records=[{"customer_id": i} for i in range(1, 5)],
+                id_fields=["customer_id"],
+                config={"child_workers": 4}))
+        written = [call_args[0][0].record["item_id"] for call_args in mock_write_message.call_args_list]
+        self.assertEqual(written, [1, 2, 3, 4])
+        self.assertEqual(state["bookmarks"]["sku_items"], {"last_modified_date": "4"})
+        self.assertEqual(mock_write_state.call_count, 4)
+
+
+
+class TestAsyncSyncOptions(unittest.TestCase):
+    """Tests for the threaded engine options this engine does not use."""
+
+    def test_get_unsupported_options(self):
+        self.assertEqual(async_sync.get_unsupported_options({"page_workers": 4, "window_workers": 1}), [])
+        self.assertEqual(
+            async_sync.get_unsupported_options({
+                "date_window_days": 7,
+                "window_workers": 2,
+                "keyset_pagination": "true",
+                "pipeline_stages": "false",
+                "page_checkpoint_interval": 10,
+                "hedge_requests": True,
+            }),
+            ["date_window_days", "window_workers", "keyset_pagination", "page_checkpoint_interval", "hedge_requests"])
+
+
+if __name__ == "__main__":
+    unittest.main()
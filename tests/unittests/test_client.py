@@ -1,11 +1,24 @@
+import os
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
 
 import requests
 from parameterized import parameterized
 from requests.exceptions import Timeout, ConnectionError
 
-from tap_3plcentral.client import TPLClient, TPLAPIError, Server5xxError
+from tap_3plcentral.client import (
+    TPLClient,
+    TPLAPIError,
+    Server5xxError,
+    Server429Error,
+    RetryPolicy,
+    LatencyTracker,
+    parse_retry_after,
+)
 
 
 default_config = {
@@ -18,17 +31,36 @@ default_config = {
 }
 
 
+class FakeClock:
+    """Clock advanced only by the retry policy's sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += seconds
+
+
 class MockResponse:
     """Mocked standard HTTPResponse to test error handling."""
 
-    def __init__(self, status_code, content=None, json_data=None):
+    def __init__(self, status_code, content=None, json_data=None, headers=None):
         self.status_code = status_code
         self.content = content or ""
+        self.headers = headers or {}
         self._json_data = json_data or {}
 
     def json(self):
         return self._json_data
 
+    def close(self):
+        pass
+
     def raise_for_status(self):
         if self.status_code >= 400:
             raise requests.HTTPError("mock error")
@@ -51,6 +83,7 @@ class TestTPLClient(unittest.TestCase):
             tpl_key=default_config["tpl_key"],
             user_login_id=default_config["user_login_id"],
             user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
         )
 
     def test_client_initialization_headers(self):
@@ -72,6 +105,7 @@ class TestTPLClient(unittest.TestCase):
             tpl_key=default_config["tpl_key"],
             user_login_id=default_config["user_login_id"],
             user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
             session=mock_session,
         )
         self.assertEqual(client.client, mock_session)
@@ -136,6 +170,7 @@ class TestTPLClientStatusCodes(unittest.TestCase):
             tpl_key=default_config["tpl_key"],
             user_login_id=default_config["user_login_id"],
             user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
         )
 
     @parameterized.expand([
@@ -164,6 +199,24 @@ class TestTPLClientStatusCodes(unittest.TestCase):
         self.assertEqual(ctx.exception.error_code, status_code)
         self.assertIn(expected_msg, ctx.exception.msg)
 
+    @parameterized.expand([
+        ["500 Internal Server Error", 500],
+        ["502 Bad Gateway", 502],
+        ["503 Service Unavailable", 503],
+        ["504 Gateway Timeout", 504],
+    ])
+    def test_check_status_code_server_errors(self, test_name, status_code):
+        """Test that transient server errors raise the retryable Server5xxError."""
+        with self.assertRaises(Server5xxError) as ctx:
+            self.client._check_status_code(status_code, "")
+        self.assertEqual(ctx.exception.error_code, status_code)
+
+    def test_error_message_from_bytes_content(self):
+        """Error content returned as bytes is included in the error message."""
+        with self.assertRaises(TPLAPIError) as ctx:
+            self.client._check_status_code(400, b"invalid rql")
+        self.assertIn("invalid rql", str(ctx.exception))
+
     def test_check_status_code_unknown_error(self):
         """Test that unmapped error codes raise TPLAPIError as unknown."""
         with self.assertRaises(TPLAPIError) as ctx:
@@ -187,6 +240,7 @@ class TestTPLClientExecute(unittest.TestCase):
             tpl_key=default_config["tpl_key"],
             user_login_id=default_config["user_login_id"],
             user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
         )
 
     @patch("tap_3plcentral.client.TPLClient._check_status_code", return_value=True)
@@ -194,7 +248,7 @@ class TestTPLClientExecute(unittest.TestCase):
         """Test _execute returns JSON on successful response."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"data": [1, 2, 3]}
+        mock_response.content = b'{"data": [1, 2, 3]}'
         self.client.client.request = MagicMock(return_value=mock_response)
 
         result = self.client._execute("https://secure-wms.com/orders", "GET")
@@ -211,6 +265,321 @@ class TestTPLClientExecute(unittest.TestCase):
         with self.assertRaises(error):
             self.client._execute("https://secure-wms.com/orders", "GET")
 
+    @patch("tap_3plcentral.client.TPLClient._check_status_code", return_value=True)
+    def test_get_streamed(self, mock_check):
+        """get_streamed issues a streaming GET and parses records from the body chunks."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b'{"TotalResults": 2, "Resource', b'List": [{"Id": 1}, {"Id": 2}]}']
+        self.client.client.request = MagicMock(return_value=mock_response)
+
+        page = self.client.get_streamed("orders", "ResourceList", querystring="pgnum=1")
+        self.assertEqual(list(page), [{"Id": 1}, {"Id": 2}])
+        self.assertEqual(page["TotalResults"], 2)
+        self.assertTrue(self.client.client.request.call_args.kwargs["stream"])
+        self.assertEqual(self.client.client.request.call_args[0][1], "https://secure-wms.com/orders?pgnum=1")
+        mock_check.assert_called_once_with(200, None)
+        mock_response.close.assert_called_once()
+
+
+class TestTPLClientRetryPolicy(unittest.TestCase):
+    """Tests for retries of transient failures and circuit breaking."""
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def setUp(self, mock_get_token):
+        mock_get_token.return_value = {
+            "token_type": "Bearer",
+            "access_token": "test_access_token",
+        }
+        self.client = TPLClient(
+            base_url=default_config["base_url"],
+            client_id=default_config["client_id"],
+            client_secret=default_config["client_secret"],
+            tpl_key=default_config["tpl_key"],
+            user_login_id=default_config["user_login_id"],
+            user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
+            retry_policy=RetryPolicy(breaker_threshold=4),
+        )
+        self.client.client.request = MagicMock()
+
+    @patch("time.sleep")
+    def test_5xx_retried(self, mock_sleep):
+        """Transient server errors are retried with jittered delays and counted per endpoint."""
+        self.client.client.request.side_effect = [
+            MockResponse(503),
+            MockResponse(502),
+            MockResponse(200, content=b'{"data": 1}'),
+        ]
+        self.assertEqual(self.client.get("orders"), {"data": 1})
+        self.assertEqual(self.client.retry_policy.retries["orders"], 2)
+        delays = [args[0] for args, _ in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertTrue(0 <= delays[0] <= 2)
+        self.assertTrue(0 <= delays[1] <= 4)
+
+    @patch("time.sleep")
+    def test_client_errors_not_retried(self, mock_sleep):
+        """Non-transient errors are raised on the first attempt."""
+        self.client.client.request.return_value = MockResponse(404)
+        with self.assertRaises(TPLAPIError):
+            self.client.get("orders")
+        self.assertEqual(self.client.client.request.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    def use_fake_clock(self, **kwargs):
+        self.clock = FakeClock()
+        self.client.retry_policy = RetryPolicy(
+            breaker_threshold=4, clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_circuit_breaker_opens(self):
+        """Consecutive failures open the endpoint's circuit: the next attempt waits
+        breaker_reset seconds and is sent as a probe; other endpoints are unaffected.
+        """
+        self.use_fake_clock()
+        sent_at = []
+        def request(*args, **kwargs):
+            sent_at.append(self.clock())
+            return MockResponse(500)
+        self.client.client.request.side_effect = request
+        with self.assertRaises(Server5xxError):
+            self.client.get("orders")
+        self.assertEqual(len(sent_at), 5)
+        self.assertGreaterEqual(sent_at[4] - sent_at[3], 60 - 1e-6)
+        self.assertTrue(self.client.retry_policy.is_open("orders"))
+
+        self.client.client.request.side_effect = None
+        self.client.client.request.return_value = MockResponse(200, content=b'{"data": 1}')
+        self.assertEqual(self.client.get("customers"), {"data": 1})
+
+    def test_circuit_breaker_closes_after_probe(self):
+        """A successful probe closes the circuit."""
+        self.use_fake_clock()
+        self.client.client.request.side_effect = [MockResponse(500)] * 4 + [
+            MockResponse(200, content=b'{"data": 1}')]
+        self.assertEqual(self.client.get("orders"), {"data": 1})
+        self.assertGreaterEqual(self.clock(), 60 - 1e-6)
+        self.assertFalse(self.client.retry_policy.is_open("orders"))
+
+    def test_circuit_breaker_concurrent_recovery(self):
+        """Concurrent requests wait while the circuit is open, instead of failing,
+        and all complete once the server recovers.
+        """
+        self.use_fake_clock(max_tries=10)
+        real_sleep = time.sleep
+        fake_sleep = self.clock.sleep
+        def sleep(seconds):
+            fake_sleep(seconds)
+            real_sleep(0.001)
+        self.client.retry_policy._sleep = sleep
+        lock = threading.Lock()
+        calls = []
+        def request(*args, **kwargs):
+            with lock:
+                calls.append(args)
+                failed = len(calls) <= 5
+            if failed:
+                return MockResponse(500)
+            return MockResponse(200, content=b'{"data": 1}')
+        self.client.client.request.side_effect = request
+
+        with patch("tap_3plcentral.client.LOGGER") as mock_logger:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(lambda _: self.client.get("orders"), range(4)))
+        self.assertEqual(results, [{"data": 1}] * 4)
+        self.assertEqual(len(calls), 9)
+        messages = [args[0] for args, _ in mock_logger.error.call_args_list + mock_logger.info.call_args_list]
+        self.assertTrue(any(m.startswith("Circuit breaker opened") for m in messages))
+        self.assertTrue(any(m.startswith("Circuit breaker closed") for m in messages))
+        self.assertFalse(self.client.retry_policy.is_open("orders"))
+
+
+class TestTPLClientTimeouts(unittest.TestCase):
+    """Tests for request timeouts and hedged requests."""
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def setUp(self, mock_get_token):
+        mock_get_token.return_value = {
+            "token_type": "Bearer",
+            "access_token": "test_access_token",
+        }
+        self.client = TPLClient(
+            base_url=default_config["base_url"],
+            client_id=default_config["client_id"],
+            client_secret=default_config["client_secret"],
+            tpl_key=default_config["tpl_key"],
+            user_login_id=default_config["user_login_id"],
+            user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
+            connect_timeout=5,
+            read_timeout=60,
+            endpoint_timeouts={"orders": {"read_timeout": 600}},
+        )
+        self.client.client.request = MagicMock(return_value=MockResponse(200, content=b'{"data": 1}'))
+
+    def test_timeouts_per_endpoint(self):
+        """Requests use the endpoint's timeouts, falling back to the client's."""
+        self.client.get("orders")
+        self.assertEqual(self.client.client.request.call_args.kwargs["timeout"], (5, 600))
+        self.client.get("customers")
+        self.assertEqual(self.client.client.request.call_args.kwargs["timeout"], (5, 60))
+
+    def test_latency_tracker_percentile(self):
+        tracker = LatencyTracker(min_samples=10)
+        for seconds in range(9):
+            tracker.observe("orders", seconds)
+        self.assertIsNone(tracker.hedge_delay("orders"))
+        for seconds in range(9, 100):
+            tracker.observe("orders", seconds)
+        self.assertEqual(tracker.hedge_delay("orders"), 95)
+
+    def test_hedged_request_returns_first_response(self):
+        """A GET slower than the p95 latency is duplicated and the faster response is used."""
+        self.client.hedge_requests = True
+        for _ in range(20):
+            self.client.latency.observe("orders", 0.01)
+        release = threading.Event()
+        slow_response = MagicMock(status_code=200, content=b'{"data": "slow"}')
+
+        def mock_request(method, url, **kwargs):
+            if self.client.client.request.call_count == 1:
+                release.wait(timeout=5)
+                return slow_response
+            return MockResponse(200, content=b'{"data": "fast"}')
+
+        self.client.client.request.side_effect = mock_request
+        self.assertEqual(self.client.get("orders"), {"data": "fast"})
+        self.assertEqual(self.client.hedged_requests, 1)
+        self.assertEqual(self.client.hedge_wins, 1)
+        release.set()
+        self.client.__exit__(None, None, None)
+        self.client._hedge_executor.shutdown(wait=True)
+        slow_response.close.assert_called_once()
+
+    def test_fast_request_not_hedged(self):
+        """A GET faster than the p95 latency is sent once."""
+        self.client.hedge_requests = True
+        for _ in range(20):
+            self.client.latency.observe("orders", 5)
+        self.assertEqual(self.client.get("orders"), {"data": 1})
+        self.assertEqual(self.client.client.request.call_count, 1)
+        self.assertEqual(self.client.hedged_requests, 0)
+
+
+class TestTPLClientHTTPCache(unittest.TestCase):
+    """Tests for GETs through the HTTP cache."""
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def setUp(self, mock_get_token):
+        mock_get_token.return_value = {
+            "token_type": "Bearer",
+            "access_token": "test_access_token",
+        }
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.client = TPLClient(
+            base_url=default_config["base_url"],
+            client_id=default_config["client_id"],
+            client_secret=default_config["client_secret"],
+            tpl_key=default_config["tpl_key"],
+            user_login_id=default_config["user_login_id"],
+            user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
+            http_cache_path=self.tmp_dir.name,
+            http_cache_streams=["customers"],
+        )
+        self.client.client.request = MagicMock()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_revalidated_with_etag(self):
+        """A cached response with an ETag is reused when the server answers 304."""
+        self.client.client.request.side_effect = [
+            MockResponse(200, content=b'{"data": 1}', headers={"ETag": '"v1"'}),
+            MockResponse(304),
+        ]
+        self.assertEqual(self.client.get("customers", querystring="pgnum=1"), {"data": 1})
+        self.assertEqual(self.client.get("customers", querystring="pgnum=1"), {"data": 1})
+        self.assertEqual(self.client.client.request.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+        self.assertEqual(self.client.http_cache.hits["customers"], 1)
+        self.assertEqual(self.client.http_cache.misses["customers"], 1)
+
+    def test_changed_response_replaces_entry(self):
+        self.client.client.request.side_effect = [
+            MockResponse(200, content=b'{"data": 1}', headers={"ETag": '"v1"'}),
+            MockResponse(200, content=b'{"data": 2}', headers={"ETag": '"v2"'}),
+        ]
+        self.client.get("customers")
+        self.assertEqual(self.client.get("customers"), {"data": 2})
+        self.assertEqual(self.client.http_cache.get("https://secure-wms.com/customers").etag, '"v2"')
+
+    def test_ttl_hit_without_request(self):
+        """A cached response without validators is reused within the TTL, with no request."""
+        self.client.client.request.return_value = MockResponse(200, content=b'{"data": 1}')
+        self.client.get("customers")
+        self.assertEqual(self.client.get("customers"), {"data": 1})
+        self.assertEqual(self.client.client.request.call_count, 1)
+        self.assertEqual(self.client.http_cache.hits["customers"], 1)
+
+    def test_other_streams_not_cached(self):
+        self.client.client.request.return_value = MockResponse(200, content=b'{"data": 1}')
+        self.client.get("orders")
+        self.client.get("orders")
+        self.assertEqual(self.client.client.request.call_count, 2)
+        self.assertNotIn("If-None-Match", self.client.client.request.call_args.kwargs["headers"])
+
+
+class TestTPLClientRateLimit(unittest.TestCase):
+    """Tests for rate limiting and 429 handling."""
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def setUp(self, mock_get_token):
+        mock_get_token.return_value = {
+            "token_type": "Bearer",
+            "access_token": "test_access_token",
+        }
+        self.client = TPLClient(
+            base_url=default_config["base_url"],
+            client_id=default_config["client_id"],
+            client_secret=default_config["client_secret"],
+            tpl_key=default_config["tpl_key"],
+            user_login_id=default_config["user_login_id"],
+            user_agent=default_config["user_agent"],
+        )
+        self.client.client.request = MagicMock()
+        self.sleeps = []
+        self.client.rate_limiter._sleep = self.sleeps.append
+
+    def test_429_retried_after_retry_after(self):
+        """A 429 slows the limiter and the request is retried after Retry-After."""
+        self.client.client.request.side_effect = [
+            MockResponse(429, content=b"", headers={"Retry-After": "7"}),
+            MockResponse(200, content=b'{"data": 1}'),
+        ]
+        self.assertEqual(self.client.get("orders"), {"data": 1})
+        self.assertEqual(self.client.client.request.call_count, 2)
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertGreaterEqual(self.sleeps[0], 6.9)
+        self.assertEqual(self.client.rate_limiter.slowdowns, 1)
+        self.assertGreaterEqual(self.client.throttled_seconds, 6.9)
+
+    def test_429_gives_up(self):
+        """Persistent 429 responses raise Server429Error."""
+        self.client.client.request.return_value = MockResponse(429, content=b"", headers={"Retry-After": "1"})
+        with self.assertRaises(Server429Error) as err:
+            self.client.get("orders")
+        self.assertEqual(err.exception.retry_after, 1)
+        self.assertEqual(self.client.client.request.call_count, 8)
+
+    @parameterized.expand([
+        ["seconds", "120", 120],
+        ["missing", None, None],
+        ["invalid", "soon", None],
+        ["past_date", "Wed, 21 Oct 2015 07:28:00 GMT", 0],
+    ])
+    def test_parse_retry_after(self, test_name, value, expected):
+        self.assertEqual(parse_retry_after(value), expected)
+
 
 class TestTPLClientContextManager(unittest.TestCase):
     """Tests for context manager protocol."""
@@ -229,6 +598,7 @@ class TestTPLClientContextManager(unittest.TestCase):
             tpl_key=default_config["tpl_key"],
             user_login_id=default_config["user_login_id"],
             user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
         )
         client.client = MagicMock()
 
@@ -239,5 +609,142 @@ class TestTPLClientContextManager(unittest.TestCase):
         client.client.close.assert_called_once()
 
 
+class TestTPLClientTokenCache(unittest.TestCase):
+    """Tests for access token reuse across clients."""
+
+    def make_client(self, token_cache_path):
+        return TPLClient(
+            base_url=default_config["base_url"],
+            client_id=default_config["client_id"],
+            client_secret=default_config["client_secret"],
+            tpl_key=default_config["tpl_key"],
+            user_login_id=default_config["user_login_id"],
+            user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
+            token_cache_path=token_cache_path,
+        )
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def test_authenticates_once(self, mock_get_token):
+        """Creating and entering the client makes a single token request."""
+        mock_get_token.return_value = {
+            "token_type": "Bearer",
+            "access_token": "test_access_token",
+            "expires_in": 3600,
+        }
+        with self.make_client(None):
+            pass
+        mock_get_token.assert_called_once()
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def test_cached_token_reused_across_runs(self, mock_get_token):
+        """A second client with the same token_cache_path reuses the unexpired token."""
+        mock_get_token.return_value = {
+            "token_type": "Bearer",
+            "access_token": "test_access_token",
+            "expires_in": 3600,
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "tokens.json")
+            self.make_client(path)
+            client = self.make_client(path)
+        mock_get_token.assert_called_once()
+        self.assertEqual(client.client.headers["Authorization"], "Bearer test_access_token")
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def test_expired_cached_token_refreshed(self, mock_get_token):
+        """A cached token within the expiry margin is replaced by a new token."""
+        mock_get_token.side_effect = [
+            {"token_type": "Bearer", "access_token": "old_token", "expires_in": 60},
+            {"token_type": "Bearer", "access_token": "new_token", "expires_in": 3600},
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "tokens.json")
+            self.make_client(path)
+            client = self.make_client(path)
+        self.assertEqual(mock_get_token.call_count, 2)
+        self.assertEqual(client.client.headers["Authorization"], "Bearer new_token")
+
+
+class TestTPLClientTokenRefresh(unittest.TestCase):
+    """Tests for proactive and 401-triggered access token refresh."""
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def setUp(self, mock_get_token):
+        mock_get_token.return_value = {
+            "token_type": "Bearer",
+            "access_token": "old_token",
+            "expires_in": 3600,
+        }
+        self.client = TPLClient(
+            base_url=default_config["base_url"],
+            client_id=default_config["client_id"],
+            client_secret=default_config["client_secret"],
+            tpl_key=default_config["tpl_key"],
+            user_login_id=default_config["user_login_id"],
+            user_agent=default_config["user_agent"],
+            rate_limit_burst=100,
+        )
+        self.client.client.request = MagicMock(side_effect=self.mock_request)
+        self.sent_tokens = []
+
+    def mock_request(self, method, url, headers=None, **kwargs):
+        authorization = headers["Authorization"]
+        self.sent_tokens.append(authorization)
+        if authorization == "Bearer old_token":
+            return MockResponse(401, content=b"")
+        return MockResponse(200, content=b'{"data": 1}')
+
+    def new_token(self):
+        return {"token_type": "Bearer", "access_token": "new_token", "expires_in": 3600}
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def test_refresh_and_retry_on_401(self, mock_get_token):
+        """A 401 refreshes the token and retries the request once."""
+        mock_get_token.return_value = self.new_token()
+        self.assertEqual(self.client.get("orders"), {"data": 1})
+        mock_get_token.assert_called_once()
+        self.assertEqual(self.sent_tokens, ["Bearer old_token", "Bearer new_token"])
+        self.assertEqual(self.client.token_refreshes, 1)
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def test_repeated_401_raises(self, mock_get_token):
+        """A 401 with the new token is raised instead of refreshing again."""
+        mock_get_token.return_value = {"token_type": "Bearer", "access_token": "old_token"}
+        with self.assertRaises(TPLAPIError) as err:
+            self.client.get("orders")
+        self.assertEqual(err.exception.error_code, 401)
+        mock_get_token.assert_called_once()
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def test_proactive_refresh_before_expiry(self, mock_get_token):
+        """A token about to expire is replaced before the request is sent."""
+        mock_get_token.return_value = self.new_token()
+        self.client._token["expires_at"] = time.time() + 10
+        self.assertEqual(self.client.get("orders"), {"data": 1})
+        mock_get_token.assert_called_once()
+        self.assertEqual(self.sent_tokens, ["Bearer new_token"])
+
+    @patch("tap_3plcentral.client.TPLClient._get_access_token")
+    def test_concurrent_401s_share_one_refresh(self, mock_get_token):
+        """Threads rejected with the same token wait for a single refresh."""
+        workers = 8
+        barrier = threading.Barrier(workers)
+
+        def mock_request(method, url, headers=None, **kwargs):
+            if headers["Authorization"] == "Bearer old_token":
+                # Every thread is rejected before any refresh starts
+                barrier.wait(timeout=5)
+                return MockResponse(401, content=b"")
+            return MockResponse(200, content=b'{"data": 1}')
+
+        self.client.client.request = MagicMock(side_effect=mock_request)
+        mock_get_token.return_value = self.new_token()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda _: self.client.get("orders"), range(workers)))
+        self.assertEqual(results, [{"data": 1}] * workers)
+        mock_get_token.assert_called_once()
+
+
 if __name__ == "__main__":
     unittest.main()
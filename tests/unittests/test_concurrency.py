@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from tap_3plcentral.concurrency import ordered_map, ordered_map_async, pipeline
+
+
+class TestOrderedMap(unittest.TestCase):
+    """Tests for ordered_map."""
+
+    def test_serial_when_single_worker(self):
+        """Runs on the calling thread when max_workers is 1."""
+        threads = []
+
+        def func(item):
+            threads.append(threading.current_thread())
+            return item * 2
+
+        self.assertEqual(list(ordered_map(func, [1, 2, 3], 1)), [2, 4, 6])
+        self.assertEqual(set(threads), {threading.current_thread()})
+
+    def test_results_in_input_order(self):
+        """Results are yielded in input order even when later items finish first."""
+        def func(item):
+            time.sleep(0.01 * (5 - item))
+            return item
+
+        self.assertEqual(list(ordered_map(func, range(5), 4)), [0, 1, 2, 3, 4])
+
+    def test_bounded_in_flight(self):
+        """Never has more than max_workers calls running at once."""
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def func(item):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.005)
+            with lock:
+                running[0] -= 1
+            return item
+
+        self.assertEqual(list(ordered_map(func, range(20), 3)), list(range(20)))
+        self.assertLessEqual(peak[0], 3)
+
+    def test_exception_propagates(self):
+        """An exception in a worker is raised to the consumer."""
+        def func(item):
+            if item == 2:
+                raise ValueError("boom")
+            return item
+
+        with self.assertRaises(ValueError):
+            list(ordered_map(func, range(5), 2))
+
+
+class TestOrderedMapAsync(unittest.TestCase):
+    """Tests for ordered_map_async."""
+
+    def _collect(self, func, items, max_concurrency):
+        async def collect():
+            return [result async for result in ordered_map_async(func, items, max_concurrency)]
+        return asyncio.run(collect())
+
+    def test_results_in_input_order(self):
+        """Results are yielded in input order even when later items finish first."""
+        async def func(item):
+            await asyncio.sleep(0.01 * (5 - item))
+            return item
+
+        self.assertEqual(self._collect(func, range(5), 4), [0, 1, 2, 3, 4])
+
+    def test_bounded_in_flight(self):
+        """No more than max_concurrency calls run at once."""
+        running = []
+        peak = []
+
+        async def func(item):
+            running.append(item)
+            peak.append(len(running))
+            await asyncio.sleep(0.001)
+            running.remove(item)
+            return item
+
+        self.assertEqual(self._collect(func, range(10), 3), list(range(10)))
+        self.assertLessEqual(max(peak), 3)
+
+
+class TestPipeline(unittest.TestCase):
+    """Tests for pipeline."""
+
+    def test_serial_when_no_queue(self):
+        """Runs on the calling thread when queue_size is 0."""
+        threads = []
+
+        def func(item):
+            threads.append(threading.current_thread())
+            return item * 2
+
+        self.assertEqual(list(pipeline([1, 2, 3], func, 0)), [2, 4, 6])
+        self.assertEqual(set(threads), {threading.current_thread()})
+
+    def test_stages_run_on_other_threads_in_order(self):
+        """Items are produced and transformed off the calling thread, in order."""
+        producer_threads = []
+        func_threads = []
+
+        def items():
+            for item in range(10):
+                producer_threads.append(threading.current_thread())
+                yield item
+
+        def func(item):
+            func_threads.append(threading.current_thread())
+            return item * 2
+
+        self.assertEqual(list(pipeline(items(), func, 2)), [item * 2 for item in range(10)])
+        self.assertNotIn(threading.current_thread(), producer_threads + func_threads)
+        self.assertNotEqual(set(producer_threads), set(func_threads))
+
+    def test_backpressure(self):
+        """The producer runs at most a bounded number of items ahead of the consumer."""
+        produced = []
+
+        def items():
+            for item in range(100):
+                produced.append(item)
+                yield item
+
+        results = pipeline(items(), lambda item: item, 2)
+        self.assertEqual(next(results), 0)
+        time.sleep(0.2)
+        # consumed + results queue + in func + produced queue + in producer
+        self.assertLessEqual(len(produced), 7)
+        results.close()
+
+    def test_exception_propagates(self):
+        """An exception in either stage is raised to the consumer, after the earlier items."""
+        def items():
+            yield 1
+            raise ValueError("producer")
+
+        results = pipeline(items(), lambda item: item, 2)
+        self.assertEqual(next(results), 1)
+        with self.assertRaises(ValueError):
+            next(results)
+
+        def func(item):
+            if item == 2:
+                raise KeyError("func")
+            return item
+
+        with self.assertRaises(KeyError):
+            list(pipeline(range(5), func, 2))
+
+    def test_early_stop_closes_items(self):
+        """Stopping the consumer stops both stages and closes the items generator."""
+        closed = threading.Event()
+
+        def items():
+            try:
+                for item in range(1000):
+                    yield item
+            finally:
+                closed.set()
+
+        results = pipeline(items(), lambda item: item, 2)
+        self.assertEqual(next(results), 0)
+        results.close()
+        self.assertTrue(closed.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
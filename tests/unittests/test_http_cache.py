@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from tap_3plcentral.http_cache import HTTPCache
+
+
+class TestHTTPCache(unittest.TestCase):
+    """Tests for the on-disk HTTP response cache."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = HTTPCache(self.tmp_dir.name, ["customers"], ttl=60, namespace="tenant")
+        self.url = "https://secure-wms.com/customers?pgnum=1"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get(self.url))
+
+    def test_round_trip_with_validators(self):
+        self.cache.set(self.url, b'{"data": 1}', {"ETag": '"abc"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        entry = HTTPCache(self.tmp_dir.name, ["customers"], namespace="tenant").get(self.url)
+        self.assertEqual(entry.content, b'{"data": 1}')
+        self.assertEqual(entry.conditional_headers(), {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+        })
+        # Entries with validators are always revalidated
+        self.assertFalse(self.cache.is_fresh(entry))
+
+    def test_ttl_without_validators(self):
+        entry = self.cache.set(self.url, b'{"data": 1}', {})
+        self.assertTrue(self.cache.is_fresh(entry))
+        self.assertFalse(self.cache.is_fresh(entry, now=entry.stored_at + 61))
+
+    def test_namespaces_isolated(self):
+        self.cache.set(self.url, b'{"data": 1}', {})
+        other = HTTPCache(self.tmp_dir.name, ["customers"], namespace="other")
+        self.assertIsNone(other.get(self.url))
+
+    def test_touch_keeps_body(self):
+        entry = self.cache.set(self.url, b'{"data": 1}', {"ETag": '"abc"'})
+        stored_at = entry.stored_at
+        self.cache.touch(self.url, entry)
+        reread = self.cache.get(self.url)
+        self.assertEqual(reread.content, b'{"data": 1}')
+        self.assertGreaterEqual(reread.stored_at, stored_at)
+        self.assertFalse([name for name in os.listdir(self.tmp_dir.name) if name.endswith(".tmp")])
+
+    def test_single_private_file(self):
+        """Body and validators are stored in one owner-only file, so they are always
+        replaced together.
+        """
+        self.cache.set(self.url, b'{"data": 1}', {"ETag": '"abc"'})
+        self.cache.set(self.url, b'{"data": 2}', {"ETag": '"def"'})
+        names = os.listdir(self.tmp_dir.name)
+        self.assertEqual(len(names), 1)
+        self.assertEqual(os.stat(os.path.join(self.tmp_dir.name, names[0])).st_mode & 0o777, 0o600)
+        entry = self.cache.get(self.url)
+        self.assertEqual(entry.content, b'{"data": 2}')
+        self.assertEqual(entry.etag, '"def"')
+
+    def test_enabled_for(self):
+        self.assertTrue(self.cache.enabled_for("customers"))
+        self.assertFalse(self.cache.enabled_for("orders"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import decimal
+import json
+import unittest
+from unittest.mock import patch
+
+import singer
+from singer import utils
+from singer.messages import format_message
+
+from tap_3plcentral import json_codec
+
+
+class TestJsonCodec(unittest.TestCase):
+    """Every available backend decodes and encodes like the stdlib path."""
+
+    record = {
+        "order_id": 1,
+        "amount": 12.5,
+        "reference": "café ✓ </a>",
+        "last_modified_date": "2025-01-01T00:00:00.000000Z",
+        "is_closed": False,
+        "notes": None,
+        "order_items": [{"qty": 2, "price": 0.1}],
+    }
+
+    def tearDown(self):
+        json_codec.set_backend()
+
+    def _message(self, record):
+        return singer.RecordMessage(stream="orders", record=record,
+                                    time_extracted=utils.strptime_to_utc("2025-01-02T03:04:05Z"))
+
+    def test_backends_match_stdlib_output(self):
+        for name in json_codec.available_backends():
+            codec = json_codec.set_backend(name)
+            message = self._message(self.record)
+            self.assertEqual(json.loads(codec.dumps_message(message)),
+                             json.loads(format_message(message)), name)
+
+    def test_backends_decode(self):
+        body = json.dumps({"TotalResults": 1, "ResourceList": [self.record],
+                           "Big": 2 ** 70}).encode("utf-8")
+        for name in json_codec.available_backends():
+            codec = json_codec.set_backend(name)
+            self.assertEqual(codec.loads(body), json.loads(body), name)
+
+    def test_decimal_falls_back_to_stdlib(self):
+        message = self._message({"amount": decimal.Decimal("1.10")})
+        for name in json_codec.available_backends():
+            codec = json_codec.set_backend(name)
+            self.assertIn('"amount": 1.10', codec.dumps_message(message).replace('":1.10', '": 1.10'))
+
+    def test_auto_detects_fastest(self):
+        self.assertEqual(json_codec.set_backend("auto").name, json_codec.available_backends()[0])
+        self.assertEqual(json_codec.available_backends()[-1], "stdlib")
+
+    def test_unavailable_backend_raises(self):
+        with patch.dict(json_codec.BACKENDS, {"ujson": None}):
+            with self.assertRaises(ValueError):
+                json_codec.set_backend("ujson")
+
+
+if __name__ == "__main__":
+    unittest.main()
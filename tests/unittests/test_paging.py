@@ -0,0 +1,50 @@
+import unittest
+
+from tap_3plcentral.paging import AdaptivePageSize
+
+
+class TestAdaptivePageSize(unittest.TestCase):
+    """Tests for the adaptive page size tuner."""
+
+    def _run(self, tuner, seconds_for_size, pages=40):
+        sizes = []
+        for _ in range(pages):
+            size = tuner.page_size
+            sizes.append(size)
+            tuner.observe(size, seconds_for_size(size))
+        return sizes
+
+    def test_grows_to_best_and_settles(self):
+        """Throughput peaks at 400 records/page: tuner finds it and settles."""
+        def seconds_for_size(size):
+            # latency grows faster than linearly above 400
+            return 0.5 + size / 400.0 + (max(size - 400, 0) / 100.0) ** 2
+        tuner = AdaptivePageSize(200, 50, 1600, sample_pages=1)
+        sizes = self._run(tuner, seconds_for_size)
+        self.assertTrue(tuner.settled)
+        self.assertEqual(tuner.page_size, 400)
+        self.assertEqual(sizes[-1], 400)
+        self.assertIn(800, sizes)
+
+    def test_shrinks_when_smaller_pages_are_faster(self):
+        def seconds_for_size(size):
+            return (size / 50.0) ** 2
+        tuner = AdaptivePageSize(200, 50, 1000, sample_pages=1)
+        self._run(tuner, seconds_for_size)
+        self.assertTrue(tuner.settled)
+        self.assertEqual(tuner.page_size, 50)
+
+    def test_stays_within_bounds(self):
+        tuner = AdaptivePageSize(5000, 100, 1000, sample_pages=1)
+        self.assertEqual(tuner.page_size, 1000)
+        sizes = self._run(tuner, lambda size: 1.0)
+        self.assertTrue(all(100 <= size <= 1000 for size in sizes))
+
+    def test_partial_pages_ignored(self):
+        tuner = AdaptivePageSize(200, 50, 1000, sample_pages=1)
+        self.assertEqual(tuner.observe(10, 0.1), 200)
+        self.assertIsNone(tuner.best_throughput)
+
+
+if __name__ == "__main__":
+    unittest.main()
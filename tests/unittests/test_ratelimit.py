@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from tap_3plcentral.ratelimit import TokenBucket
+
+
+class FakeClock:
+    """Clock advanced only by the limiter's sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Tests for the token-bucket rate limiter."""
+
+    def make_bucket(self, rate=10, period=1, burst=None):
+        self.clock = FakeClock()
+        return TokenBucket(rate, period, burst, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_burst_then_rate(self):
+        bucket = self.make_bucket(rate=10, period=1, burst=5)
+        waits = [bucket.acquire() for _ in range(7)]
+        self.assertEqual(waits[:5], [0] * 5)
+        self.assertAlmostEqual(waits[5], 0.1)
+        self.assertAlmostEqual(waits[6], 0.1)
+        self.assertAlmostEqual(bucket.throttled_seconds, 0.2)
+
+    def test_refills_over_time(self):
+        bucket = self.make_bucket(rate=10, period=1, burst=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.clock.now += 1
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+
+    def test_default_never_exceeds_rate_per_period(self):
+        """Under the defaults (400 calls / 60 s), no 60 s window sees more than 400 calls."""
+        self.clock = FakeClock()
+        bucket = TokenBucket(clock=self.clock, sleep=self.clock.sleep)
+        times = []
+        for _ in range(1200):
+            bucket.acquire()
+            times.append(self.clock.now)
+        # Call i + 400 is at least 60 s after call i, so [t, t + 60) holds at most 400 calls
+        for i in range(len(times) - 400):
+            self.assertGreaterEqual(times[i + 400] - times[i], 60 - 1e-6)
+
+    def test_slow_down_blocks_for_retry_after(self):
+        bucket = self.make_bucket(rate=10, period=1)
+        bucket.slow_down(retry_after=3)
+        self.assertEqual(bucket.rate, 5)
+        self.assertAlmostEqual(bucket.acquire(), 3 + 1 / 5.0)
+        self.assertEqual(bucket.slowdowns, 1)
+
+    def test_rate_recovers_additively(self):
+        bucket = self.make_bucket(rate=10, period=1)
+        bucket.slow_down(retry_after=0)
+        bucket.slow_down(retry_after=0)
+        self.assertEqual(bucket.rate, 2.5)
+        for _ in range(100):
+            bucket.on_success()
+        self.assertEqual(bucket.rate, 10)
+
+    def test_concurrent_callers_share_limit(self):
+        bucket = TokenBucket(1000, 1, burst=10)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: bucket.acquire(), range(50)))
+        # 40 calls beyond the burst at 1000 calls/sec
+        self.assertGreaterEqual(time.monotonic() - start, 0.035)
+
+
+if __name__ == "__main__":
+    unittest.main()
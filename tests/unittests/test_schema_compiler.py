@@ -0,0 +1,122 @@
+import copy
+import random
+import unittest
+
+from singer import Transformer, metadata
+from singer.transform import SchemaMismatch
+
+from tap_3plcentral.schema import get_schemas
+from tap_3plcentral.schema_compiler import compile_transformer, TransformMismatch
+
+
+def sample_value(schema, rnd, depth=0):
+    """Build a random value for a schema, including values that need coercion."""
+    if 'anyOf' in schema:
+        return sample_value(rnd.choice(schema['anyOf']), rnd, depth)
+    types = schema.get('type', [])
+    if not isinstance(types, list):
+        types = [types]
+    if 'null' in types and rnd.random() < 0.2:
+        return rnd.choice([None, ''])
+    typ = rnd.choice([typ for typ in types if typ != 'null'] or ['null'])
+    if typ == 'object':
+        if depth > 4:
+            return {}
+        record = {key: sample_value(sub_schema, rnd, depth + 1)
+                  for key, sub_schema in schema.get('properties', {}).items()
+                  if rnd.random() < 0.8}
+        record['unknownField'] = 'dropped'
+        return record
+    if typ == 'array':
+        return [sample_value(schema['items'], rnd, depth + 1) for _ in range(rnd.randint(0, 2))]
+    if typ == 'string' and schema.get('format') == 'date-time':
+        return rnd.choice(['2019-01-0{}T10:00:00'.format(rnd.randint(1, 9)),
+                           '2020-06-15T23:59:59.123+02:00', '2021-03-01T00:00:00Z'])
+    if typ == 'integer':
+        return rnd.choice([rnd.randint(0, 10000), str(rnd.randint(0, 10000)), '1,234'])
+    if typ == 'number':
+        return rnd.choice([rnd.random() * 100, '12.5', 7, '1,000.25'])
+    if typ == 'boolean':
+        return rnd.choice([True, False, 'false', 'False', 1, 0])
+    if typ == 'string':
+        return rnd.choice(['abc', 12, 3.5])
+    return None
+
+
+class TestCompileTransformer(unittest.TestCase):
+    """Compiled transforms give the same output as singer.Transformer."""
+
+    def _assert_same_as_singer(self, schema, records, mdata=None):
+        removed, filtered = set(), set()
+        compiled = compile_transformer(schema, mdata, removed, filtered)
+        self.assertIsNotNone(compiled)
+        transformer = Transformer()
+        for record in records:
+            expected = transformer.transform(copy.deepcopy(record), copy.deepcopy(schema), mdata)
+            self.assertEqual(compiled(copy.deepcopy(record)), expected)
+        # Same paths reported as removed (missing from the schema) and filtered
+        self.assertEqual(removed, transformer.removed)
+        self.assertEqual(filtered, transformer.filtered)
+
+    def test_all_stream_schemas(self):
+        """Random records for every stream schema transform identically."""
+        schemas, field_metadata = get_schemas()
+        rnd = random.Random(42)
+        for stream_name, schema in schemas.items():
+            mdata = metadata.to_map(field_metadata[stream_name])
+            records = [sample_value(schema, rnd) for _ in range(25)]
+            self._assert_same_as_singer(schema, records, mdata)
+
+    def test_nullable_boolean_none_is_false(self):
+        """Like singer, a nullable boolean turns None into False (boolean is tried first)."""
+        schema = {"type": "object", "properties": {"flag": {"type": ["null", "boolean"]}}}
+        self._assert_same_as_singer(schema, [{"flag": None}, {"flag": "false"}, {"flag": ""}])
+
+    def test_unselected_fields_removed(self):
+        """Fields deselected in metadata are removed, automatic fields are kept."""
+        schema = {"type": "object", "properties": {
+            "id": {"type": ["null", "integer"]},
+            "name": {"type": ["null", "string"]},
+        }}
+        mdata = {
+            ("properties", "id"): {"inclusion": "automatic", "selected": False},
+            ("properties", "name"): {"inclusion": "available", "selected": False},
+        }
+        compiled = compile_transformer(schema, mdata)
+        self.assertEqual(compiled({"id": "5", "name": "x"}), {"id": 5})
+
+    def test_removed_and_filtered_paths(self):
+        """Properties missing from the schema and deselected properties are reported,
+        with the same paths as singer.Transformer, including in arrays."""
+        schema = {"type": "object", "properties": {
+            "id": {"type": ["null", "integer"]},
+            "name": {"type": ["null", "string"]},
+            "items": {"type": ["null", "array"], "items": {"type": "object", "properties": {
+                "sku": {"type": ["null", "string"]},
+            }}},
+        }}
+        mdata = {("properties", "name"): {"inclusion": "available", "selected": False}}
+        records = [{"id": 1, "name": "x", "extra": 2, "items": [{"sku": "a"}, {"sku": "b", "new": 1}]}]
+        self._assert_same_as_singer(schema, records, mdata)
+        removed, filtered = set(), set()
+        compile_transformer(schema, mdata, removed, filtered)(copy.deepcopy(records[0]))
+        self.assertEqual(removed, {"extra", "items.1.new"})
+        self.assertEqual(filtered, {"name"})
+
+    def test_mismatch_raises(self):
+        """A value matching no schema type raises TransformMismatch, like singer's SchemaMismatch."""
+        schema = {"type": "object", "properties": {"id": {"type": "integer"}}}
+        compiled = compile_transformer(schema)
+        with self.assertRaises(TransformMismatch):
+            compiled({"id": "abc"})
+        with self.assertRaises(SchemaMismatch):
+            Transformer().transform({"id": "abc"}, schema)
+
+    def test_unsupported_schema_returns_none(self):
+        """Schemas using patternProperties are left to singer.Transformer."""
+        schema = {"type": "object", "patternProperties": {".+": {"type": "string"}}}
+        self.assertIsNone(compile_transformer(schema))
+
+
+if __name__ == "__main__":
+    unittest.main()
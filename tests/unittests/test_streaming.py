@@ -0,0 +1,64 @@
+import json
+import unittest
+
+from tap_3plcentral.streaming import StreamedPage
+
+
+def chunked(text, size):
+    """Split a JSON body into byte chunks of the given size."""
+    body = text.encode("utf-8")
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class TestStreamedPage(unittest.TestCase):
+    """Tests for incremental page parsing."""
+
+    page = {
+        "ResourceList": [
+            {"OrderId": 1, "Amount": 12345.678, "Note": "café ✓", "Items": [{"Id": 1}, {"Id": 2}]},
+            {"OrderId": 2, "Amount": 0, "Note": None, "Items": []},
+            {"OrderId": 3, "Amount": -1e-05, "Note": "a, b]}", "Items": [{"Id": 3}]},
+        ],
+        "TotalResults": 3,
+        "_links": {"next": "/orders?pgnum=2"},
+    }
+
+    def test_records_and_envelope_any_chunk_size(self):
+        """Records and envelope match json.loads for every chunk size."""
+        text = json.dumps(self.page, ensure_ascii=False)
+        for size in [1, 2, 3, 7, 64, len(text) + 1]:
+            page = StreamedPage(chunked(text, size), "ResourceList")
+            self.assertEqual(list(page), self.page["ResourceList"])
+            self.assertEqual(page["TotalResults"], 3)
+            self.assertIn("_links", page)
+            self.assertNotIn("ResourceList", page)
+
+    def test_envelope_before_records(self):
+        text = json.dumps({"TotalResults": 1, "ResourceList": [{"Id": 1}]}, indent=2)
+        page = StreamedPage(chunked(text, 5), "ResourceList")
+        self.assertEqual(list(page), [{"Id": 1}])
+        self.assertEqual(page.get("TotalResults"), 1)
+
+    def test_empty_list_and_object(self):
+        self.assertEqual(list(StreamedPage([b'{"ResourceList": []}'], "ResourceList")), [])
+        self.assertEqual(list(StreamedPage([b"{}"], "ResourceList")), [])
+
+    def test_single_record_object(self):
+        page = StreamedPage([b'{"Summaries": {"Id": 9}}'], "Summaries")
+        self.assertEqual(list(page), [{"Id": 9}])
+
+    def test_truncated_body_raises(self):
+        with self.assertRaises(ValueError):
+            list(StreamedPage([b'{"ResourceList": [{"Id": 1}, '], "ResourceList"))
+
+    def test_closes_when_consumed(self):
+        closed = []
+        page = StreamedPage([b'{"ResourceList": [1, 2]}'], "ResourceList", on_close=lambda: closed.append(True))
+        for _ in page:
+            break
+        page.close()
+        self.assertEqual(closed, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
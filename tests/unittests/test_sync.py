@@ -1,7 +1,10 @@
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch, call
 
 import singer
+from tap_3plcentral import writer
 from tap_3plcentral.sync import (
     get_bookmark,
     write_bookmark,
@@ -12,6 +15,26 @@ from tap_3plcentral.sync import (
     process_records,
     sync_endpoint,
     sync,
+    iter_pages,
+    get_total_pages,
+    sync_children,
+    get_parent_id_field,
+    write_record,
+    OutputBuffer,
+    RecordProcessor,
+    get_record_processor,
+    iter_adaptive_pages,
+    get_pipeline_queue_size,
+    get_date_windows,
+    get_endpoint_params,
+    get_keyset_rql,
+    iter_keyset_pages,
+    clear_bookmark,
+    get_page_checkpoint,
+    get_page_signature,
+    get_parent_bookmark,
+    write_parent_bookmark,
+    clear_parent_bookmark_default,
 )
 
 
@@ -462,6 +485,883 @@ class TestProcessRecords(unittest.TestCase):
         self.assertEqual(written_record["customer_id"], 1)
 
 
+class TestRecordProcessor(unittest.TestCase):
+    """Tests for the per-stream RecordProcessor."""
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "item_id": {"type": ["null", "integer"]},
+            "last_modified_date": {"type": ["null", "string"], "format": "date-time"},
+        },
+    }
+
+    def _make_catalog(self):
+        mock_stream = MagicMock()
+        mock_stream.schema.to_dict.return_value = self.schema
+        mock_stream.metadata = [{"breadcrumb": (), "metadata": {}}]
+        mock_catalog = MagicMock()
+        mock_catalog.get_stream.return_value = mock_stream
+        return mock_catalog
+
+    def test_processor_cached_per_stream(self):
+        """get_record_processor builds one processor per stream per run."""
+        catalog = self._make_catalog()
+        processors = {}
+        first = get_record_processor(processors, catalog, "sku_items")
+        second = get_record_processor(processors, catalog, "sku_items")
+        self.assertIs(first, second)
+        catalog.get_stream.assert_called_once_with("sku_items")
+
+    def test_datetime_threshold_parsed_once(self):
+        """The bookmark threshold is parsed once per distinct value."""
+        processor = RecordProcessor(self._make_catalog(), "sku_items")
+        with patch.object(processor, "parse_datetime", wraps=processor.parse_datetime) as mock_parse:
+            processor.datetime_threshold("2025-01-01T00:00:00Z")
+            processor.datetime_threshold("2025-01-01T00:00:00Z")
+        mock_parse.assert_called_once()
+
+    @patch("tap_3plcentral.sync.write_record")
+    def test_process_records_reuses_processor(self, mock_write_record):
+        """process_records with a processor does not re-read the catalog and filters by bookmark."""
+        catalog = self._make_catalog()
+        processor = RecordProcessor(catalog, "sku_items")
+        records = [
+            {"item_id": 1, "last_modified_date": "2024-12-01T00:00:00Z"},
+            {"item_id": 2, "last_modified_date": "2025-02-01T00:00:00Z"},
+        ]
+        for _ in range(2):
+            max_bm, count = process_records(
+                catalog=catalog,
+                stream_name="sku_items",
+                records=[dict(record) for record in records],
+                time_extracted=None,
+                bookmark_field="last_modified_date",
+                bookmark_type="datetime",
+                last_datetime="2025-01-01T00:00:00Z",
+                processor=processor)
+            self.assertEqual(count, 1)
+            self.assertEqual(max_bm, "2025-02-01T00:00:00.000000Z")
+        catalog.get_stream.assert_called_once_with("sku_items")
+
+    def test_close_logs_removed_paths(self):
+        """close() logs the paths removed by the compiled transform, with the same
+        warnings as the singer.Transformer fallback."""
+        logged = []
+        for compiled in (True, False):
+            processor = RecordProcessor(self._make_catalog(), "sku_items")
+            if not compiled:
+                processor.compiled_transform = None
+            processor.transform({"item_id": 1, "new_field": "x"})
+            with patch("singer.transform.LOGGER") as mock_logger:
+                processor.close()
+            logged.append(mock_logger.debug.call_args_list)
+        self.assertIn(call("Removed paths list: %s", ["new_field"]), logged[0])
+        self.assertEqual(logged[0], logged[1])
+
+    def test_mismatched_record_falls_back_to_singer_transformer(self):
+        """A record the compiled transform rejects raises singer's SchemaMismatch."""
+        from singer.transform import SchemaMismatch
+        processor = RecordProcessor(self._make_catalog(), "sku_items")
+        self.assertIsNotNone(processor.compiled_transform)
+        with self.assertRaises(SchemaMismatch):
+            processor.transform({"item_id": "not-a-number"})
+
+
+class TestIterPages(unittest.TestCase):
+    """Tests for page iteration and concurrent page prefetching."""
+
+    def _get_page(self, total_results, calls):
+        def get_page(page):
+            calls.append(page)
+            return {"TotalResults": total_results, "ResourceList": [page]}, "extracted"
+        return get_page
+
+    def test_get_total_pages(self):
+        self.assertEqual(get_total_pages({"TotalResults": 450}, 200), 3)
+        self.assertEqual(get_total_pages({"TotalResults": 50}, 200), 1)
+        self.assertEqual(get_total_pages({"ResourceList": []}, 200), 1)
+        self.assertEqual(get_total_pages(None, 200), 1)
+
+    def test_serial_pages(self):
+        """Serial mode fetches every page once, in order."""
+        calls = []
+        pages = list(iter_pages(self._get_page(450, calls), 200))
+        self.assertEqual([page for page, _, _ in pages], [1, 2, 3])
+        self.assertEqual(calls, [1, 2, 3])
+
+    def test_prefetch_pages_in_order(self):
+        """Prefetch mode yields every page once, in page order."""
+        calls = []
+        pages = list(iter_pages(self._get_page(1000, calls), 100, page_workers=4))
+        self.assertEqual([page for page, _, _ in pages], list(range(1, 11)))
+        self.assertEqual([data["ResourceList"] for _, data, _ in pages],
+                         [[page] for page in range(1, 11)])
+        self.assertEqual(sorted(calls), list(range(1, 11)))
+
+    def test_prefetch_single_page(self):
+        """Prefetch mode stops after page 1 when there is only one page."""
+        calls = []
+        pages = list(iter_pages(self._get_page(10, calls), 100, page_workers=4))
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(calls, [1])
+
+    @patch("tap_3plcentral.sync.write_bookmark")
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records")
+    def test_sync_endpoint_prefetch_keeps_page_order(self, mock_process, mock_schema, mock_bookmark):
+        """sync_endpoint with page_workers processes pages in page order."""
+        mock_process.side_effect = lambda **kwargs: (kwargs["max_bookmark_value"], len(kwargs["records"]))
+        mock_client = MagicMock()
+
+        def get(path, querystring=None, endpoint=None):
+            page = int(dict(p.split("=", 1) for p in querystring.split("&"))["pgnum"])
+            return {"TotalResults": 5, "ResourceList": [{"OrderId": page}]}
+        mock_client.get.side_effect = get
+
+        total = sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state={},
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="orders",
+            path="orders",
+            endpoint_config={},
+            data_key="ResourceList",
+            static_params={"pgsiz": 1},
+            config={"page_workers": 3},
+        )
+        self.assertEqual(total, 5)
+        processed = [call_args.kwargs["records"][0]["order_id"] for call_args in mock_process.call_args_list]
+        self.assertEqual(processed, [1, 2, 3, 4, 5])
+
+    @patch("tap_3plcentral.sync.write_bookmark")
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records")
+    def test_sync_endpoint_streamed_pages(self, mock_process, mock_schema, mock_bookmark):
+        """With stream_pages, records are transformed lazily from a StreamedPage."""
+        from tap_3plcentral.streaming import StreamedPage
+        processed = []
+
+        def process(**kwargs):
+            records = list(kwargs["records"])
+            processed.extend(records)
+            return kwargs["max_bookmark_value"], len(records)
+        mock_process.side_effect = process
+
+        mock_client = MagicMock()
+        bodies = [
+            b'{"ResourceList": [{"OrderId": 1}, {"OrderId": 2}], "TotalResults": 3}',
+            b'{"ResourceList": [{"OrderId": 3}], "TotalResults": 3}',
+        ]
+        mock_client.get_streamed.side_effect = [StreamedPage([body], "ResourceList") for body in bodies]
+
+        total = sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state={},
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="orders",
+            path="orders",
+            endpoint_config={},
+            data_key="ResourceList",
+            static_params={"pgsiz": 2},
+            config={"stream_pages": "true"},
+        )
+        self.assertEqual(total, 3)
+        self.assertEqual(processed, [{"order_id": 1}, {"order_id": 2}, {"order_id": 3}])
+        mock_client.get.assert_not_called()
+
+
+    @patch("tap_3plcentral.sync.write_bookmark")
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.write_record")
+    def test_sync_endpoint_pipeline_stages(self, mock_write_record, mock_schema, mock_bookmark):
+        """With pipeline_stages, records are transformed off this thread, and written
+        and bookmarked on it, in page order."""
+        write_threads = []
+        mock_write_record.side_effect = lambda *args, **kwargs: write_threads.append(threading.current_thread())
+        mock_client = MagicMock()
+
+        def get(path, querystring=None, endpoint=None):
+            page = int(dict(p.split("=", 1) for p in querystring.split("&"))["pgnum"])
+            return {"TotalResults": 5, "ResourceList": [{"OrderId": page}]}
+        mock_client.get.side_effect = get
+
+        processor = MagicMock()
+        transform_threads = []
+
+        def transform(record):
+            transform_threads.append(threading.current_thread())
+            return record
+        processor.transform.side_effect = transform
+
+        total = sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state={},
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="orders",
+            path="orders",
+            endpoint_config={},
+            data_key="ResourceList",
+            static_params={"pgsiz": 1},
+            config={"pipeline_stages": "true", "page_workers": 2},
+            processors={"orders": processor},
+        )
+        self.assertEqual(total, 5)
+        written = [call_args.args[1]["order_id"] for call_args in mock_write_record.call_args_list]
+        self.assertEqual(written, [1, 2, 3, 4, 5])
+        self.assertEqual(set(write_threads), {threading.current_thread()})
+        self.assertNotIn(threading.current_thread(), transform_threads)
+
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.write_record")
+    def test_sync_endpoint_pipeline_stops_on_error(self, mock_write_record, mock_schema):
+        """An error while writing records stops the pipeline stages."""
+        mock_write_record.side_effect = OSError("Broken pipe")
+        mock_client = MagicMock()
+        mock_client.get.return_value = {"TotalResults": 1000, "ResourceList": [{"OrderId": 1}]}
+        threads = threading.active_count()
+
+        # The traceback keeps sync_endpoint's frame, and the pipeline, referenced
+        error = None
+        try:
+            sync_endpoint(
+                client=mock_client,
+                catalog=MagicMock(),
+                state={},
+                start_date="2019-01-01T00:00:00Z",
+                stream_name="orders",
+                path="orders",
+                endpoint_config={},
+                data_key="ResourceList",
+                static_params={"pgsiz": 1},
+                config={"pipeline_stages": "true"},
+            )
+        except OSError as err:
+            error = err
+        self.assertIsNotNone(error.__traceback__)
+        deadline = time.monotonic() + 5
+        while threading.active_count() > threads and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(threading.active_count(), threads)
+        self.assertLess(mock_client.get.call_count, 1000)
+
+    def test_get_pipeline_queue_size(self):
+        self.assertEqual(get_pipeline_queue_size(None), 0)
+        self.assertEqual(get_pipeline_queue_size({"pipeline_stages": "true"}), 2)
+        self.assertEqual(get_pipeline_queue_size({"pipeline_stages": True, "pipeline_queue_size": 4}), 4)
+
+
+class TestDateWindows(unittest.TestCase):
+    """Tests for date-windowed syncs of INCREMENTAL datetime streams."""
+
+    def test_get_date_windows(self):
+        end = singer.utils.strptime_to_utc("2019-01-25T12:00:00Z")
+        windows = get_date_windows("2019-01-01T00:00:00Z", end, 10)
+        self.assertEqual(windows, [
+            ("2019-01-01T00:00:00Z", "2019-01-11T00:00:00.000000Z"),
+            ("2019-01-11T00:00:00.000000Z", "2019-01-21T00:00:00.000000Z"),
+            ("2019-01-21T00:00:00.000000Z", None),
+        ])
+
+    def test_get_date_windows_bookmark_after_end(self):
+        end = singer.utils.strptime_to_utc("2019-01-01T00:00:00Z")
+        self.assertEqual(get_date_windows("2019-02-01T00:00:00Z", end, 10),
+                         [("2019-02-01T00:00:00Z", None)])
+
+    def test_get_endpoint_params_window_end(self):
+        params, _ = get_endpoint_params(
+            {"pgsiz": 100}, "ReadOnly.lastModifiedDate", "datetime",
+            last_datetime="2019-01-01T00:00:00Z", window_end="2019-01-11T00:00:00Z")
+        self.assertEqual(
+            params["rql"],
+            "ReadOnly.lastModifiedDate=ge=2019-01-01T00:00:00Z;ReadOnly.lastModifiedDate=lt=2019-01-11T00:00:00Z")
+
+    def _sync_windowed(self, config, mock_now, record_windows=("01", "11", "21"), parent_id=None):
+        """Sync orders over three 10 day windows, with one record per window in
+        record_windows, where earlier windows are slower to respond."""
+        import time
+        mock_now.return_value = singer.utils.strptime_to_utc("2019-01-25T00:00:00Z")
+        queries = []
+
+        def get(path, querystring=None, endpoint=None):
+            rql = dict(p.split("=", 1) for p in querystring.split("&"))["rql"]
+            queries.append(rql)
+            start = rql.split(";")[0].split("=ge=")[1]
+            time.sleep(0.01 * (30 - int(start[8:10])) / 10)
+            if start[8:10] not in record_windows:
+                return {"TotalResults": 0, "ResourceList": []}
+            return {"TotalResults": 1, "ResourceList": [{"OrderId": start[8:10], "lastModifiedDate": start}]}
+        mock_client = MagicMock()
+        mock_client.get.side_effect = get
+
+        processor = MagicMock()
+        processor.transform.side_effect = lambda record: record
+        processor.datetime_threshold.side_effect = singer.utils.strptime_to_utc
+        processor.parse_datetime.side_effect = singer.utils.strptime_to_utc
+
+        state = {}
+        total = sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state=state,
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="orders",
+            path="orders",
+            endpoint_config={},
+            data_key="ResourceList",
+            static_params={"pgsiz": 100},
+            bookmark_query_field="ReadOnly.lastModifiedDate",
+            bookmark_field="last_modified_date",
+            bookmark_type="datetime",
+            parent="customer" if parent_id is not None else None,
+            parent_id=parent_id,
+            config=config,
+            processors={"orders": processor},
+        )
+        return total, state, queries
+
+    @patch("tap_3plcentral.sync.utils.now")
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    @patch("tap_3plcentral.sync.write_schema")
+    def test_concurrent_windows_written_in_order(self, mock_schema, mock_write_message, mock_write_state, mock_now):
+        """Windows are fetched concurrently; records and bookmarks are written in window order."""
+        total, state, queries = self._sync_windowed({"date_window_days": 10, "window_workers": 3}, mock_now)
+        self.assertEqual(total, 3)
+        self.assertEqual(sorted(queries), [
+            "ReadOnly.lastModifiedDate=ge=2019-01-01T00:00:00Z;ReadOnly.lastModifiedDate=lt=2019-01-11T00:00:00.000000Z",
+            "ReadOnly.lastModifiedDate=ge=2019-01-11T00:00:00.000000Z;ReadOnly.lastModifiedDate=lt=2019-01-21T00:00:00.000000Z",
+            "ReadOnly.lastModifiedDate=ge=2019-01-21T00:00:00.000000Z",
+        ])
+        written = [call_args[0][0].record["order_id"] for call_args in mock_write_message.call_args_list]
+        self.assertEqual(written, ["01", "11", "21"])
+        bookmarks = [call_args[0][0]["bookmarks"]["orders"]["last_modified_date"]
+                     for call_args in mock_write_state.call_args_list]
+        self.assertEqual(bookmarks, sorted(bookmarks))
+        self.assertEqual(state["bookmarks"]["orders"]["last_modified_date"], "2019-01-21T00:00:00.000000Z")
+
+    @patch("tap_3plcentral.sync.utils.now")
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    @patch("tap_3plcentral.sync.write_schema")
+    def test_serial_windows(self, mock_schema, mock_write_message, mock_write_state, mock_now):
+        total, state, queries = self._sync_windowed({"date_window_days": 10}, mock_now)
+        self.assertEqual(total, 3)
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(state["bookmarks"]["orders"]["last_modified_date"], "2019-01-21T00:00:00.000000Z")
+        mock_schema.assert_called_once()
+
+    @patch("tap_3plcentral.sync.utils.now")
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    @patch("tap_3plcentral.sync.write_schema")
+    def test_concurrent_windows_parent_bookmark(self, mock_schema, mock_write_message, mock_write_state, mock_now):
+        """Per-parent bookmarks after concurrent windows match a serial sync: the last,
+        empty, window does not move a parent's bookmark back to its start."""
+        states = []
+        for config in ({"date_window_days": 10}, {"date_window_days": 10, "window_workers": 3}):
+            for record_windows in (("11",), ()):
+                _, state, _ = self._sync_windowed(config, mock_now, record_windows, parent_id=7)
+                states.append(state["bookmarks"]["orders"]["parents"])
+        self.assertEqual(states[0], {"7": "2019-01-11T00:00:00.000000Z"})
+        self.assertEqual(states[1], {"7": "2019-01-01T00:00:00Z"})
+        self.assertEqual(states[2:], states[:2])
+        self.assertEqual(mock_schema.call_count, 4)
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """Tests for keyset (seek) pagination."""
+
+    ORDER_KEYSET = [("ReadOnly.lastModifiedDate", "last_modified_date"), ("ReadOnly.OrderId", "order_id")]
+
+    def test_get_keyset_rql_single_field(self):
+        self.assertEqual(get_keyset_rql([("ReceiveItemId", "receive_item_id")], (42,)), "ReceiveItemId=gt=42")
+
+    def test_get_keyset_rql_compound(self):
+        self.assertEqual(
+            get_keyset_rql(self.ORDER_KEYSET, ("2019-01-01T00:00:00", 7)),
+            "(ReadOnly.lastModifiedDate=gt=2019-01-01T00:00:00,"
+            "(ReadOnly.lastModifiedDate==2019-01-01T00:00:00;ReadOnly.OrderId=gt=7))")
+
+    def test_iter_keyset_pages(self):
+        keys = []
+
+        def get_page_after(last_key):
+            keys.append(last_key)
+            start = 0 if last_key is None else last_key + 1
+            return {"ResourceList": [{"Id": i} for i in range(start, min(start + 2, 5))]}, "extracted"
+
+        pages = list(iter_keyset_pages(get_page_after, "ResourceList", 2, lambda record: record["Id"]))
+        self.assertEqual([page for page, _, _ in pages], [1, 2, 3])
+        self.assertEqual(keys, [None, 1, 3])
+
+    def test_iter_keyset_pages_predicate_ignored(self):
+        """A server that ignores the keyset predicate returns the first page again: raise
+        instead of repeating its records forever.
+        """
+        def get_page_after(last_key):
+            return {"ResourceList": [{"Id": 0}, {"Id": 1}]}, "extracted"
+
+        pages = iter_keyset_pages(get_page_after, "ResourceList", 2, lambda record: record["Id"])
+        self.assertEqual(next(pages)[0], 1)
+        with self.assertRaises(ValueError):
+            next(pages)
+
+    @patch("tap_3plcentral.sync.write_bookmark")
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records")
+    def test_sync_endpoint_keyset(self, mock_process, mock_schema, mock_bookmark):
+        """Each page after the first is requested with an =gt= predicate on the last key."""
+        mock_process.side_effect = lambda **kwargs: (kwargs["max_bookmark_value"], len(kwargs["records"]))
+        orders = [{"ReadOnly": {"OrderId": i, "LastModifiedDate": "2019-01-0{}T00:00:00".format(i // 2 + 1)}}
+                  for i in range(5)]
+        queries = []
+
+        def get(path, querystring=None, endpoint=None):
+            params = dict(p.split("=", 1) for p in querystring.split("&"))
+            queries.append(params)
+            page = len(queries) - 1
+            return {"TotalResults": 5 - 2 * page, "ResourceList": orders[2 * page:2 * page + 2]}
+        mock_client = MagicMock()
+        mock_client.get.side_effect = get
+
+        total = sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state={},
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="orders",
+            path="orders",
+            endpoint_config={"keyset_fields": self.ORDER_KEYSET},
+            data_key="ResourceList",
+            static_params={"pgsiz": 2, "sort": "ReadOnly.lastModifiedDate"},
+            bookmark_query_field="ReadOnly.lastModifiedDate",
+            bookmark_field="last_modified_date",
+            bookmark_type="datetime",
+            config={"keyset_pagination": "true"},
+        )
+        self.assertEqual(total, 5)
+        self.assertEqual([params["pgnum"] for params in queries], ["1", "1", "1"])
+        self.assertEqual({params["sort"] for params in queries}, {"ReadOnly.lastModifiedDate,ReadOnly.OrderId"})
+        self.assertEqual(queries[0]["rql"], "ReadOnly.lastModifiedDate=ge=2019-01-01T00:00:00Z")
+        self.assertEqual(
+            queries[2]["rql"],
+            "ReadOnly.lastModifiedDate=ge=2019-01-01T00:00:00Z;"
+            "(ReadOnly.lastModifiedDate=gt=2019-01-02T00:00:00,"
+            "(ReadOnly.lastModifiedDate==2019-01-02T00:00:00;ReadOnly.OrderId=gt=3))")
+
+
+class TestPageCheckpoints(unittest.TestCase):
+    """Tests for page checkpoints of FULL_TABLE streams."""
+
+    def _sync(self, state, config, pages_fetched, fail_on_page=None):
+        def get(path, querystring=None, endpoint=None):
+            page = int(dict(p.split("=", 1) for p in querystring.split("&"))["pgnum"])
+            if page == fail_on_page:
+                raise ConnectionError("interrupted")
+            pages_fetched.append(page)
+            return {"TotalResults": 5, "ResourceList": [{"ReceiveItemId": page}]}
+        mock_client = MagicMock()
+        mock_client.get.side_effect = get
+        return sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state=state,
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="inventory",
+            path="inventory",
+            endpoint_config={},
+            data_key="ResourceList",
+            static_params={"pgsiz": 1, "sort": "receivedDate"},
+            config=config,
+        )
+
+    def test_get_page_checkpoint(self):
+        signature = get_page_signature("inventory", {"pgsiz": 1})
+        state = {"bookmarks": {"inventory": {"page_checkpoint": {"page": 3, "signature": signature}}}}
+        self.assertEqual(get_page_checkpoint(state, "inventory", signature), 3)
+        self.assertEqual(get_page_checkpoint(state, "inventory", get_page_signature("inventory", {"pgsiz": 2})), 0)
+        self.assertEqual(get_page_checkpoint({}, "inventory", signature), 0)
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records", side_effect=lambda **kwargs: (None, 1))
+    def test_checkpoint_and_resume(self, mock_process, mock_schema, mock_write_state):
+        """An interrupted sync resumes after the last checkpointed page; the checkpoint
+        is removed once the stream completes."""
+        config = {"page_checkpoint_interval": 2}
+        state = {}
+        fetched = []
+        with self.assertRaises(ConnectionError):
+            self._sync(state, config, fetched, fail_on_page=4)
+        self.assertEqual(fetched, [1, 2, 3])
+        self.assertEqual(state["bookmarks"]["inventory"]["page_checkpoint"]["page"], 2)
+        self.assertEqual(mock_write_state.call_count, 1)
+
+        fetched = []
+        self.assertEqual(self._sync(state, config, fetched), 5)
+        self.assertEqual(fetched, [3, 4, 5])
+        self.assertNotIn("inventory", state["bookmarks"])
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records", side_effect=lambda **kwargs: (None, 1))
+    def test_checkpoint_for_other_query_ignored(self, mock_process, mock_schema, mock_write_state):
+        state = {"bookmarks": {"inventory": {"page_checkpoint": {"page": 4, "signature": "other"}}}}
+        fetched = []
+        self._sync(state, {"page_checkpoint_interval": 2}, fetched)
+        self.assertEqual(fetched, [1, 2, 3, 4, 5])
+
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records", side_effect=lambda **kwargs: (None, 1))
+    def test_checkpoints_disabled(self, mock_process, mock_schema):
+        state = {"bookmarks": {"inventory": {"page_checkpoint": {"page": 4, "signature": "other"}}}}
+        fetched = []
+        self._sync(state, {}, fetched)
+        self.assertEqual(fetched, [1, 2, 3, 4, 5])
+        self.assertIn("inventory", state["bookmarks"])
+
+    def _sync_keyset(self, state, config, keys_fetched, fail_after=None):
+        """Sync 5 inventory records, one per page, with keyset pagination."""
+        def get(path, querystring=None, endpoint=None):
+            rql = dict(p.split("=", 1) for p in querystring.split("&")).get("rql", "")
+            after = int(rql.split("=gt=")[1]) if "=gt=" in rql else 0
+            if after == fail_after:
+                raise ConnectionError("interrupted")
+            keys_fetched.append(after)
+            return {"TotalResults": 5 - after, "ResourceList": [{"ReceiveItemId": after + 1}] if after < 5 else []}
+        mock_client = MagicMock()
+        mock_client.get.side_effect = get
+        return sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state=state,
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="inventory",
+            path="inventory",
+            endpoint_config={"keyset_fields": [("ReceiveItemId", "receive_item_id")]},
+            data_key="ResourceList",
+            static_params={"pgsiz": 1},
+            config={"keyset_pagination": "true", **config},
+        )
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records", side_effect=lambda **kwargs: (None, 1))
+    def test_keyset_checkpoint_and_resume(self, mock_process, mock_schema, mock_write_state):
+        """With keyset pagination, the checkpoint records the last key, and an interrupted
+        sync resumes with the records after it."""
+        config = {"page_checkpoint_interval": 2}
+        state = {}
+        fetched = []
+        with self.assertRaises(ConnectionError):
+            self._sync_keyset(state, config, fetched, fail_after=3)
+        self.assertEqual(fetched, [0, 1, 2])
+        self.assertEqual(state["bookmarks"]["inventory"]["page_checkpoint"]["key"], [2])
+
+        fetched = []
+        self._sync_keyset(state, config, fetched)
+        self.assertEqual(fetched, [2, 3, 4, 5])
+        self.assertNotIn("inventory", state["bookmarks"])
+
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records", side_effect=lambda **kwargs: (None, 1))
+    def test_adaptive_page_size_warns(self, mock_process, mock_schema):
+        """Checkpoints are not written with adaptive_page_size, and a warning says so."""
+        state = {}
+        with patch("tap_3plcentral.sync.LOGGER") as mock_logger:
+            self._sync(state, {"page_checkpoint_interval": 2, "adaptive_page_size": "true"}, [])
+        mock_logger.warning.assert_called_once()
+        self.assertNotIn("inventory", state.get("bookmarks", {}))
+
+    def test_clear_bookmark_buffered(self):
+        """A buffered clear_bookmark is replayed on the real state."""
+        state = {"bookmarks": {"inventory": {"page_checkpoint": {"page": 2, "signature": "s"}}}}
+        child_state = {"bookmarks": {"inventory": {"page_checkpoint": {"page": 2, "signature": "s"}}}}
+        with OutputBuffer() as output:
+            clear_bookmark(child_state, "inventory")
+        self.assertIn("inventory", state["bookmarks"])
+        output.replay(state)
+        self.assertNotIn("inventory", state["bookmarks"])
+
+
+class TestParentBookmarks(unittest.TestCase):
+    """Tests for per-parent bookmarks of child streams."""
+
+    def test_get_parent_bookmark(self):
+        state = {"bookmarks": {"sku_items": {"last_modified_date": "2019-03-01", "parents": {"1": "2019-02-01"}}}}
+        self.assertEqual(get_parent_bookmark(state, "sku_items", "last_modified_date", 1, "start"), "2019-02-01")
+        self.assertEqual(get_parent_bookmark(state, "sku_items", "last_modified_date", 2, "start"), "start")
+
+    def test_get_parent_bookmark_legacy_state(self):
+        """State without per-parent bookmarks gives every parent the stream bookmark."""
+        state = {"bookmarks": {"sku_items": {"last_modified_date": "2019-03-01"}}}
+        self.assertEqual(get_parent_bookmark(state, "sku_items", "last_modified_date", 2, "start"), "2019-03-01")
+        self.assertEqual(get_parent_bookmark({}, "sku_items", "last_modified_date", 2, "start"), "start")
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    def test_write_parent_bookmark(self, mock_write_state):
+        state = {"bookmarks": {"sku_items": {"last_modified_date": "2019-03-01"}}}
+        write_parent_bookmark(state, "sku_items", "last_modified_date", 1, "2019-02-01")
+        write_parent_bookmark(state, "sku_items", "last_modified_date", 2, "2019-04-01")
+        self.assertEqual(state["bookmarks"]["sku_items"], {
+            "last_modified_date": "2019-04-01",
+            "default": "2019-03-01",
+            "parents": {"1": "2019-02-01", "2": "2019-04-01"},
+        })
+        self.assertEqual(get_parent_bookmark(state, "sku_items", "last_modified_date", 3, "start"), "2019-03-01")
+        clear_parent_bookmark_default(state, "sku_items")
+        self.assertEqual(get_parent_bookmark(state, "sku_items", "last_modified_date", 3, "start"), "start")
+        self.assertEqual(mock_write_state.call_count, 2)
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    def test_write_parent_bookmark_buffered(self, mock_write_state):
+        state = {}
+        with OutputBuffer() as output:
+            write_parent_bookmark({}, "sku_items", "last_modified_date", 1, "2019-02-01")
+        mock_write_state.assert_not_called()
+        output.replay(state)
+        self.assertEqual(state["bookmarks"]["sku_items"]["parents"], {"1": "2019-02-01"})
+
+    def _sync_child(self, state, parent_id, records):
+        queries = []
+
+        def get(path, querystring=None, endpoint=None):
+            queries.append(dict(p.split("=", 1) for p in querystring.split("&"))["rql"])
+            return {"TotalResults": len(records), "ResourceList": records}
+        mock_client = MagicMock()
+        mock_client.get.side_effect = get
+        processor = MagicMock()
+        processor.transform.side_effect = lambda record: record
+        processor.datetime_threshold.side_effect = singer.utils.strptime_to_utc
+        processor.parse_datetime.side_effect = singer.utils.strptime_to_utc
+        sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state=state,
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="sku_items",
+            path="customers/{}/items".format(parent_id),
+            endpoint_config={},
+            data_key="ResourceList",
+            static_params={"pgsiz": 100},
+            bookmark_query_field="ReadOnly.lastModifiedDate",
+            bookmark_field="last_modified_date",
+            bookmark_type="datetime",
+            parent="customer",
+            parent_id=parent_id,
+            processors={"sku_items": processor},
+        )
+        return queries[0]
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    @patch("tap_3plcentral.sync.write_schema")
+    def test_sync_endpoint_per_parent_thresholds(self, mock_schema, mock_write_message, mock_write_state):
+        """Each parent is queried from its own bookmark; a parent without records keeps
+        the threshold it was queried from."""
+        state = {"bookmarks": {"sku_items": {"last_modified_date": "2019-03-01T00:00:00Z"}}}
+        # Legacy state: the stream bookmark
+        rql = self._sync_child(state, 1, [{"ItemId": 1, "LastModifiedDate": "2019-05-01T00:00:00Z"}])
+        self.assertEqual(rql, "ReadOnly.lastModifiedDate=ge=2019-03-01T00:00:00Z")
+        # Parents not synced yet keep the old stream bookmark until the parent stream completes
+        rql = self._sync_child(state, 2, [])
+        self.assertEqual(rql, "ReadOnly.lastModifiedDate=ge=2019-03-01T00:00:00Z")
+        clear_parent_bookmark_default(state, "sku_items")
+        self.assertEqual(state["bookmarks"]["sku_items"], {
+            "last_modified_date": "2019-05-01T00:00:00Z",
+            "parents": {"1": "2019-05-01T00:00:00Z", "2": "2019-03-01T00:00:00Z"},
+        })
+        # Per-parent state: each parent's own bookmark; new parents from the start_date
+        self.assertEqual(self._sync_child(state, 1, []), "ReadOnly.lastModifiedDate=ge=2019-05-01T00:00:00Z")
+        self.assertEqual(self._sync_child(state, 2, []), "ReadOnly.lastModifiedDate=ge=2019-03-01T00:00:00Z")
+        self.assertEqual(self._sync_child(state, 3, []), "ReadOnly.lastModifiedDate=ge=2019-01-01T00:00:00Z")
+
+
+class TestIterAdaptivePages(unittest.TestCase):
+    """Page size changes keep page numbering correct via record offsets."""
+
+    class ScriptedTuner(object):
+        def __init__(self, sizes):
+            self.sizes = list(sizes)
+            self.page_size = self.sizes.pop(0)
+
+        def observe(self, records, seconds, size_bytes=None):
+            if self.sizes:
+                self.page_size = self.sizes.pop(0)
+            return self.page_size
+
+    def _get_sized_page(self, total, calls):
+        def get_sized_page(page, size):
+            calls.append((page, size))
+            rows = list(range(total))[(page - 1) * size:page * size]
+            return {"TotalResults": total, "ResourceList": rows}, "extracted"
+        return get_sized_page
+
+    def test_every_record_once_in_order(self):
+        for sizes in ([100, 300, 70, 1000], [50, 25, 200, 30], [200]):
+            calls = []
+            tuner = self.ScriptedTuner(sizes)
+            pages = list(iter_adaptive_pages(self._get_sized_page(1234, calls), "ResourceList", tuner))
+            rows = [row for _, data, _ in pages for row in data["ResourceList"]]
+            self.assertEqual(rows, list(range(1234)), sizes)
+
+    def test_requests_page_containing_offset(self):
+        calls = []
+        tuner = self.ScriptedTuner([100, 300])
+        list(iter_adaptive_pages(self._get_sized_page(650, calls), "ResourceList", tuner))
+        # After 100 records, a 300-record page 1 is requested and its first 100 dropped
+        self.assertEqual(calls, [(1, 100), (1, 300), (2, 300), (3, 300)])
+
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records", side_effect=lambda **kwargs: (None, len(kwargs["records"])))
+    def test_sync_endpoint_logs_records_not_page_total(self, mock_process, mock_schema):
+        """With adaptive page sizes, progress is logged in records out of TotalResults,
+        not against a page total computed from the configured page size."""
+        def get(path, querystring=None, endpoint=None):
+            params = dict(p.split("=", 1) for p in querystring.split("&"))
+            page, size = int(params["pgnum"]), int(params["pgsiz"])
+            rows = [{"ReceiveItemId": i} for i in range(7)][(page - 1) * size:page * size]
+            return {"TotalResults": 7, "ResourceList": rows}
+        mock_client = MagicMock()
+        mock_client.get.side_effect = get
+
+        with patch("tap_3plcentral.sync.AdaptivePageSize", return_value=self.ScriptedTuner([1, 3])), \
+                patch("tap_3plcentral.sync.LOGGER") as mock_logger:
+            total = sync_endpoint(
+                client=mock_client,
+                catalog=MagicMock(),
+                state={},
+                start_date="2019-01-01T00:00:00Z",
+                stream_name="inventory",
+                path="inventory",
+                endpoint_config={},
+                data_key="ResourceList",
+                static_params={"pgsiz": 1},
+                config={"adaptive_page_size": "true"},
+            )
+        self.assertEqual(total, 7)
+        progress = [args[0] for args, _ in mock_logger.info.call_args_list if "Synced - page" in args[0]]
+        self.assertEqual(progress, [
+            "inventory - Synced - page: 1, records: 1 of 7",
+            "inventory - Synced - page: 2, records: 3 of 7",
+            "inventory - Synced - page: 3, records: 6 of 7",
+            "inventory - Synced - page: 4, records: 7 of 7",
+        ])
+
+
+class TestSyncChildren(unittest.TestCase):
+    """Tests for child stream fan-out."""
+
+    def _fake_child_sync(self, **kwargs):
+        """Writes one record and a bookmark per parent, slower for earlier parents."""
+        import time
+        parent_id = kwargs["parent_id"]
+        time.sleep(0.005 * (5 - parent_id))
+        write_record(kwargs["stream_name"], {"item_id": parent_id}, time_extracted=None)
+        write_bookmark(kwargs["state"], kwargs["stream_name"], "last_modified_date", str(parent_id))
+        return 1
+
+    def _sync_children(self, config):
+        state = {}
+        sync_children(
+            client=MagicMock(),
+            catalog=MagicMock(),
+            state=state,
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="customers",
+            children={"sku_items": {"path": "customers/{}/items", "parent": "customer"}},
+            records=[{"customer_id": i} for i in range(1, 5)],
+            id_fields=["customer_id"],
+            config=config)
+        return state
+
+    def test_get_parent_id_field(self):
+        self.assertEqual(get_parent_id_field(["customer_id"]), "customer_id")
+        self.assertEqual(get_parent_id_field(["facility_id", "location_id"]), "facility_id")
+        self.assertEqual(get_parent_id_field(["name", "id"]), "id")
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    @patch("tap_3plcentral.sync.get_selected_streams", return_value=["customers", "sku_items"])
+    def test_parallel_children_emit_in_parent_order(self, mock_selected, mock_write_record, mock_write_state):
+        """Concurrent child syncs replay their output in parent record order."""
+        with patch("tap_3plcentral.sync.sync_endpoint", side_effect=self._fake_child_sync):
+            state = self._sync_children({"child_workers": 4})
+        written = [call_args[0][0].record["item_id"] for call_args in mock_write_record.call_args_list]
+        self.assertEqual(written, [1, 2, 3, 4])
+        self.assertEqual(state["bookmarks"]["sku_items"], {"last_modified_date": "4"})
+        self.assertEqual(mock_write_state.call_count, 4)
+
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    @patch("tap_3plcentral.sync.get_selected_streams", return_value=["customers", "sku_items"])
+    def test_serial_children_write_directly(self, mock_selected, mock_write_record, mock_write_state):
+        """Without child_workers, children write straight to the shared state."""
+        with patch("tap_3plcentral.sync.sync_endpoint", side_effect=self._fake_child_sync):
+            state = self._sync_children({})
+        written = [call_args[0][0].record["item_id"] for call_args in mock_write_record.call_args_list]
+        self.assertEqual(written, [1, 2, 3, 4])
+        self.assertEqual(state["bookmarks"]["sku_items"], {"last_modified_date": "4"})
+
+    @patch("tap_3plcentral.sync.get_selected_streams", return_value=["customers", "stock_details"])
+    def test_fixed_parent_child_synced_once(self, mock_selected):
+        """A child with fixed_parent_id is synced once, with that parent id."""
+        with patch("tap_3plcentral.sync.sync_endpoint", return_value=7) as mock_sync_endpoint:
+            sync_children(
+                client=MagicMock(),
+                catalog=MagicMock(),
+                state={},
+                start_date="2019-01-01T00:00:00Z",
+                stream_name="customers",
+                children={"stock_details": {
+                    "path": "inventory/stockdetails",
+                    "parent": "customer",
+                    "fixed_parent_id": "50"}},
+                records=[{"customer_id": i} for i in range(1, 5)],
+                id_fields=["customer_id"])
+        mock_sync_endpoint.assert_called_once()
+        self.assertEqual(mock_sync_endpoint.call_args.kwargs["parent_id"], "50")
+        self.assertEqual(mock_sync_endpoint.call_args.kwargs["path"], "inventory/stockdetails")
+
+    @patch("tap_3plcentral.sync.write_schema")
+    @patch("tap_3plcentral.sync.process_records", return_value=(None, 1))
+    @patch("tap_3plcentral.sync.sync_children")
+    def test_sync_endpoint_fixed_parent_children_after_pages(self, mock_sync_children, mock_process, mock_schema):
+        """sync_endpoint syncs fixed-parent children once, after all parent pages."""
+        mock_client = MagicMock()
+        mock_client.get.return_value = {"TotalResults": 2, "ResourceList": [{"CustomerId": 1}]}
+        children = {
+            "sku_items": {"path": "customers/{}/items", "parent": "customer"},
+            "stock_details": {"path": "inventory/stockdetails", "parent": "customer", "fixed_parent_id": "50"},
+        }
+        sync_endpoint(
+            client=mock_client,
+            catalog=MagicMock(),
+            state={},
+            start_date="2019-01-01T00:00:00Z",
+            stream_name="customers",
+            path="customers",
+            endpoint_config={"children": children},
+            data_key="ResourceList",
+            static_params={"pgsiz": 1},
+            id_fields=["customer_id"])
+        synced_children = [list(call_args.kwargs["children"]) for call_args in mock_sync_children.call_args_list]
+        self.assertEqual(synced_children, [["sku_items"], ["sku_items"], ["stock_details"]])
+
+    @patch("tap_3plcentral.writer.WRITER.write_message")
+    def test_output_buffer_captures_records(self, mock_write_record):
+        """Records written inside an OutputBuffer are held until replayed."""
+        with OutputBuffer() as output:
+            write_record("sku_items", {"item_id": 1}, time_extracted=None)
+        mock_write_record.assert_not_called()
+        output.replay({})
+        mock_write_record.assert_called_once()
+
+
 class TestSync(unittest.TestCase):
     """Tests for the main sync function."""
 
@@ -485,6 +1385,54 @@ class TestSync(unittest.TestCase):
         sync(mock_client, config, mock_catalog, state, "2019-01-01T00:00:00Z")
         mock_sync_endpoint.assert_called_once()
 
+    @patch("tap_3plcentral.sync.singer.write_state")
+    @patch("tap_3plcentral.sync.sync_endpoint")
+    @patch("tap_3plcentral.sync.get_selected_streams", return_value=["orders"])
+    @patch("singer.get_currently_syncing", return_value=None)
+    def test_sync_flushes_coalesced_state_on_error(
+        self, mock_currently_syncing, mock_get_selected, mock_sync_endpoint, mock_write_state
+    ):
+        """A coalesced bookmark is written when the sync stops with an error."""
+        def sync_endpoint(**kwargs):
+            write_bookmark(kwargs["state"], "orders", "last_modified_date", "2019-02-01T00:00:00Z")
+            raise RuntimeError("interrupted")
+        mock_sync_endpoint.side_effect = sync_endpoint
+        config = {
+            "start_date": "2019-01-01T00:00:00Z",
+            "customer_id": "50",
+            "facility_id": "1",
+            "state_interval": 3600,
+        }
+
+        # sync replaces the module state emitter; restore it afterwards
+        with patch.object(writer, "STATE_EMITTER", writer.StateEmitter()), \
+                self.assertRaises(RuntimeError):
+            sync(MagicMock(), config, MagicMock(), {}, "2019-01-01T00:00:00Z")
+        written_state = mock_write_state.call_args[0][0]
+        self.assertEqual(written_state["bookmarks"]["orders"]["last_modified_date"], "2019-02-01T00:00:00Z")
+        self.assertEqual(mock_write_state.call_count, 1)
+
+    @patch("tap_3plcentral.sync.sync_endpoint")
+    @patch("tap_3plcentral.sync.get_selected_streams", return_value=["orders"])
+    @patch("singer.get_currently_syncing", return_value=None)
+    def test_sync_closes_processors_on_error(self, mock_currently_syncing, mock_get_selected, mock_sync_endpoint):
+        """Record processors log their removed/filtered paths when a stream raises."""
+        processor = MagicMock()
+        def sync_endpoint(**kwargs):
+            kwargs["processors"]["orders"] = processor
+            raise RuntimeError("interrupted")
+        mock_sync_endpoint.side_effect = sync_endpoint
+        config = {
+            "start_date": "2019-01-01T00:00:00Z",
+            "customer_id": "50",
+            "facility_id": "1",
+        }
+
+        with patch.object(writer, "STATE_EMITTER", writer.StateEmitter()), \
+                self.assertRaises(RuntimeError):
+            sync(MagicMock(), config, MagicMock(), {}, "2019-01-01T00:00:00Z")
+        processor.close.assert_called_once()
+
     @patch("tap_3plcentral.sync.get_selected_streams", return_value=[])
     def test_sync_no_selected_streams(self, mock_get_selected):
         """Sync returns early when no streams are selected."""
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tap_3plcentral.token_cache import TokenCache, token_from_response
+
+
+class TestTokenFromResponse(unittest.TestCase):
+    """Tests for building cache entries from token responses."""
+
+    def test_expires_at(self):
+        token = token_from_response(
+            {"token_type": "Bearer", "access_token": "abc", "expires_in": 3599}, now=1000)
+        self.assertEqual(token, {"token_type": "Bearer", "access_token": "abc", "expires_at": 4599})
+
+    def test_no_expires_in(self):
+        token = token_from_response({"token_type": "Bearer", "access_token": "abc"}, now=1000)
+        self.assertIsNone(token["expires_at"])
+
+
+class TestTokenCache(unittest.TestCase):
+    """Tests for the persistent token cache."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "tokens.json")
+        self.key = TokenCache.key("https://secure-wms.com", "client", "tpl", "1")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_key_depends_on_credentials(self):
+        self.assertNotEqual(self.key, TokenCache.key("https://secure-wms.com", "client", "tpl", "2"))
+        self.assertEqual(self.key, TokenCache.key("https://secure-wms.com", "client", "tpl", "1"))
+
+    def test_persisted_across_instances(self):
+        token = token_from_response({"token_type": "Bearer", "access_token": "abc", "expires_in": 3600})
+        TokenCache(self.path).set(self.key, token)
+        self.assertEqual(TokenCache(self.path).get(self.key), token)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_expired_token_not_returned(self):
+        token = token_from_response({"token_type": "Bearer", "access_token": "abc", "expires_in": 100})
+        TokenCache(self.path).set(self.key, token)
+        self.assertIsNone(TokenCache(self.path, expiry_margin=300).get(self.key))
+        self.assertEqual(TokenCache(self.path, expiry_margin=0).get(self.key), token)
+
+    def test_token_without_expiry_kept_in_memory_only(self):
+        cache = TokenCache(self.path)
+        token = token_from_response({"token_type": "Bearer", "access_token": "abc"})
+        cache.set(self.key, token)
+        self.assertEqual(cache.get(self.key), token)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_unreadable_file_ignored(self):
+        with open(self.path, "w") as file:
+            file.write("not json")
+        cache = TokenCache(self.path)
+        self.assertIsNone(cache.get(self.key))
+        token = token_from_response({"token_type": "Bearer", "access_token": "abc", "expires_in": 3600})
+        cache.set(self.key, token)
+        with open(self.path) as file:
+            self.assertEqual(json.load(file), {self.key: token})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,8 @@ from tap_3plcentral.transform import (
     transform_stock_summaries,
     transform_locations,
     transform_json,
+    transform_record,
+    convert_node,
 )
 
 
@@ -239,6 +241,63 @@ class TestTransformJson(unittest.TestCase):
         self.assertEqual(record["location_id"], 10)
         self.assertEqual(record["facility_id"], 1)
 
+    def test_transform_json_matches_multi_pass_pipeline(self):
+        """The single-pass transform gives the same output as the original passes."""
+        def multi_pass(data, stream, path):
+            denested = denest_embedded_readonly_nodes(data, path)
+            converted = convert_json(remove_embedded_links(denested))
+            if stream == "stock_summaries":
+                return transform_stock_summaries(converted, convert(path))
+            if stream == "locations":
+                return transform_locations(converted, convert(path))
+            return converted
+
+        data = {
+            "TotalResults": 2,
+            "_links": {"next": "/api/next"},
+            "ResourceList": [
+                {
+                    "OrderId": 1,
+                    "ReadOnly": {"CreationDate": "2025-01-01", "Status": 1, "_links": {}},
+                    "OrderItems": [{"ItemIdentifier": {"Id": 3}, "_links": {"self": "/x"}}],
+                    "_links": {"self": "/api/orders/1"},
+                },
+                {"OrderId": 2, "ItemIdentifier": {"Id": 4},
+                 "LocationIdentifier": {"Id": 10, "NameKey": {"FacilityIdentifier": {"Id": 1}}}},
+            ],
+        }
+        import copy
+        for stream in ["orders", "stock_summaries", "locations"]:
+            self.assertEqual(
+                transform_json(copy.deepcopy(data), stream, "ResourceList"),
+                multi_pass(copy.deepcopy(data), stream, "ResourceList"))
+
+    def test_transform_json_does_not_mutate_input(self):
+        data = {"ResourceList": [{"OrderId": 1, "ReadOnly": {"Status": 1}}]}
+        transform_json(data, "orders", "ResourceList")
+        self.assertEqual(data, {"ResourceList": [{"OrderId": 1, "ReadOnly": {"Status": 1}}]})
+
+
+class TestTransformRecord(unittest.TestCase):
+    """Tests for the single-record transform."""
+
+    def test_embedded_item_lifted(self):
+        record = {"ItemId": 1, "_embedded": {"item": {"Sku": "A"}, "other": 1}}
+        self.assertEqual(transform_record(record, "sku_items"), {"item_id": 1, "item": {"sku": "A"}})
+
+    def test_read_only_overrides(self):
+        record = {"Status": 0, "ReadOnly": {"Status": 1}}
+        self.assertEqual(transform_record(record, "orders"), {"status": 1})
+
+    def test_convert_node_removes_links(self):
+        self.assertEqual(convert_node([{"SomeKey": {"_links": 1, "Id": 2}}]), [{"some_key": {"id": 2}}])
+
+    def test_convert_is_memoized(self):
+        convert.cache_clear()
+        convert("LastModifiedDate")
+        convert("LastModifiedDate")
+        self.assertEqual(convert.cache_info().hits, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
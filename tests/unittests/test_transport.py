@@ -0,0 +1,163 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+from requests.exceptions import ConnectionError, Timeout
+
+from tap_3plcentral.transport import (
+    ConnectionStats,
+    CountingHTTPAdapter,
+    HTTPXSession,
+    http2_available,
+    httpx,
+    make_session,
+    translate_errors,
+)
+
+
+class TestMakeSession(unittest.TestCase):
+    """Tests for transport selection."""
+
+    def test_default_is_requests(self):
+        self.assertIsInstance(make_session(), requests.Session)
+
+    @patch("tap_3plcentral.transport.http2_available", return_value=False)
+    def test_http2_falls_back_to_requests(self, mock_available):
+        with self.assertLogs(level="WARNING"):
+            session = make_session(http2=True)
+        self.assertIsInstance(session, requests.Session)
+
+    @unittest.skipUnless(http2_available(), "httpx and h2 are not installed")
+    def test_http2_session(self):
+        session = make_session(http2=True)
+        self.assertIsInstance(session, HTTPXSession)
+        session.close()
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"data": 1}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestConnectionStats(unittest.TestCase):
+    """Tests for pool sizing and connection reuse counters."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.url = "http://127.0.0.1:{}/orders".format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_pool_size_mounted(self):
+        session = make_session(pool_connections=3, pool_maxsize=25)
+        adapter = session.get_adapter("https://secure-wms.com/orders")
+        self.assertIsInstance(adapter, CountingHTTPAdapter)
+        self.assertEqual(adapter._pool_maxsize, 25)
+        self.assertEqual(adapter._pool_connections, 3)
+
+    def test_keep_alive_connections_reused(self):
+        session = make_session()
+        for _ in range(3):
+            self.assertEqual(session.request("GET", self.url).content, b'{"data": 1}')
+        self.assertEqual(session.stats.requests, 3)
+        self.assertEqual(session.stats.connections_opened, 1)
+        self.assertEqual(session.stats.connections_reused, 2)
+        self.assertEqual(session.stats.tls_handshakes, 0)
+        session.close()
+
+    def test_new_connections_beyond_pool(self):
+        """Concurrent requests beyond pool_maxsize open new connections."""
+        session = make_session(pool_maxsize=1)
+        barrier = threading.Barrier(3)
+
+        def get():
+            barrier.wait(timeout=5)
+            session.request("GET", self.url).content
+
+        threads = [threading.Thread(target=get) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(session.stats.requests, 3)
+        self.assertGreaterEqual(session.stats.connections_opened, 2)
+        session.close()
+
+    @patch("singer.metrics.log")
+    def test_log_metrics(self, mock_log):
+        stats = ConnectionStats()
+        stats.increment("requests")
+        stats.increment("requests")
+        stats.increment("connections_opened")
+        stats.log()
+        points = {call_args[0][1].metric: call_args[0][1].value for call_args in mock_log.call_args_list}
+        self.assertEqual(points, {
+            "http_connections_opened": 1,
+            "http_connections_reused": 1,
+            "tls_handshakes": 0,
+        })
+
+
+@unittest.skipUnless(http2_available(), "httpx and h2 are not installed")
+class TestHTTPXSession(unittest.TestCase):
+    """Tests for the requests.Session adapter over httpx."""
+
+    def setUp(self):
+        self.session = HTTPXSession()
+        self.sent = []
+
+        def handler(request):
+            self.sent.append(request)
+            if request.url.path == "/timeout":
+                raise httpx.ReadTimeout("timed out", request=request)
+            return httpx.Response(200, content=b'{"data": 1}')
+
+        self.session.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_request(self):
+        self.session.headers.update({"User-Agent": "tap", "Authorization": "Bearer a"})
+        response = self.session.request(
+            "GET", "https://secure-wms.com/orders", headers={"Authorization": "Bearer b"}, timeout=(5, 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'{"data": 1}')
+        self.assertEqual(self.sent[0].headers["Authorization"], "Bearer b")
+        self.assertEqual(self.sent[0].headers["User-Agent"], "tap")
+
+    def test_streamed_request(self):
+        response = self.session.request("GET", "https://secure-wms.com/orders", stream=True)
+        self.assertEqual(b"".join(response.iter_content(chunk_size=4)), b'{"data": 1}')
+        response.close()
+
+    def test_errors_translated(self):
+        with self.assertRaises(Timeout):
+            self.session.request("GET", "https://secure-wms.com/timeout")
+
+
+@unittest.skipUnless(httpx is not None, "httpx is not installed")
+class TestTranslateErrors(unittest.TestCase):
+
+    def test_connect_error(self):
+        with self.assertRaises(ConnectionError):
+            with translate_errors():
+                raise httpx.ConnectError("refused")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import io
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+import singer
+
+from tap_3plcentral import writer
+from tap_3plcentral.writer import MessageWriter, StateEmitter
+
+
+def record_message(record_id):
+    return singer.RecordMessage(stream="orders", record={"order_id": record_id})
+
+
+class TestMessageWriter(unittest.TestCase):
+    """Tests for the buffered MessageWriter."""
+
+    def test_buffers_until_flush(self):
+        output = io.StringIO()
+        message_writer = MessageWriter(buffer_size=10 ** 6, flush_interval=3600, output=output)
+        for i in range(3):
+            message_writer.write_message(record_message(i))
+        self.assertEqual(output.getvalue(), "")
+        message_writer.flush()
+        lines = output.getvalue().splitlines()
+        self.assertEqual([json.loads(line)["record"]["order_id"] for line in lines], [0, 1, 2])
+        self.assertEqual(message_writer.flushes, 1)
+        self.assertEqual(message_writer.messages_written, 3)
+        self.assertEqual(message_writer.bytes_written, len(output.getvalue().encode("utf-8")))
+
+    def test_flush_error_logged_and_raised(self):
+        """Write errors surface on flush, where the buffered records are written."""
+        output = MagicMock()
+        output.write.side_effect = BrokenPipeError("Broken pipe")
+        message_writer = MessageWriter(buffer_size=10 ** 6, flush_interval=3600, output=output)
+        message_writer.write_message(record_message(1))
+        output.write.assert_not_called()
+        with patch("tap_3plcentral.writer.LOGGER") as mock_logger:
+            with self.assertRaises(OSError):
+                message_writer.flush()
+        self.assertIn("1 buffered records", mock_logger.info.call_args[0][0])
+
+    def test_flushes_on_size(self):
+        output = io.StringIO()
+        message_writer = MessageWriter(buffer_size=100, flush_interval=3600, output=output)
+        for i in range(10):
+            message_writer.write_message(record_message(i))
+        self.assertGreater(message_writer.flushes, 0)
+        self.assertTrue(output.getvalue().endswith("\n"))
+
+    def test_flushes_on_interval(self):
+        output = io.StringIO()
+        message_writer = MessageWriter(buffer_size=10 ** 6, flush_interval=5, output=output)
+        with patch("tap_3plcentral.writer.time.monotonic", return_value=message_writer._last_flush + 6):
+            message_writer.write_message(record_message(1))
+        self.assertEqual(message_writer.flushes, 1)
+
+    def test_unbuffered(self):
+        output = io.StringIO()
+        message_writer = MessageWriter(buffer_size=0, output=output)
+        message_writer.write_message(record_message(1))
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
+
+    def test_empty_flush_does_not_count(self):
+        message_writer = MessageWriter(output=io.StringIO())
+        message_writer.flush()
+        self.assertEqual(message_writer.flushes, 0)
+
+    def test_state_written_after_buffered_records(self):
+        """write_bookmark flushes buffered records before the STATE message."""
+        from tap_3plcentral.sync import write_record, write_bookmark
+        output = io.StringIO()
+        with patch.object(writer, "WRITER", MessageWriter(output=output)), \
+                patch("sys.stdout", output):
+            write_record("orders", {"order_id": 1}, time_extracted=None)
+            write_bookmark({}, "orders", "last_modified_date", "2025-01-01T00:00:00Z")
+        types = [json.loads(line)["type"] for line in output.getvalue().splitlines()]
+        self.assertEqual(types, ["RECORD", "STATE"])
+
+
+class TestStateEmitter(unittest.TestCase):
+    """Tests for coalesced STATE messages."""
+
+    def setUp(self):
+        self.now = [0.0]
+        self.output = io.StringIO()
+        patcher = patch.object(writer, "WRITER", MessageWriter(output=self.output))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        stdout_patcher = patch("sys.stdout", self.output)
+        stdout_patcher.start()
+        self.addCleanup(stdout_patcher.stop)
+
+    def emitter(self, interval=0, records=0):
+        return StateEmitter(interval=interval, records=records, clock=lambda: self.now[0])
+
+    def states(self):
+        return [json.loads(line)["value"] for line in self.output.getvalue().splitlines()
+                if json.loads(line)["type"] == "STATE"]
+
+    def test_immediate_by_default(self):
+        emitter = self.emitter()
+        emitter.update({"n": 1})
+        emitter.update({"n": 2})
+        self.assertEqual(self.states(), [{"n": 1}, {"n": 2}])
+
+    def test_coalesced_by_interval(self):
+        emitter = self.emitter(interval=10)
+        for n in range(5):
+            emitter.update({"n": n})
+        self.assertEqual(self.states(), [])
+        self.now[0] = 11
+        emitter.update({"n": 5})
+        self.assertEqual(self.states(), [{"n": 5}])
+        self.assertEqual(emitter.coalesced, 4)
+
+    def test_coalesced_by_records(self):
+        emitter = self.emitter(records=3)
+        writer.get_writer().write_message(record_message(1))
+        emitter.update({"n": 1})
+        writer.get_writer().write_message(record_message(2))
+        writer.get_writer().write_message(record_message(3))
+        emitter.update({"n": 2})
+        types = [json.loads(line)["type"] for line in self.output.getvalue().splitlines()]
+        self.assertEqual(types, ["RECORD", "RECORD", "RECORD", "STATE"])
+        self.assertEqual(self.states(), [{"n": 2}])
+
+    def test_force_and_flush_write_latest(self):
+        emitter = self.emitter(interval=3600)
+        emitter.update({"n": 1})
+        emitter.update({"n": 2}, force=True)
+        emitter.update({"n": 3})
+        emitter.flush()
+        emitter.flush()
+        self.assertEqual(self.states(), [{"n": 2}, {"n": 3}])
+
+    def test_stream_end_always_written(self):
+        """update_currently_syncing writes the state at the end of a stream."""
+        from tap_3plcentral.sync import update_currently_syncing, write_bookmark
+        state = {}
+        with patch.object(writer, "STATE_EMITTER", self.emitter(interval=3600)):
+            update_currently_syncing(state, "orders")
+            write_bookmark(state, "orders", "last_modified_date", "2025-01-01T00:00:00Z")
+            self.assertEqual(self.states(), [])
+            update_currently_syncing(state, None)
+        self.assertEqual(self.states(), [{
+            "currently_syncing": None,
+            "bookmarks": {"orders": {"last_modified_date": "2025-01-01T00:00:00Z"}},
+        }])
+
+
+if __name__ == "__main__":
+    unittest.main()